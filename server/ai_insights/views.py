@@ -5,13 +5,29 @@ from datetime import datetime
 import google.generativeai as genai
 import requests
 from django.conf import settings
+from django.core.cache import caches
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from nba_api.stats.endpoints import playergamelog, commonplayerinfo
 from nba_api.stats.static import players
 
+from odds.utils.cache_helpers import (
+    UPSTREAM_ALIAS,
+    UpstreamError,
+    cached_odds_api_get,
+    get_stale_snapshot,
+    set_snapshot,
+)
+from odds.utils.request_planner import sport_odds_query
+from odds.utils.resilience import CircuitBreaker, call_with_retries
 from server.settings import GEMINI_KEY
 
+nba_stats_breaker = CircuitBreaker(
+    "nba_stats",
+    failure_threshold=settings.UPSTREAM_BREAKER_THRESHOLD,
+    reset_timeout=settings.UPSTREAM_BREAKER_RESET,
+)
+
 
 @csrf_exempt
 def fetch_player_insights(request):
@@ -49,16 +65,10 @@ def fetch_player_insights(request):
             player_id = nba_player[0]["id"]
 
             # Get player info and recent games
-            player_info = commonplayerinfo.CommonPlayerInfo(player_id=player_id)
-            game_log = playergamelog.PlayerGameLog(
-                player_id=player_id, season="2024-25"  # Update with current season
-            )
+            info_data, game_log_data = fetch_player_stats(player_id)
 
             # Extract relevant stats
-            info_data = player_info.get_normalized_dict()
-            stats_data = game_log.get_normalized_dict()["PlayerGameLog"][
-                :5
-            ]  # Last 5 games
+            stats_data = game_log_data["PlayerGameLog"][:5]  # Last 5 games
 
             prompt = f"""
             **Advanced Player Betting Analysis**
@@ -381,25 +391,70 @@ def format_analysis_as_html(analysis_text):
 
 
 def fetch_odds_data(sport):
-    url = f"https://api.the-odds-api.com/v4/sports/{sport}/odds/"
-    params = {
-        "apiKey": settings.API_KEY,
-        "regions": "us",
-        "markets": "h2h",
-        "oddsFormat": "decimal",
-    }
     try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {
-                "error": f"Failed to fetch odds. Status code: {response.status_code}"
-            }
+        # Shares the h2h snapshot (and its stale fallback) with /arbitrage/*
+        odds_data, _ = cached_odds_api_get(
+            f"sport_odds_{sport}_h2h",
+            f"/v4/sports/{sport}/odds/",
+            params=sport_odds_query(["h2h"]),
+            consumer="ai_insights",
+        )
+        return odds_data
+    except UpstreamError as e:
+        return {"error": f"Failed to fetch odds. Status code: {e.status}"}
     except Exception as e:
         return {"error": f"An error occurred: {str(e)}"}
 
 
+def fetch_player_stats(player_id):
+    """
+    Fetch a player's profile and current season game log from NBA stats.
+
+    Each endpoint call runs under a deadline with retries behind the
+    nba_stats circuit breaker. Results are cached, and the last good copy is
+    served while NBA stats is failing or the circuit is open.
+
+    Args:
+        player_id (int): NBA player id
+
+    Returns:
+        tuple: (normalized CommonPlayerInfo dict, normalized PlayerGameLog dict)
+    """
+    cache_key = f"nba_player_stats_{player_id}"
+    cached = caches[UPSTREAM_ALIAS].get(cache_key)
+    if cached is not None:
+        return cached
+
+    def call(endpoint, **kwargs):
+        return call_with_retries(
+            lambda remaining: endpoint(
+                timeout=min(settings.NBA_STATS_TIMEOUT, remaining), **kwargs
+            ).get_normalized_dict(),
+            nba_stats_breaker,
+            settings.NBA_STATS_DEADLINE,
+            is_failure=lambda result: False,
+        )
+
+    try:
+        stats = (
+            call(commonplayerinfo.CommonPlayerInfo, player_id=player_id),
+            call(
+                playergamelog.PlayerGameLog,
+                player_id=player_id,
+                season="2024-25",  # Update with current season
+            ),
+        )
+    except requests.exceptions.RequestException:
+        stale = get_stale_snapshot(cache_key)
+        if stale is None:
+            raise
+        return stale["value"]
+
+    # NBA stats cost no Odds API credits, so the budget mustn't stretch the TTL
+    set_snapshot(cache_key, stats, settings.NBA_STATS_CACHE_TTL, budgeted=False)
+    return stats
+
+
 # Configure the GenAI API key
 genai.configure(api_key=GEMINI_KEY)
 
@@ -0,0 +1,461 @@
+"""
+Cache backends for the per-data-class cache aliases.
+
+ByteBudgetLRUCache is an in-process cache bounded by the pickled size of its
+entries rather than their count, evicting least recently used entries first,
+so each alias has a predictable memory ceiling per worker.
+
+SQLiteCache stores entries in one SQLite file in WAL mode, so gunicorn workers
+read and publish the same odds snapshots instead of each holding a private
+copy. WAL lets readers run concurrently with a single writer; writes that must
+be atomic (add, get_or_set, incr) run in an IMMEDIATE transaction. It needs no
+external service. Like ByteBudgetLRUCache it can be bounded by bytes: with
+MAX_BYTES set, writes that take the file's entries past the budget evict the
+least recently read entries first. Reads are stamped at most once a second
+per entry, so a hot key doesn't turn every read into a write.
+
+Both count hits, misses and evictions per process; see stats().
+
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache_backends.SQLiteCache",
+            "LOCATION": "/tmp/apeoffside-cache.sqlite3",
+        }
+    }
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    size INTEGER NOT NULL DEFAULT 0,
+    accessed REAL NOT NULL DEFAULT 0
+)
+"""
+
+# Columns added since the first schema, for cache files created before them
+ADDED_COLUMNS = {
+    "size": "INTEGER NOT NULL DEFAULT 0",
+    "accessed": "REAL NOT NULL DEFAULT 0",
+}
+
+# Seconds between recorded reads of one entry in SQLiteCache
+ACCESS_RESOLUTION = 1.0
+
+
+class _LRUStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (pickled value, expiry timestamp or None), oldest use first
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+# Django creates a backend instance per thread; instances with the same
+# LOCATION share one store, as with LocMemCache
+_lru_stores = {}
+_lru_stores_lock = threading.Lock()
+
+
+def _entry_size(key, pickled):
+    return len(key) + len(pickled)
+
+
+class ByteBudgetLRUCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._max_bytes = options.get("MAX_BYTES", 16 * 1024 * 1024)
+        with _lru_stores_lock:
+            self._store = _lru_stores.setdefault(name, _LRUStore())
+
+    def _live_entry(self, key):
+        # Caller holds the store lock
+        entry = self._store.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key):
+        pickled, _ = self._store.entries.pop(key)
+        self._store.bytes -= _entry_size(key, pickled)
+
+    def _store_entry(self, key, pickled, timeout):
+        store = self._store
+        if key in store.entries:
+            self._remove(key)
+        store.entries[key] = (pickled, self.get_backend_timeout(timeout))
+        store.bytes += _entry_size(key, pickled)
+        while store.bytes > self._max_bytes and store.entries:
+            oldest = next(iter(store.entries))
+            self._remove(oldest)
+            store.evictions += 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._store.lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self._store.misses += 1
+                return default
+            self._store.entries.move_to_end(key)
+            self._store.hits += 1
+        return pickle.loads(entry[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._store.lock:
+            self._store_entry(key, pickled, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._store.lock:
+            if self._live_entry(key) is not None:
+                return False
+            self._store_entry(key, pickled, timeout)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._store.lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(entry[0]) + delta
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self._remove(key)
+            self._store.entries[key] = (pickled, entry[1])
+            self._store.bytes += _entry_size(key, pickled)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._store.lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            self._store.entries[key] = (entry[0], self.get_backend_timeout(timeout))
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._store.lock:
+            if key not in self._store.entries:
+                return False
+            self._remove(key)
+            return True
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._store.lock:
+            return self._live_entry(key) is not None
+
+    def clear(self):
+        with self._store.lock:
+            self._store.entries.clear()
+            self._store.bytes = 0
+
+    def stats(self):
+        store = self._store
+        with store.lock:
+            return {
+                "entries": len(store.entries),
+                "bytes": store.bytes,
+                "max_bytes": self._max_bytes,
+                "hits": store.hits,
+                "misses": store.misses,
+                "evictions": store.evictions,
+            }
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_sqlite_counters = {}
+_sqlite_counters_lock = threading.Lock()
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._busy_timeout = options.get("busy_timeout", 5.0)
+        self._max_bytes = options.get("MAX_BYTES")  # None: bounded by count only
+        self._local = threading.local()
+        with _sqlite_counters_lock:
+            self._counters = _sqlite_counters.setdefault(location, _Counters())
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")
+            }
+            for column, definition in ADDED_COLUMNS.items():
+                if column in columns:
+                    continue
+                try:
+                    conn.execute(
+                        f"ALTER TABLE cache_entries ADD COLUMN {column} {definition}"
+                    )
+                except sqlite3.OperationalError as e:
+                    # Another worker added it first
+                    if "duplicate column" not in str(e):
+                        raise
+            self._local.conn = conn
+        return conn
+
+    def _expiry(self, timeout):
+        # BaseCache returns an absolute expiry timestamp, or None for forever
+        return self.get_backend_timeout(timeout)
+
+    def _read(self, conn, key):
+        row = conn.execute(
+            "SELECT value, expires, accessed FROM cache_entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row
+
+    def _write(self, conn, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(key, value, expires, size, accessed) VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                pickled,
+                self._expiry(timeout),
+                _entry_size(key, pickled),
+                time.time(),
+            ),
+        )
+        self._cull(conn)
+        self._evict_bytes(conn)
+
+    def _stored_bytes(self, conn):
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        return total
+
+    def _evict_bytes(self, conn):
+        # Caller holds the write transaction
+        if self._max_bytes is None:
+            return
+        excess = self._stored_bytes(conn) - self._max_bytes
+        if excess <= 0:
+            return
+        conn.execute(
+            "DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time(),),
+        )
+        excess = self._stored_bytes(conn) - self._max_bytes
+        if excess <= 0:
+            return
+
+        evicted = []
+        rows = conn.execute(
+            "SELECT key, size FROM cache_entries ORDER BY accessed, key"
+        )
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        rows.close()
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", evicted)
+        self._counters.count("evictions", len(evicted))
+
+    def _cull(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if count <= self._max_entries:
+            return
+        conn.execute(
+            "DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time(),),
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if count > self._max_entries:
+            # Same policy as Django's database cache: drop 1/cull_frequency,
+            # soonest-expiring first
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (max(1, count // self._cull_frequency),),
+            )
+            self._counters.count("evictions", cursor.rowcount)
+
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        row = self._read(conn, key)
+        self._counters.count("misses" if row is None else "hits")
+        if row is None:
+            return default
+        now = time.time()
+        if self._max_bytes is not None and row[2] <= now - ACCESS_RESOLUTION:
+            conn.execute(
+                "UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._transaction()
+        try:
+            self._write(conn, key, value, timeout)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._transaction()
+        try:
+            added = self._read(conn, key) is None
+            if added:
+                self._write(conn, key, value, timeout)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return added
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Returns the stored value, storing default first if the key is missing.
+
+        A callable default is evaluated outside the write lock so a slow
+        fetch doesn't block other writers. If another process stores the key
+        in the meantime, its value wins and is returned to every caller.
+        """
+        value = self.get(key, version=version)
+        if value is not None:
+            return value
+
+        if callable(default):
+            default = default()
+        if default is None:
+            return None
+
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._transaction()
+        try:
+            row = self._read(conn, key)
+            if row is None:
+                self._write(conn, key, default, timeout)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return default if row is None else pickle.loads(row[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._transaction()
+        try:
+            row = self._read(conn, key)
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            conn.execute(
+                "UPDATE cache_entries SET value = ?, size = ? WHERE key = ?",
+                (pickled, _entry_size(key, pickled), key),
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        if self._read(conn, key) is None:
+            return False
+        conn.execute(
+            "UPDATE cache_entries SET expires = ? WHERE key = ?",
+            (self._expiry(timeout), key),
+        )
+        return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE key = ?", (key,)
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._read(self._connection(), key) is not None
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def stats(self):
+        conn = self._connection()
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        return {
+            "entries": count,
+            "bytes": self._stored_bytes(conn),
+            "max_bytes": self._max_bytes,
+            **self._counters.snapshot(),
+        }
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; Django calls close() at the
+        # end of each one
+        pass
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import ByteBudgetLRUCache, SQLiteCache
+
+# Roughly the size of a parsed event odds snapshot
+SAMPLE_VALUE = {
+    "event": {"id": "x" * 32, "home_team": "Home", "away_team": "Away"},
+    "bookmakers": [
+        {"key": f"book{i}", "outcomes": [{"name": "Over", "price": 1.91}] * 10}
+        for i in range(8)
+    ],
+}
+
+
+def _make_backend(name, location):
+    params = {"OPTIONS": {"MAX_ENTRIES": 1_000_000, "MAX_BYTES": 256 * 1024 * 1024}}
+    if name == "sqlite":
+        return SQLiteCache(location, params)
+    if name == "lru":
+        return ByteBudgetLRUCache(location, params)
+    return LocMemCache(location, params)
+
+
+def _run_ops(name, location, ops, keys, seed):
+    # Runs in a worker process, so each gets its own backend instance
+    backend = _make_backend(name, location)
+    results = {}
+
+    started = time.perf_counter()
+    for i in range(ops):
+        backend.set(f"bench_{(seed + i) % keys}", SAMPLE_VALUE, 300)
+    results["set"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(ops):
+        backend.get(f"bench_{(seed + i) % keys}")
+    results["get"] = time.perf_counter() - started
+
+    # Each fill stands in for an upstream fetch on a cache miss
+    fills = []
+
+    def fill():
+        fills.append(1)
+        return SAMPLE_VALUE
+
+    started = time.perf_counter()
+    for i in range(ops):
+        backend.get_or_set(f"bench_gos_{i % keys}", fill, 300)
+    results["get_or_set"] = time.perf_counter() - started
+    results["fills"] = len(fills)
+
+    return results
+
+
+class Command(BaseCommand):
+    help = "Measures cache backend throughput across worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=2000, help="Ops per worker")
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Concurrent worker processes"
+        )
+        parser.add_argument("--keys", type=int, default=500, help="Distinct keys")
+
+    def handle(self, *args, **options):
+        ops, workers, keys = options["ops"], options["workers"], options["keys"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            targets = [
+                ("locmem", "bench"),
+                ("lru", "bench"),
+                ("sqlite", os.path.join(tmp, "bench.sqlite3")),
+            ]
+            for name, location in targets:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        pool.submit(_run_ops, name, location, ops, keys, n * ops)
+                        for n in range(workers)
+                    ]
+                    runs = [future.result() for future in futures]
+
+                self.stdout.write(f"{name} ({workers} workers x {ops} ops)")
+                for op in ("set", "get", "get_or_set"):
+                    # Workers run concurrently: throughput over the slowest one
+                    elapsed = max(run[op] for run in runs)
+                    self.stdout.write(
+                        f"  {op:<10} {ops * workers / elapsed:>12,.0f} ops/s"
+                    )
+                # LocMemCache workers each fill every key; a shared cache
+                # fills each key about once
+                fills = sum(run["fills"] for run in runs)
+                self.stdout.write(f"  get_or_set fills {fills} for {keys} keys")
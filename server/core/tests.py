@@ -1,7 +1,20 @@
 import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
-from django.test import TestCase, RequestFactory
-from core.views import fetch_sports, fetch_current_games
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, RequestFactory, override_settings
+from core.cache_backends import ByteBudgetLRUCache, SQLiteCache
+from core.views import cache_status, fetch_sports, fetch_current_games, quota_status
+from odds.utils import upstream
+from odds.utils.budget import budget
 
 
 class SportsViewsTestCase(TestCase):
@@ -11,7 +24,12 @@ class SportsViewsTestCase(TestCase):
         self.sample_sports_data = [{"key": "basketball_nba", "title": "NBA"}]
         self.sample_games_data = [{"id": "game1", "sport_key": "basketball_nba"}]
 
-    @patch("requests.get")
+    def tearDown(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        upstream.breaker.reset()
+
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_sports_success(self, mock_get):
         """Test successful sports fetch"""
         mock_response = MagicMock()
@@ -25,7 +43,7 @@ class SportsViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(json.loads(response.content), self.sample_sports_data)
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_sports_api_failure(self, mock_get):
         """Test API failure (non-200 status)"""
         mock_response = MagicMock()
@@ -42,7 +60,27 @@ class SportsViewsTestCase(TestCase):
             {"error": "Failed to fetch sports", "details": "Server Error"},
         )
 
-    @patch("requests.get")
+    @patch("odds.utils.resilience.time.sleep")
+    @patch("odds.utils.upstream.session.get")
+    def test_fetch_sports_upstream_unreachable(self, mock_get, mock_sleep):
+        """Test connection failures and an open circuit map to 503"""
+        mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+        request = self.factory.get("/fetch_sports/")
+
+        response = fetch_sports(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            json.loads(response.content)["error"], "Failed to fetch sports"
+        )
+
+        for _ in range(upstream.breaker.failure_threshold):
+            upstream.breaker.record_failure()
+        mock_get.reset_mock()
+        response = fetch_sports(request)
+        self.assertEqual(response.status_code, 503)
+        mock_get.assert_not_called()
+
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_current_games_success(self, mock_get):
         """Test successful games fetch"""
         mock_response = MagicMock()
@@ -56,7 +94,25 @@ class SportsViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(json.loads(response.content), self.sample_games_data)
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
+    def test_fetch_current_games_keeps_games_in_progress(self, mock_get):
+        """Test that a game that has already started is still listed"""
+        games = [
+            {"id": "live", "commence_time": "2020-01-01T00:00:00Z"},
+            {"id": "next", "commence_time": "2999-01-01T00:00:00Z"},
+        ]
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = games
+        mock_get.return_value = mock_response
+
+        request = self.factory.get(f"/games/{self.sport}/")
+        response = fetch_current_games(request, self.sport)
+
+        self.assertEqual(json.loads(response.content), games)
+        self.assertNotIn("commenceTimeFrom", mock_get.call_args.kwargs["params"])
+
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_current_games_api_failure(self, mock_get):
         """Test API failure (non-200 status)"""
         mock_response = MagicMock()
@@ -73,7 +129,7 @@ class SportsViewsTestCase(TestCase):
             {"error": "Failed to fetch games", "details": "Not Found"},
         )
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_current_games_connection_error(self, mock_get):
         """Test network failure (e.g., connection error)"""
         mock_get.side_effect = Exception("Connection failed")
@@ -86,3 +142,207 @@ class SportsViewsTestCase(TestCase):
             json.loads(response.content),
             {"error": "An unexpected error occurred"},
         )
+
+
+class QuotaStatusViewTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        budget.reset()
+        upstream.breaker.reset()
+
+    @patch("odds.utils.upstream.session.get")
+    def test_quota_status_reports_upstream_headers(self, mock_get):
+        """Test that the ops endpoint exposes the last seen quota headers"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = []
+        mock_response.headers = {
+            "x-requests-remaining": "480",
+            "x-requests-used": "20",
+            "x-requests-last": "1",
+        }
+        mock_get.return_value = mock_response
+
+        fetch_sports(self.factory.get("/fetch_sports/"))
+        response = quota_status(self.factory.get("/ops/quota/"))
+
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["remaining"], 480)
+        self.assertEqual(data["usage"][0]["endpoint"], "/v4/sports/")
+        self.assertGreater(data["ttl_multiplier"], 1)
+
+
+class SQLiteCacheTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.tmp.name, "cache.sqlite3")
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_set_get_delete(self):
+        """Test the basic cache operations round-trip values"""
+        self.cache.set("odds", {"price": 1.91}, 60)
+
+        self.assertEqual(self.cache.get("odds"), {"price": 1.91})
+        self.assertTrue(self.cache.delete("odds"))
+        self.assertIsNone(self.cache.get("odds"))
+
+    def test_expired_entries_are_misses(self):
+        """Test that entries past their timeout read as missing"""
+        self.cache.set("odds", 1, 60)
+        with patch("core.cache_backends.time.time", return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get("odds"))
+            self.assertTrue(self.cache.add("odds", 2, 60))
+
+    def test_entries_are_shared_between_instances(self):
+        """Test that separate backend instances (processes) see each other's writes"""
+        other = SQLiteCache(self.location, {})
+        self.cache.set("odds", "snapshot", 60)
+
+        self.assertEqual(other.get("odds"), "snapshot")
+        self.assertFalse(other.add("odds", "other", 60))
+
+    def test_concurrent_get_or_set_agrees_on_one_value(self):
+        """Test that racing get_or_set callers all return the first stored value"""
+
+        def race(n):
+            backend = SQLiteCache(self.location, {})
+            return backend.get_or_set("odds", lambda: n, 60)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(race, range(8)))
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.cache.get("odds"), results[0])
+
+    def test_incr_is_atomic(self):
+        """Test that concurrent increments are not lost"""
+        self.cache.set("hits", 0, 60)
+
+        def bump(_):
+            SQLiteCache(self.location, {}).incr("hits")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(bump, range(40)))
+
+        self.assertEqual(self.cache.get("hits"), 40)
+
+    def test_culls_past_max_entries(self):
+        """Test that the cache stays bounded by MAX_ENTRIES"""
+        cache = SQLiteCache(self.location, {"OPTIONS": {"MAX_ENTRIES": 10}})
+        for i in range(30):
+            cache.set(f"key{i}", i, 60 + i)
+
+        self.assertLessEqual(sum(cache.has_key(f"key{i}") for i in range(30)), 10)
+        self.assertEqual(cache.get("key29"), 29)
+
+    def test_evicts_least_recently_read_within_byte_budget(self):
+        """Test that MAX_BYTES evicts the least recently read entries first"""
+        value = "x" * 100
+        # Sizes count the versioned key, e.g. ":1:a"
+        entry_bytes = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) + 4
+        cache = SQLiteCache(self.location, {"OPTIONS": {"MAX_BYTES": 3 * entry_bytes}})
+        clock = time.time()
+        with patch("core.cache_backends.time.time") as mock_time:
+            for key in ("a", "b", "c"):
+                clock += 2
+                mock_time.return_value = clock
+                cache.set(key, value, 60)
+            mock_time.return_value = clock + 2
+            cache.get("a")
+            mock_time.return_value = clock + 4
+            cache.set("d", value, 60)
+
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(cache.get("a"), value)
+            stats = cache.stats()
+        self.assertEqual(stats["bytes"], 3 * entry_bytes)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_adds_size_columns_to_existing_cache_files(self):
+        """Test that a cache file from before the byte budget is upgraded"""
+        conn = sqlite3.connect(self.location)
+        conn.execute(
+            "CREATE TABLE cache_entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+        conn.close()
+
+        cache = SQLiteCache(self.location, {"OPTIONS": {"MAX_BYTES": 10_000}})
+        cache.set("odds", {"price": 1.91}, 60)
+
+        self.assertEqual(cache.get("odds"), {"price": 1.91})
+        self.assertGreater(cache.stats()["bytes"], 0)
+
+
+class ByteBudgetLRUCacheTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.value = "x" * 100
+        self.entry_bytes = len(pickle.dumps(self.value, pickle.HIGHEST_PROTOCOL))
+
+    def _cache(self, name, max_bytes):
+        return ByteBudgetLRUCache(name, {"OPTIONS": {"MAX_BYTES": max_bytes}})
+
+    def test_evicts_least_recently_used_within_byte_budget(self):
+        """Test that the byte budget evicts the least recently read entry"""
+        # Room for three entries (keys are a few bytes each)
+        cache = self._cache("lru-order", 3 * (self.entry_bytes + 10))
+        for key in ("a", "b", "c"):
+            cache.set(key, self.value, 60)
+        cache.get("a")
+        cache.set("d", self.value, 60)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), self.value)
+        self.assertLessEqual(cache.stats()["bytes"], cache.stats()["max_bytes"])
+
+    def test_counts_hits_misses_and_evictions(self):
+        """Test the per-alias counters"""
+        cache = self._cache("lru-counters", self.entry_bytes + 10)
+        cache.set("a", self.value, 60)
+        cache.get("a")
+        cache.get("missing")
+        cache.set("b", self.value, 60)
+
+        stats = cache.stats()
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 1)
+        )
+        self.assertEqual(stats["entries"], 1)
+
+    def test_instances_with_same_location_share_entries(self):
+        """Test that per-thread backend instances share one store"""
+        self._cache("lru-shared", 1024).set("a", 1, 60)
+        self.assertEqual(self._cache("lru-shared", 1024).get("a"), 1)
+
+    @override_settings(
+        CACHES={
+            alias: {
+                "BACKEND": "core.cache_backends.ByteBudgetLRUCache",
+                "LOCATION": f"test-{alias}",
+                "OPTIONS": {"MAX_BYTES": 1024 * 1024},
+            }
+            for alias in ("default", "sessions")
+        }
+    )
+    def test_odds_and_sessions_use_separate_aliases(self):
+        """Test that filling the sessions alias doesn't evict parsed odds"""
+        caches["default"].set("event_odds_test", {"odds": 1}, 60)
+        for i in range(20):
+            caches["sessions"].set(f"session{i}", "x" * 100_000, 60)
+
+        self.assertEqual(caches["default"].get("event_odds_test"), {"odds": 1})
+        response = cache_status(self.factory.get("/ops/cache/"))
+        data = json.loads(response.content)["caches"]
+        self.assertGreater(data["sessions"]["evictions"], 0)
+        self.assertEqual(data["default"]["evictions"], 0)
+
+    def tearDown(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
@@ -9,4 +9,7 @@ urlpatterns = [
         views.fetch_current_games,
         name="fetch-current-games",
     ),
+    path("ops/quota/", views.quota_status, name="quota-status"),
+    path("ops/upstream/", views.upstream_status, name="upstream-status"),
+    path("ops/cache/", views.cache_status, name="cache-status"),
 ]
@@ -1,15 +1,25 @@
 import requests
 from django.conf import settings
+from django.core.cache import caches
 from django.http import JsonResponse, HttpResponse
 
-# Create your views here.
+from odds.utils.budget import budget
+from odds.utils.cache_helpers import UpstreamError, cached_odds_api_get
+from odds.utils.request_planner import events_query
+from odds.utils.resilience import breaker_states
+from odds.utils.upstream import odds_api_get
 
-ODDS_BASE_URL = "https://api.the-odds-api.com"
+# Create your views here.
 
 
 def fetch_sports(request):
-    url = f"{ODDS_BASE_URL}/v4/sports/?apiKey={settings.API_KEY}"
-    response = requests.get(url)
+    try:
+        response = odds_api_get("/v4/sports/", consumer="sports")
+    except requests.exceptions.RequestException as e:
+        # Also covers CircuitOpenError while the Odds API circuit is open
+        return JsonResponse(
+            {"error": "Failed to fetch sports", "details": str(e)}, status=503
+        )
 
     if response.status_code != 200:
         return JsonResponse(
@@ -21,15 +31,37 @@ def fetch_sports(request):
 
 
 def fetch_current_games(request, sport):
-    url = f"{ODDS_BASE_URL}/v4/sports/{sport}/events?apiKey={settings.API_KEY}"
-
     try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return JsonResponse(
-                {"error": "Failed to fetch games", "details": response.text},
-                status=response.status_code,
-            )
-        return JsonResponse(response.json(), safe=False)
+        # Shares the events snapshot published by ingest_odds
+        games, _ = cached_odds_api_get(
+            f"events_{sport}",
+            f"/v4/sports/{sport}/events",
+            params=events_query(),
+            ttl=300,
+            consumer="current_games",
+        )
+        return JsonResponse(games, safe=False)
+    except UpstreamError as e:
+        return JsonResponse(
+            {"error": "Failed to fetch games", "details": e.details},
+            status=e.status,
+        )
     except Exception:
         return JsonResponse({"error": "An unexpected error occurred"}, status=500)
+
+
+# Ops: Odds API credit usage, burn rate, cache TTL stretch and bytes per consumer
+def quota_status(request):
+    return JsonResponse(budget.snapshot())
+
+
+# Ops: circuit breaker state for each upstream (odds_api, nba_stats)
+def upstream_status(request):
+    return JsonResponse({"breakers": breaker_states()})
+
+
+# Ops: per-alias cache hit, miss and eviction counters for this worker
+def cache_status(request):
+    return JsonResponse(
+        {"caches": {alias: caches[alias].stats() for alias in settings.CACHES}}
+    )
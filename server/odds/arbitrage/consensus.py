@@ -0,0 +1,206 @@
+"""
+Rolling consensus store for value bets.
+
+Keeps every quote on the slate keyed by (event, market, player, line) and,
+per line, each complete book's de-vigged probabilities (see
+odds/arbitrage/value.py). A price change only re-derives that book's
+probabilities and the line's consensus from the stored ones, in
+O(books x outcomes) without touching the rest of the slate. The consensus
+is summed afresh from those probabilities rather than kept as a running
+total, so it never drifts from find_value_bets however many updates a line
+sees. Only the line's quotes are re-scored, and only the changed book's
+quotes when the consensus didn't move. Each change comes back as an added,
+removed or changed delta.
+
+Lines are grouped as in odds/arbitrage/markets.py, and the value bets match
+find_value_bets on the same quotes. Updates and snapshot syncs come from
+SlateSync (odds/arbitrage/sync.py).
+"""
+
+import math
+
+from odds.arbitrage.markets import outcome_group
+from odds.arbitrage.sync import BOOK, LINE, SlateSync
+
+
+class _Line:
+    def __init__(self):
+        self.quotes = {}  # bookmaker -> outcome name -> quote
+        self.counts = {}  # outcome name -> books quoting it
+        self.fair = {}  # complete bookmaker -> outcome name -> fair probability
+        self._consensus = {}  # outcome name -> mean fair probability
+
+    def listed(self):
+        return {name for name, count in self.counts.items() if count}
+
+    def quoted(self):
+        return [(b, name) for b, quotes in self.quotes.items() for name in quotes]
+
+    def consensus(self):
+        """Fair probability per outcome, or {} while no book is complete."""
+        return dict(self._consensus)
+
+    def contribute(self, bookmaker):
+        # Re-derives bookmaker's de-vigged probabilities and the consensus
+        self._devig(bookmaker)
+        self._resum()
+
+    def rebuild(self):
+        # The outcomes listed changed, so every book's completeness may have
+        self.fair = {}
+        for bookmaker in self.quotes:
+            self._devig(bookmaker)
+        self._resum()
+
+    def _devig(self, bookmaker):
+        self.fair.pop(bookmaker, None)
+        quotes = self.quotes.get(bookmaker, {})
+        if len(quotes) < 2 or set(quotes) != self.listed():
+            return
+        overround = math.fsum(1 / quote["price"] for quote in quotes.values())
+        self.fair[bookmaker] = {
+            name: 1 / quote["price"] / overround for name, quote in quotes.items()
+        }
+
+    def _resum(self):
+        # Summed afresh from the stored probabilities; fsum is exact, so the
+        # result doesn't depend on the order books arrived in
+        self._consensus = {}
+        for name in self.listed() if self.fair else ():
+            total = math.fsum(fair[name] for fair in self.fair.values())
+            self._consensus[name] = total / len(self.fair)
+
+
+class ConsensusStore(SlateSync):
+    def __init__(self, threshold=5.0):
+        super().__init__()
+        self.threshold = threshold
+        self._value_bets = {}  # line key -> (bookmaker, outcome name) -> entry
+
+    def consensus(self, key):
+        """Fair probability per outcome on a line key."""
+        with self._lock:
+            line = self._lines.get(key)
+            return line.consensus() if line is not None else {}
+
+    def value_bets(self):
+        """Current value bets, highest value first."""
+        with self._lock:
+            entries = [e for line in self._value_bets.values() for e in line.values()]
+        return sorted(entries, key=lambda x: x["value_percentage"], reverse=True)
+
+    def _set_quote(self, game, market_key, bookmaker, outcome):
+        # Returns (line key, change): None if nothing changed, LINE if the
+        # consensus moved and BOOK if only the book's quotes need re-scoring
+        price = outcome.get("price")
+        placed = outcome_group(game, market_key, outcome)
+        if not price or placed is None:
+            return None, None
+
+        group, name = placed
+        key = (game["id"], *group)
+        self._games.setdefault(game["id"], game)
+        line = self._lines.setdefault(key, _Line())
+        quotes = line.quotes.setdefault(bookmaker, {})
+
+        current = quotes.get(name)
+        if current is not None and current["price"] == price:
+            return key, None
+
+        quotes[name] = {"price": price, "point": outcome.get("point")}
+        if current is not None:
+            before = line.consensus()
+            line.contribute(bookmaker)
+            return key, LINE if line.consensus() != before else BOOK
+
+        # A new quote changes how many books an outcome has (and may list it)
+        line.counts[name] = line.counts.get(name, 0) + 1
+        if line.counts[name] == 1:
+            line.rebuild()
+        else:
+            line.contribute(bookmaker)
+        return key, LINE
+
+    def _remove_quote(self, key, bookmaker, name):
+        line = self._lines.get(key)
+        if line is None or name not in line.quotes.get(bookmaker, {}):
+            return
+        del line.quotes[bookmaker][name]
+        if not line.quotes[bookmaker]:
+            del line.quotes[bookmaker]
+
+        line.counts[name] -= 1
+        if not line.counts[name]:
+            del line.counts[name]
+            line.rebuild()
+        else:
+            line.contribute(bookmaker)
+        if not line.quotes:
+            del self._lines[key]
+
+    def _entry(self, key, bookmaker, name, quote, value, fair):
+        game = self._games[key[0]]
+        market_key, player, _ = key[1:]
+        entry = {
+            "team": name,
+            "bookmaker": bookmaker,
+            "odds": quote["price"],
+            "consensus_odds": round(1 / fair, 2),
+            "value_percentage": round(value, 2),
+            "game": {
+                "home_team": game["home_team"],
+                "away_team": game["away_team"],
+                "commence_time": game["commence_time"],
+            },
+        }
+        if market_key != "h2h":
+            entry.update(market=market_key, player=player, point=quote["point"])
+        return entry
+
+    def _evaluate(self, key, bookmaker=None):
+        # Re-scores the line's quotes, or only bookmaker's when given
+        line = self._lines.get(key)
+        current = {}
+        if line is not None:
+            consensus = line.consensus()
+            books = line.quotes if bookmaker is None else [bookmaker]
+            for book in books:
+                for name, quote in line.quotes.get(book, {}).items():
+                    # As in find_value_bets, an outcome needs two quotes
+                    if name not in consensus or line.counts[name] < 2:
+                        continue
+                    fair = consensus[name]
+                    value = (fair / (1 / quote["price"]) - 1) * 100
+                    if value >= self.threshold:
+                        current[(book, name)] = self._entry(
+                            key, book, name, quote, value, fair
+                        )
+
+        stored = self._value_bets.setdefault(key, {})
+        previous = {
+            quote: entry
+            for quote, entry in stored.items()
+            if bookmaker is None or quote[0] == bookmaker
+        }
+
+        deltas = []
+        for quote, entry in previous.items():
+            if quote not in current:
+                del stored[quote]
+                deltas.append(
+                    {"change": "removed", "key": (key, *quote), "value_bet": entry}
+                )
+        for quote, entry in current.items():
+            before = previous.get(quote)
+            stored[quote] = entry
+            if before is None:
+                deltas.append(
+                    {"change": "added", "key": (key, *quote), "value_bet": entry}
+                )
+            elif before != entry:
+                deltas.append(
+                    {"change": "changed", "key": (key, *quote), "value_bet": entry}
+                )
+        if not stored:
+            del self._value_bets[key]
+        return deltas
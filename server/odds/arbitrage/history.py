@@ -0,0 +1,376 @@
+"""
+Arbitrage history store.
+
+Every arbitrage the scanners detect is recorded in a local SQLite file
+(settings.ARBITRAGE_HISTORY_PATH; recording is off when it's unset) as one
+row per lifetime: first seen, last seen, number of sightings and first, peak
+and last profit. A sighting more than settings.ARBITRAGE_HISTORY_GAP seconds
+after the previous one starts a new lifetime. Queries report how long
+arbitrage survives per book pair and market, i.e. how fast the detection
+loop needs to be to act on it.
+
+What is measured is the full detected set, not just the few entries a view
+shows: every line whose best prices are in arbitrage, recorded once any live
+recheck is done (see with_verification()). Lines the recheck found gone are
+left out, and confirmed lines are recorded at their live prices. Survival is
+seen at scan resolution, so it is a lower bound by up to one scan interval.
+
+record() only queues the opportunities; a background thread drains the
+queue and writes each batch in a single transaction, so recording never
+blocks a scan. If the queue is full the batch is dropped and counted.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+from odds.arbitrage.markets import entry_sides
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS arbitrage_history (
+    id INTEGER PRIMARY KEY,
+    arb_key TEXT NOT NULL,
+    market TEXT NOT NULL,
+    event TEXT NOT NULL,
+    commence_time TEXT,
+    player TEXT,
+    line REAL,
+    book_pair TEXT NOT NULL,
+    sides TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    sightings INTEGER NOT NULL,
+    first_profit REAL NOT NULL,
+    peak_profit REAL NOT NULL,
+    last_profit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS arbitrage_books (
+    arb_id INTEGER NOT NULL REFERENCES arbitrage_history (id),
+    bookmaker TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS arbitrage_history_key
+    ON arbitrage_history (arb_key, last_seen);
+CREATE INDEX IF NOT EXISTS arbitrage_history_event ON arbitrage_history (event);
+CREATE INDEX IF NOT EXISTS arbitrage_history_player ON arbitrage_history (player);
+CREATE INDEX IF NOT EXISTS arbitrage_history_first_seen
+    ON arbitrage_history (first_seen);
+CREATE INDEX IF NOT EXISTS arbitrage_books_bookmaker
+    ON arbitrage_books (bookmaker, arb_id);
+"""
+
+# Batches waiting for the writer; beyond this record() drops them
+MAX_PENDING_BATCHES = 1000
+
+
+def arb_key(entry):
+    """Identifies an arbitrage: the line plus which book takes which side."""
+    sides = [(side["name"], side["bookmaker"]) for side in entry_sides(entry)]
+    return json.dumps(
+        [entry["type"], entry["event"], entry["player"], entry["line"], sides]
+    )
+
+
+def _line_key(entry):
+    return (entry["type"], entry["event"], entry["player"], entry["line"])
+
+
+def with_verification(detected, kept=(), dropped=()):
+    """
+    The detected arbitrage as a live recheck left it.
+
+    Args:
+        detected (list): Every arbitrage entry the scan found
+        kept (list): Rechecked entries (confirmed ones carry live prices)
+        dropped (list): Rechecked entries that are no longer arbitrage
+
+    Returns:
+        list: detected without the dropped lines, with confirmed lines
+              replaced by their rechecked entries
+    """
+    confirmed = {}
+    for entry in kept:
+        if entry.get("verification") == "confirmed":
+            confirmed.setdefault(_line_key(entry), []).append(entry)
+    gone = {_line_key(entry) for entry in dropped} - set(confirmed)
+
+    recorded = []
+    for entry in detected:
+        line = _line_key(entry)
+        if line not in gone and line not in confirmed:
+            recorded.append(entry)
+    recorded.extend(entry for entries in confirmed.values() for entry in entries)
+    return recorded
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class ArbitrageHistory:
+    def __init__(self, path=None):
+        # None reads settings.ARBITRAGE_HISTORY_PATH on use
+        self._path = path
+        self._queue = queue.Queue(maxsize=MAX_PENDING_BATCHES)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+        self.dropped = 0
+
+    @property
+    def path(self):
+        return self._path if self._path is not None else settings.ARBITRAGE_HISTORY_PATH
+
+    def record(self, opportunities, seen_at=None):
+        """Queues arbitrage entries (side_N and profit_percent) for storage."""
+        if not opportunities or not self.path:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((self.path, seen_at or time.time(), opportunities))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Blocks until every queued batch has been written."""
+        self._queue.join()
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        connections = {}
+        while True:
+            batches = [self._queue.get()]
+            # Coalesce whatever else is waiting into the same transaction
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            by_path = {}
+            for path, seen_at, opportunities in batches:
+                by_path.setdefault(path, []).append((seen_at, opportunities))
+            try:
+                for path, path_batches in by_path.items():
+                    if path not in connections:
+                        connections[path] = _connect(path)
+                    self._write(connections[path], path_batches)
+            except Exception as e:
+                logger.warning("arbitrage history write failed: %s", e)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _write(self, conn, batches):
+        gap = settings.ARBITRAGE_HISTORY_GAP
+        # arb_key -> latest lifetime row, as stored or as updated in this batch
+        latest = {}
+        new_rows = []
+        updates = {}  # id -> updated stored row
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for seen_at, opportunities in sorted(batches, key=lambda b: b[0]):
+                for entry in opportunities:
+                    key = arb_key(entry)
+                    profit = entry["profit_percent"]
+                    if key not in latest:
+                        stored = conn.execute(
+                            "SELECT id, last_seen, sightings, peak_profit "
+                            "FROM arbitrage_history WHERE arb_key = ? "
+                            "ORDER BY last_seen DESC LIMIT 1",
+                            (key,),
+                        ).fetchone()
+                        latest[key] = None if stored is None else dict(stored)
+
+                    row = latest[key]
+                    if row is not None and seen_at - row["last_seen"] <= gap:
+                        if seen_at <= row["last_seen"]:
+                            continue
+                        row["last_seen"] = seen_at
+                        row["sightings"] += 1
+                        row["peak_profit"] = max(row["peak_profit"], profit)
+                        row["last_profit"] = profit
+                        if row["id"] is not None:
+                            updates[row["id"]] = row
+                        continue
+
+                    sides = entry_sides(entry)
+                    row = latest[key] = {
+                        "id": None,
+                        "last_seen": seen_at,
+                        "sightings": 1,
+                        "peak_profit": profit,
+                        "last_profit": profit,
+                        "values": {
+                            "arb_key": key,
+                            "market": entry["type"],
+                            "event": entry["event"],
+                            "commence_time": entry.get("commence_time"),
+                            "player": entry.get("player"),
+                            "line": entry.get("line"),
+                            "book_pair": " / ".join(
+                                sorted(side["bookmaker"] for side in sides)
+                            ),
+                            "sides": json.dumps(sides),
+                            "first_seen": seen_at,
+                            "first_profit": profit,
+                        },
+                        "books": {side["bookmaker"] for side in sides},
+                    }
+                    new_rows.append(row)
+
+            conn.executemany(
+                "UPDATE arbitrage_history SET last_seen = ?, sightings = ?, "
+                "peak_profit = ?, last_profit = ? WHERE id = ?",
+                [
+                    (
+                        row["last_seen"],
+                        row["sightings"],
+                        row["peak_profit"],
+                        row["last_profit"],
+                        row_id,
+                    )
+                    for row_id, row in updates.items()
+                ],
+            )
+
+            books = []
+            for row in new_rows:
+                # Insert one at a time so each row's own id links its books
+                cursor = conn.execute(
+                    "INSERT INTO arbitrage_history (arb_key, market, event, "
+                    "commence_time, player, line, book_pair, sides, first_seen, "
+                    "last_seen, sightings, first_profit, peak_profit, last_profit) "
+                    "VALUES (:arb_key, :market, :event, :commence_time, :player, "
+                    ":line, :book_pair, :sides, :first_seen, :last_seen, "
+                    ":sightings, :first_profit, :peak_profit, :last_profit)",
+                    {
+                        **row["values"],
+                        "last_seen": row["last_seen"],
+                        "sightings": row["sightings"],
+                        "peak_profit": row["peak_profit"],
+                        "last_profit": row["last_profit"],
+                    },
+                )
+                books.extend((cursor.lastrowid, book) for book in row["books"])
+            conn.executemany(
+                "INSERT INTO arbitrage_books (arb_id, bookmaker) VALUES (?, ?)", books
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connection(self):
+        # Readers keep one connection per thread and path
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.path != self.path:
+            conn = _connect(self.path)
+            self._local.conn, self._local.path = conn, self.path
+        return conn
+
+    def lifetimes(self, event=None, player=None, bookmaker=None, market=None, limit=50):
+        """
+        Recorded arbitrage lifetimes, most recently seen first.
+
+        Returns:
+            list: Rows with the line, book pair, sides, first/last seen,
+                  survival_seconds, sightings and first/peak/last profit
+        """
+        if not self.path:
+            return []
+
+        where, params = [], []
+        for column, value in (("event", event), ("player", player), ("market", market)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if bookmaker is not None:
+            where.append(
+                "id IN (SELECT arb_id FROM arbitrage_books WHERE bookmaker = ?)"
+            )
+            params.append(bookmaker)
+
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT market, event, commence_time, player, line, book_pair, sides, "
+                "first_seen, last_seen, last_seen - first_seen AS survival_seconds, "
+                "sightings, first_profit, peak_profit, last_profit "
+                "FROM arbitrage_history"
+                + (" WHERE " + " AND ".join(where) if where else "")
+                + " ORDER BY last_seen DESC LIMIT ?",
+                (*params, limit),
+            )
+            .fetchall()
+        )
+        return [{**dict(row), "sides": json.loads(row["sides"])} for row in rows]
+
+    def survival(self, since=None, market=None):
+        """
+        How long arbitrage survives, per book pair and market.
+
+        Args:
+            since (float): Only lifetimes first seen at or after this timestamp
+            market (str): Only this market
+
+        Returns:
+            list: Per (book_pair, market): lifetimes, still_open (seen within
+                  the gap, so their survival is a lower bound),
+                  single_sightings (gone by the next scan), average and max
+                  survival_seconds and average peak_profit; most lifetimes
+                  first
+        """
+        if not self.path:
+            return []
+
+        where, params = ["first_seen >= ?"], [since or 0]
+        if market is not None:
+            where.append("market = ?")
+            params.append(market)
+
+        open_after = time.time() - settings.ARBITRAGE_HISTORY_GAP
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT book_pair, market, COUNT(*) AS lifetimes, "
+                "SUM(last_seen >= ?) AS still_open, "
+                "SUM(sightings = 1) AS single_sightings, "
+                "AVG(last_seen - first_seen) AS avg_survival_seconds, "
+                "MAX(last_seen - first_seen) AS max_survival_seconds, "
+                "AVG(peak_profit) AS avg_peak_profit "
+                "FROM arbitrage_history WHERE " + " AND ".join(where) + " "
+                "GROUP BY book_pair, market ORDER BY lifetimes DESC, book_pair",
+                (open_after, *params),
+            )
+            .fetchall()
+        )
+        return [
+            {
+                **dict(row),
+                "avg_survival_seconds": round(row["avg_survival_seconds"], 1),
+                "max_survival_seconds": round(row["max_survival_seconds"], 1),
+                "avg_peak_profit": round(row["avg_peak_profit"], 2),
+            }
+            for row in rows
+        ]
+
+
+arbitrage_history = ArbitrageHistory()
@@ -0,0 +1,175 @@
+"""
+Incremental arbitrage index.
+
+Keeps every quote on the slate keyed by (event, market, player, line, side)
+and the current arbitrage opportunity per line. A single quote update costs
+O(log books) on its side's price heap and re-evaluates only that line, so
+detection work follows what moved rather than the size of the slate. Each
+change comes back as an added, removed or changed delta.
+
+Lines are grouped as in odds/arbitrage/markets.py, and the opportunities
+match find_market_arbitrage on the same quotes. Updates and snapshot syncs
+come from SlateSync (odds/arbitrage/sync.py).
+"""
+
+import heapq
+
+from odds.arbitrage.markets import opportunity_entry, outcome_group
+from odds.arbitrage.sync import LINE, SlateSync
+
+
+class _SidePrices:
+    """One outcome's quotes across books, best price on top of a heap."""
+
+    def __init__(self):
+        self.quotes = {}  # bookmaker -> quote
+        self._heap = []  # (-price, bookmaker); stale entries dropped lazily
+
+    def set(self, bookmaker, quote):
+        self.quotes[bookmaker] = quote
+        heapq.heappush(self._heap, (-quote["price"], bookmaker))
+        if len(self._heap) > 2 * len(self.quotes) + 8:
+            self._heap = [(-q["price"], b) for b, q in self.quotes.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, bookmaker):
+        self.quotes.pop(bookmaker, None)
+
+    def _is_current(self, item):
+        quote = self.quotes.get(item[1])
+        return quote is not None and -quote["price"] == item[0]
+
+    def best(self):
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self.quotes[self._heap[0][1]] if self._heap else None
+
+    def second_best(self):
+        """Best quote from a different bookmaker than best()."""
+        if self.best() is None:
+            return None
+        top = heapq.heappop(self._heap)
+        while self._heap and (
+            not self._is_current(self._heap[0]) or self._heap[0][1] == top[1]
+        ):
+            heapq.heappop(self._heap)
+        second = self.quotes[self._heap[0][1]] if self._heap else None
+        heapq.heappush(self._heap, top)
+        return second
+
+
+class _Line:
+    def __init__(self):
+        self.sides = {}  # outcome name -> _SidePrices
+        self.listed = {}  # bookmaker -> outcome names it prices on this line
+
+    def quoted(self):
+        return [(b, name) for name, side in self.sides.items() for b in side.quotes]
+
+
+class ArbitrageIndex(SlateSync):
+    def __init__(self, include_same_book=True):
+        super().__init__()
+        self.include_same_book = include_same_book
+        self._opportunities = {}  # line key -> entry
+
+    def opportunities(self):
+        """Current opportunities, most profitable first."""
+        with self._lock:
+            entries = list(self._opportunities.values())
+        return sorted(entries, key=lambda x: x["profit_percent"], reverse=True)
+
+    def _set_quote(self, game, market_key, bookmaker, outcome):
+        # Returns (line key, LINE if the quote changed, else None)
+        price = outcome.get("price")
+        placed = outcome_group(game, market_key, outcome)
+        if not price or placed is None:
+            return None, None
+
+        group, name = placed
+        key = (game["id"], *group)
+        self._games.setdefault(game["id"], game)
+        line = self._lines.setdefault(key, _Line())
+        side = line.sides.setdefault(name, _SidePrices())
+        line.listed.setdefault(bookmaker, set()).add(name)
+
+        current = side.quotes.get(bookmaker)
+        if current is not None and current["price"] == price:
+            return key, None
+
+        side.set(
+            bookmaker,
+            {
+                "name": name,
+                "bookmaker": bookmaker,
+                "price": price,
+                "point": outcome.get("point"),
+            },
+        )
+        return key, LINE
+
+    def _remove_quote(self, key, bookmaker, name):
+        line = self._lines.get(key)
+        if line is None or name not in line.sides:
+            return
+        side = line.sides[name]
+        side.remove(bookmaker)
+        if not side.quotes:
+            del line.sides[name]
+        listed = line.listed.get(bookmaker, set())
+        listed.discard(name)
+        if not listed:
+            line.listed.pop(bookmaker, None)
+        if not line.listed:
+            del self._lines[key]
+
+    def _best_quotes(self, line):
+        quotes = [side.best() for side in line.sides.values()]
+        if any(quote is None for quote in quotes):
+            return None
+        if self.include_same_book or len(quotes) != 2:
+            return quotes
+        if quotes[0]["bookmaker"] != quotes[1]["bookmaker"]:
+            return quotes
+
+        # Both best prices at one book: pair each with the other side's runner-up
+        first, second = line.sides.values()
+        candidates = [
+            pair
+            for pair in (
+                [quotes[0], second.second_best()],
+                [first.second_best(), quotes[1]],
+            )
+            if None not in pair
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda pair: sum(1 / q["price"] for q in pair))
+
+    def _evaluate(self, key):
+        entry = None
+        line = self._lines.get(key)
+        if line is not None:
+            # Every outcome of the market must be priced to cover all results
+            expected = max(2, max(map(len, line.listed.values()), default=0))
+            quotes = self._best_quotes(line) if len(line.sides) >= expected else None
+            if quotes:
+                total = sum(1 / quote["price"] for quote in quotes)
+                if total < 1:
+                    entry = opportunity_entry(
+                        self._games[key[0]], key[1:], quotes, total
+                    )
+
+        previous = self._opportunities.get(key)
+        if entry is None:
+            if previous is None:
+                return []
+            del self._opportunities[key]
+            return [{"change": "removed", "key": key, "opportunity": previous}]
+
+        self._opportunities[key] = entry
+        if previous is None:
+            return [{"change": "added", "key": key, "opportunity": entry}]
+        if previous != entry:
+            return [{"change": "changed", "key": key, "opportunity": entry}]
+        return []
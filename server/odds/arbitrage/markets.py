@@ -0,0 +1,130 @@
+"""
+Market-agnostic arbitrage across N-outcome markets.
+
+Every market is reduced to groups of mutually exclusive outcomes that cover
+all results, and each outcome to its best price across books, in one pass
+over the slate:
+
+    h2h       one group per game; 2 outcomes, or 3 with a draw
+    spreads   home team at +p paired with away team at -p
+    totals    Over and Under at the same point
+    props     the same, per player (outcome description)
+
+A group is an arbitrage when the best prices' implied probabilities sum to
+less than 1.
+"""
+
+from odds.arbitrage.utils import BOOKMAKER_URLS
+
+OVER_UNDER = ("Over", "Under")
+
+
+def outcome_group(game, market_key, outcome):
+    """
+    Returns the (group key, outcome key) an outcome is priced under, or None
+    if it can't be placed. Opposite spreads share a group keyed by the home
+    team's point.
+    """
+    name = outcome.get("name")
+    point = outcome.get("point")
+    if not name:
+        return None
+
+    line = point
+    if point is not None and name not in OVER_UNDER:
+        line = point if name == game["home_team"] else -point
+
+    return (market_key, outcome.get("description"), line), name
+
+
+def entry_sides(entry):
+    """An arbitrage entry's side_N quotes, in side order."""
+    return [entry[key] for key in sorted(entry) if key.startswith("side_")]
+
+
+def opportunity_entry(game, group, quotes, total):
+    """Builds an arbitrage entry with one side_N per outcome quote."""
+    market_key, player, line = group
+    entry = {
+        "type": market_key,
+        "event": f"{game['home_team']} vs {game['away_team']}",
+        "commence_time": game["commence_time"],
+        "player": player,
+        "line": line,
+    }
+    for n, quote in enumerate(quotes, start=1):
+        entry[f"side_{n}"] = {**quote, "site": BOOKMAKER_URLS.get(quote["bookmaker"])}
+    entry["implied_total"] = round(total, 3)
+    entry["profit_percent"] = round((1 - total) * 100, 2)
+    return entry
+
+
+def _best_prices(game, markets):
+    # group -> outcome -> best quote, plus the most outcomes any book lists
+    best = {}
+    outcome_counts = {}
+
+    for bookmaker in game.get("bookmakers", []):
+        title = bookmaker["title"]
+        for market in bookmaker.get("markets", []):
+            if market["key"] not in markets:
+                continue
+
+            listed = {}
+            for outcome in market.get("outcomes", []):
+                price = outcome.get("price")
+                placed = outcome_group(game, market["key"], outcome)
+                if not price or placed is None:
+                    continue
+
+                group, name = placed
+                listed[group] = listed.get(group, 0) + 1
+                quotes = best.setdefault(group, {})
+                if name not in quotes or price > quotes[name]["price"]:
+                    quotes[name] = {
+                        "name": name,
+                        "bookmaker": title,
+                        "price": price,
+                        "point": outcome.get("point"),
+                    }
+
+            for group, count in listed.items():
+                outcome_counts[group] = max(outcome_counts.get(group, 0), count)
+
+    return best, outcome_counts
+
+
+def find_market_arbitrage(games, markets=("h2h",), max_implied_total=1.0):
+    """
+    Finds arbitrage across every game and market in one pass.
+
+    Args:
+        games (list): Odds payloads with bookmakers and markets
+        markets (iterable): Market keys to scan, e.g. ("h2h", "spreads")
+        max_implied_total (float): Keep groups whose best prices' implied
+            probabilities sum to less than this; 1.0 keeps only arbitrage
+
+    Returns:
+        list: Entries with side_1..side_N (one per outcome), implied_total
+              and profit_percent, most profitable first
+    """
+    markets = set(markets)
+    opportunities = []
+
+    for game in games:
+        best, outcome_counts = _best_prices(game, markets)
+
+        for group, quotes in best.items():
+            # Every outcome of the market must be priced to cover all results
+            if len(quotes) < max(outcome_counts.get(group, 0), 2):
+                continue
+
+            total = sum(1 / quote["price"] for quote in quotes.values())
+            if total >= max_implied_total:
+                continue
+
+            entry = opportunity_entry(game, group, quotes.values(), total)
+            opportunities.append(entry)
+
+    opportunities.sort(key=lambda x: x["profit_percent"], reverse=True)
+    return opportunities
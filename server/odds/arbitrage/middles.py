@@ -0,0 +1,123 @@
+"""
+Middle detection across player prop lines.
+
+A middle is an Over at a lower point paired with an Under at a higher point
+(e.g. Over 20.5 at one book, Under 21.5 at another). At least one side
+always wins, and both win when the result lands inside the window. For each
+player the best Over and Under price per point are kept in point-sorted
+lists. Unders are swept in point order while the Overs below the current
+point are kept ordered by price, best first, so an Under's partners come out
+in ascending implied total and the walk stops at the first one past
+max_implied_total (or past the worst middle a full top_k heap keeps). Only
+pairs that can make the result are ever built, so the work is
+O(points log points + pairs kept) per player rather than every Over times
+every Under.
+"""
+
+import heapq
+from bisect import insort
+from itertools import count
+
+from odds.arbitrage.utils import BOOKMAKER_URLS, _collect_lines
+
+
+def _best_by_point(quotes):
+    # point -> best {"bookmaker", "price"} on one side of one player
+    best = {}
+    for point, quote in quotes:
+        if point not in best or quote["price"] > best[point]["price"]:
+            best[point] = quote
+    return sorted(best.items(), key=lambda item: item[0])
+
+
+def _player_sides(player_markets):
+    players = {}
+    for (player, point), sides in player_markets.items():
+        entry = players.setdefault(player, {"Over": [], "Under": []})
+        for name in ("Over", "Under"):
+            entry[name].extend((point, quote) for quote in sides[name])
+    return players
+
+
+def _side(quote, name, point):
+    return {
+        **quote,
+        "name": name,
+        "point": point,
+        "site": BOOKMAKER_URLS.get(quote["bookmaker"]),
+    }
+
+
+def find_middles(games, market_key="player_points", max_implied_total=1.03, top_k=10):
+    """
+    Finds Over/Under pairs on different lines that leave a middle window.
+
+    Args:
+        games (list): Event odds payloads with bookmakers and markets
+        market_key (str): Player prop market, e.g. "player_points"
+        max_implied_total (float): Keep pairs whose combined implied
+            probability is at most this (below 1 is profitable either way)
+        top_k (int): How many middles to return
+
+    Returns:
+        list: Middles, lowest implied total first, each with the window
+              width, profit_percent (computed as for arbitrage entries) and
+              middle_profit_percent, the return on the total stake when both
+              sides win with stakes split as in calculate_arbitrage_stakes
+    """
+    if top_k <= 0:
+        return []
+    # Worst kept middle on top: (-implied_total, window, tiebreak, middle)
+    kept = []
+    tiebreak = count()
+
+    for game in games:
+        event = f"{game['home_team']} vs {game['away_team']}"
+        players = _player_sides(_collect_lines(game, market_key))
+
+        for player, sides in players.items():
+            overs = _best_by_point(sides["Over"])
+            unders = _best_by_point(sides["Under"])
+
+            below = []  # (-price, point, quote) for Overs below the Under
+            next_over = 0
+            for under_point, under in unders:
+                while next_over < len(overs) and overs[next_over][0] < under_point:
+                    point, quote = overs[next_over]
+                    insort(below, (-quote["price"], point, next_over))
+                    next_over += 1
+
+                for _, over_point, over_index in below:
+                    over = overs[over_index][1]
+                    total = 1 / over["price"] + 1 / under["price"]
+                    if total > max_implied_total:
+                        break  # every later Over is priced lower
+                    rounded = round(total, 3)
+                    window = round(under_point - over_point, 2)
+                    if len(kept) == top_k:
+                        if rounded > -kept[0][0]:
+                            break
+                        if (-rounded, window) <= kept[0][:2]:
+                            continue
+
+                    middle = {
+                        "type": market_key,
+                        "event": event,
+                        "commence_time": game["commence_time"],
+                        "player": player,
+                        "window": window,
+                        "side_1": _side(over, "Over", over_point),
+                        "side_2": _side(under, "Under", under_point),
+                        "implied_total": rounded,
+                        "profit_percent": round((1 - total) * 100, 2),
+                        "middle_profit_percent": round((2 / total - 1) * 100, 2),
+                    }
+                    item = (-rounded, window, next(tiebreak), middle)
+                    if len(kept) < top_k:
+                        heapq.heappush(kept, item)
+                    else:
+                        heapq.heapreplace(kept, item)
+
+    middles = [item[3] for item in kept]
+    middles.sort(key=lambda m: (m["implied_total"], -m["window"]))
+    return middles
@@ -1,7 +1,12 @@
 from django.http import JsonResponse
 
 from odds.utils.api_helpers import fetch_player_prop_odds
+from .history import arbitrage_history, with_verification
+from .markets import find_market_arbitrage
+from .middles import find_middles
+from .prop_value import find_prop_value_bets
 from .utils import find_arbitrage
+from .verify import verify_opportunities
 
 
 def player_prop_arbitrage(request):
@@ -9,15 +14,70 @@ def player_prop_arbitrage(request):
     market = request.GET.get("market", "player_points")
 
     try:
-        all_event_odds = fetch_player_prop_odds(sport, market)
+        all_event_odds, failed_events = fetch_player_prop_odds(sport, market)
         opportunities, near_arbs = find_arbitrage(all_event_odds, market_key=market)
 
         response = {
             "arbitrage": opportunities,
             "near_arbitrage": near_arbs,
+            "failed_events": failed_events,
         }
+        if request.GET.get("verify") == "1":
+            response["arbitrage"], response["dropped"] = verify_opportunities(
+                opportunities, all_event_odds, sport
+            )
+
+        # History tracks every line in arbitrage, not only the pairs shown
+        detected = find_market_arbitrage(all_event_odds, markets=(market,))
+        arbitrage_history.record(
+            with_verification(
+                detected, response["arbitrage"], response.get("dropped", ())
+            )
+        )
 
         return JsonResponse(response, safe=False)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+def player_prop_middles(request):
+    sport = request.GET.get("sport", "basketball_nba")
+    market = request.GET.get("market", "player_points")
+
+    try:
+        max_implied_total = float(request.GET.get("max_implied_total", 1.03))
+    except ValueError:
+        return JsonResponse({"error": "max_implied_total must be a number"}, status=400)
+
+    try:
+        all_event_odds, failed_events = fetch_player_prop_odds(sport, market)
+        middles = find_middles(
+            all_event_odds, market_key=market, max_implied_total=max_implied_total
+        )
+
+        return JsonResponse({"middles": middles, "failed_events": failed_events})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def player_prop_value_bets(request):
+    sport = request.GET.get("sport", "basketball_nba")
+    market = request.GET.get("market", "player_points")
+
+    try:
+        threshold = float(request.GET.get("threshold", 5.0))
+    except ValueError:
+        return JsonResponse({"error": "threshold must be a number"}, status=400)
+
+    try:
+        all_event_odds, failed_events = fetch_player_prop_odds(sport, market)
+        value_bets = find_prop_value_bets(
+            all_event_odds, markets=(market,), threshold=threshold
+        )
+
+        return JsonResponse({"value_bets": value_bets, "failed_events": failed_events})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,185 @@
+"""
+Player prop value detection.
+
+PropLineIndex keys every (player, market, point) line on a slate to one row
+of a (lines x Over/Under x book) implied probability array, so each book's
+Over and Under prices for a line sit side by side. A player appears in one
+event per slate, so the key needs no event.
+
+Consensus is worked out per line in one pass: books that price both sides
+are de-vigged (see odds/arbitrage/value.py), and a line priced that way by
+at least min_books books takes the mean of their fair Over probabilities.
+Books don't all post the same point for a player, so a line with too few
+books (e.g. one book's alternate point) takes its consensus from the
+player's other lines instead, interpolated between the nearest points on
+either side. Points outside the other lines' range are left without a
+consensus rather than extrapolated.
+
+Every quote is then scored against its line's fair price:
+
+    value_percentage = (price * fair_probability - 1) * 100
+
+which is also the expected return per unit staked.
+"""
+
+import numpy as np
+
+from odds.arbitrage.utils import BOOKMAKER_URLS
+from odds.arbitrage.value import complete_books
+
+SIDES = ("Over", "Under")
+
+# Books that must price both sides of a line for it to set its own consensus
+MIN_CONSENSUS_BOOKS = 2
+
+
+class PropLineIndex:
+    def __init__(self, games, markets=("player_points",)):
+        """
+        Indexes a slate's player prop quotes by (player, market, point).
+
+        Args:
+            games (list): Event odds payloads with bookmakers and markets
+            markets (iterable): Prop market keys, e.g. ("player_points",)
+        """
+        markets = set(markets)
+        self.keys, self.games, self.books = [], [], []
+        self.rows, book_index = {}, {}
+        cells = {}  # (row, side, book) -> best price
+
+        for game in games:
+            for bookmaker in game.get("bookmakers", []):
+                title = bookmaker["title"]
+                book = book_index.setdefault(title, len(self.books))
+                if book == len(self.books):
+                    self.books.append(title)
+
+                for market in bookmaker.get("markets", []):
+                    if market["key"] not in markets:
+                        continue
+                    for outcome in market.get("outcomes", []):
+                        name = outcome.get("name")
+                        player = outcome.get("description")
+                        price = outcome.get("price")
+                        point = outcome.get("point")
+                        if name not in SIDES or not all([player, price, point]):
+                            continue
+
+                        key = (player, market["key"], point)
+                        row = self.rows.setdefault(key, len(self.keys))
+                        if row == len(self.keys):
+                            self.keys.append(key)
+                            self.games.append(game)
+
+                        cell = (row, SIDES.index(name), book)
+                        # A book quoting a side twice keeps its best price
+                        cells[cell] = max(cells.get(cell, 0), price)
+
+        self.probabilities = np.full((len(self.keys), 2, len(self.books)), np.nan)
+        if cells:
+            index = tuple(np.array(axis, dtype=np.intp) for axis in zip(*cells))
+            self.probabilities[index] = 1 / np.array(list(cells.values()))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def consensus(self, min_books=MIN_CONSENSUS_BOOKS):
+        """
+        Fair Over probability per line.
+
+        Returns:
+            tuple: (fair_over, books, interpolated) arrays over the lines:
+                   the fair Over probability (NaN without a consensus), how
+                   many books set it directly, and whether it was
+                   interpolated from the player's other lines
+        """
+        complete = complete_books(self.probabilities)
+        books = complete.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            overround = self.probabilities.sum(axis=1)  # NaN unless both sides
+            fair = np.where(complete, self.probabilities[:, 0, :] / overround, 0)
+            fair_over = np.where(books >= min_books, fair.sum(axis=1) / books, np.nan)
+
+        direct = ~np.isnan(fair_over)
+        interpolated = np.zeros(len(self.keys), dtype=bool)
+        for rows in self._ladders().values():
+            rows = np.array(rows)
+            anchors, gaps = rows[direct[rows]], rows[~direct[rows]]
+            if len(anchors) < 2 or not len(gaps):
+                continue
+
+            points = np.array([self.keys[row][2] for row in anchors], dtype=float)
+            order = np.argsort(points)
+            points, anchor_fair = points[order], fair_over[anchors[order]]
+            gap_points = np.array([self.keys[row][2] for row in gaps], dtype=float)
+            inside = (gap_points > points[0]) & (gap_points < points[-1])
+
+            fair_over[gaps[inside]] = np.interp(gap_points[inside], points, anchor_fair)
+            interpolated[gaps[inside]] = True
+
+        return fair_over, books, interpolated
+
+    def _ladders(self):
+        # (player, market) -> rows at each of the player's points
+        ladders = {}
+        for row, (player, market, _) in enumerate(self.keys):
+            ladders.setdefault((player, market), []).append(row)
+        return ladders
+
+
+def find_prop_value_bets(
+    games, markets=("player_points",), threshold=5.0, min_books=MIN_CONSENSUS_BOOKS
+):
+    """
+    Scores every player prop quote against its line's consensus.
+
+    Args:
+        games (list): Event odds payloads, e.g. from fetch_player_prop_odds
+        markets (iterable): Prop market keys to score
+        threshold (float): Minimum value_percentage to report
+        min_books (int): Books needed for a line to set its own consensus
+
+    Returns:
+        list: Value bets, highest value first, with player, market, point,
+              side, bookmaker, odds, consensus_odds, fair_probability,
+              value_percentage, consensus ("line" or "interpolated"),
+              consensus_books and game
+    """
+    index = PropLineIndex(games, markets)
+    if not len(index):
+        return []
+
+    fair_over, books, interpolated = index.consensus(min_books)
+    fair = np.stack([fair_over, 1 - fair_over], axis=1)  # (lines, sides)
+    with np.errstate(invalid="ignore"):
+        values = (fair[:, :, None] / index.probabilities - 1) * 100
+
+    value_bets = []
+    for row, side, book in np.argwhere(values >= threshold):
+        player, market, point = index.keys[row]
+        game = index.games[row]
+        value_bets.append(
+            {
+                "player": player,
+                "market": market,
+                "point": point,
+                "side": SIDES[side],
+                "bookmaker": index.books[book],
+                "site": BOOKMAKER_URLS.get(index.books[book]),
+                "odds": round(float(1 / index.probabilities[row, side, book]), 3),
+                "consensus_odds": round(float(1 / fair[row, side]), 2),
+                "fair_probability": round(float(fair[row, side]), 4),
+                "value_percentage": round(float(values[row, side, book]), 2),
+                "consensus": "interpolated" if interpolated[row] else "line",
+                "consensus_books": int(books[row]),
+                "game": {
+                    "home_team": game["home_team"],
+                    "away_team": game["away_team"],
+                    "commence_time": game["commence_time"],
+                },
+            }
+        )
+
+    value_bets.sort(key=lambda x: x["value_percentage"], reverse=True)
+    return value_bets
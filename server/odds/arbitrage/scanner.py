@@ -0,0 +1,166 @@
+"""
+Multi-sport arbitrage and value scan.
+
+Each sport's h2h odds are fetched on a thread (I/O-bound, sharing the
+sport_odds_{sport}_h2h snapshots with the single-sport views), and as soon as
+a sport's odds arrive its arbitrage and value detection is submitted to a
+process pool so the CPU-bound work runs on every core. Results are merged
+into one ranked response.
+
+The scan has one deadline: sports still fetching or detecting when it passes
+are reported as timed out and left out of the results, so one slow sport
+never holds up the others.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+import django
+from django.conf import settings
+
+from odds.arbitrage.markets import find_market_arbitrage
+from odds.arbitrage.utils import detect_value_bets
+from odds.utils.cache_helpers import cached_odds_api_get
+from odds.utils.request_planner import sport_odds_query
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool():
+    # One pool per server process, started on first use. Workers are spawned
+    # rather than forked (the server is multi-threaded) and set up Django.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.ARBITRAGE_SCAN_PROCESSES or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def active_sports():
+    """Keys of the in-season sports that have h2h markets."""
+    sports, _ = cached_odds_api_get(
+        "sports", "/v4/sports/", ttl=60 * 60, consumer="scanner"
+    )
+    return [
+        sport["key"]
+        for sport in sports
+        if sport.get("active") and not sport.get("has_outrights")
+    ]
+
+
+def _fetch_sport(sport):
+    started = time.perf_counter()
+    games, _ = cached_odds_api_get(
+        f"sport_odds_{sport}_h2h",
+        f"/v4/sports/{sport}/odds/",
+        params=sport_odds_query(["h2h"]),
+        consumer="scanner",
+    )
+    return games, time.perf_counter() - started
+
+
+def detect_sport(games, value_threshold=5.0):
+    """
+    Runs the arbitrage and value detectors on one sport's h2h odds.
+
+    Runs in a scan worker process, so it only takes and returns plain data.
+
+    Returns:
+        tuple: (arbitrage entries, value bets, seconds spent)
+    """
+    started = time.perf_counter()
+    arbitrage = find_market_arbitrage(games, markets=("h2h",))
+    value_bets = detect_value_bets(games, threshold=value_threshold)
+    return arbitrage, value_bets, time.perf_counter() - started
+
+
+def scan_sports(sports=None, timeout=None):
+    """
+    Scans several sports for arbitrage and value bets in parallel.
+
+    Args:
+        sports (list): Sport keys; defaults to active_sports()
+        timeout (float): Seconds for the whole scan (defaults to
+            settings.ARBITRAGE_SCAN_TIMEOUT)
+
+    Returns:
+        dict: "arbitrage" (most profitable first) and "value_bets" (highest
+              value first), each entry tagged with its sport, and "sports"
+              with each sport's status ("ok", "error" or "timeout"), event
+              count and fetch/detect seconds
+    """
+    timeout = settings.ARBITRAGE_SCAN_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    if sports is None:
+        sports = active_sports()
+
+    report = {sport: {"status": "timeout"} for sport in sports}
+    arbitrage, value_bets = [], []
+    if not sports:
+        return {"arbitrage": arbitrage, "value_bets": value_bets, "sports": report}
+
+    fetch_pool = ThreadPoolExecutor(
+        max_workers=min(len(sports), settings.ODDS_FANOUT_MAX_WORKERS)
+    )
+    fetches = {fetch_pool.submit(_fetch_sport, sport): sport for sport in sports}
+    detections = {}
+    pending = set(fetches)
+
+    try:
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=max(0, deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break
+
+            for future in done:
+                sport = fetches.get(future) or detections[future]
+                entry = report[sport]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    entry.update(status="error", error=str(e))
+                    continue
+
+                if future in fetches:
+                    games, entry["fetch_seconds"] = result
+                    entry["events"] = len(games)
+                    detection = _process_pool().submit(detect_sport, games)
+                    detections[detection] = sport
+                    pending.add(detection)
+                    continue
+
+                sport_arbs, sport_values, entry["detect_seconds"] = result
+                entry["status"] = "ok"
+                arbitrage.extend({**arb, "sport": sport} for arb in sport_arbs)
+                value_bets.extend({**bet, "sport": sport} for bet in sport_values)
+    finally:
+        # Don't wait on sports that missed the deadline
+        for future in pending:
+            future.cancel()
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+    for entry in report.values():
+        for key in ("fetch_seconds", "detect_seconds"):
+            if key in entry:
+                entry[key] = round(entry[key], 3)
+
+    arbitrage.sort(key=lambda x: x["profit_percent"], reverse=True)
+    value_bets.sort(key=lambda x: x["value_percentage"], reverse=True)
+    return {"arbitrage": arbitrage, "value_bets": value_bets, "sports": report}
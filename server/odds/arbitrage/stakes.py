@@ -0,0 +1,73 @@
+"""
+Batch stake allocation for N-outcome arbitrage candidates.
+
+Candidates are padded into one (candidate x outcome) price array and split
+in a single pass: every outcome is staked so that all outcomes pay out the
+same amount, as calculate_arbitrage_stakes does for a single pair.
+
+Books only accept stakes in fixed increments, so each stake is rounded up to
+its book's increment at a common target payout. Rounding up means every
+outcome still pays at least that target; the target is then lowered by
+bisection until the rounded stakes fit the bankroll. The guaranteed profit
+reported is the worst outcome's payout less the rounded total staked.
+"""
+
+import numpy as np
+
+# Bisection steps on the target payout: 2**-40 of the bankroll is far below
+# a cent for any realistic stake
+BISECT_STEPS = 40
+
+# Slack for increments that don't divide evenly in binary (0.1, 0.01)
+ROUNDING_EPSILON = 1e-9
+
+
+def _rounded_stakes(target, implied, increments):
+    # Smallest increment-aligned stakes that pay at least `target` each
+    steps = np.ceil(target[:, None] * implied / increments - ROUNDING_EPSILON)
+    return np.nan_to_num(steps * increments)
+
+
+def allocate_stakes(prices, budgets, increments):
+    """
+    Splits each candidate's bankroll across its outcomes.
+
+    Args:
+        prices (np.ndarray): Decimal odds, shape (candidates, outcomes), NaN
+            where a candidate has fewer outcomes than the widest one
+        budgets (np.ndarray): Total stake per candidate, shape (candidates,)
+        increments (np.ndarray): Stake increment per outcome, same shape as
+            prices
+
+    Returns:
+        dict: implied_total, stakes, payouts, total_staked and
+              guaranteed_profit arrays; stakes and payouts are 0 where
+              prices is NaN
+    """
+    implied = 1 / prices
+    implied_total = np.nansum(implied, axis=1)
+
+    # Payout every outcome returns with exact (unrounded) stakes
+    lo = np.zeros_like(budgets)
+    hi = budgets / implied_total
+    fits = _rounded_stakes(hi, implied, increments).sum(axis=1) <= budgets
+    lo = np.where(fits, hi, lo)
+
+    for _ in range(BISECT_STEPS):
+        mid = (lo + hi) / 2
+        fits = _rounded_stakes(mid, implied, increments).sum(axis=1) <= budgets
+        lo = np.where(fits, mid, lo)
+        hi = np.where(fits, hi, mid)
+
+    stakes = _rounded_stakes(lo, implied, increments)
+    payouts = np.nan_to_num(stakes * prices)
+    total_staked = stakes.sum(axis=1)
+    worst_payout = np.nanmin(np.where(np.isnan(prices), np.nan, payouts), axis=1)
+
+    return {
+        "implied_total": implied_total,
+        "stakes": stakes,
+        "payouts": payouts,
+        "total_staked": total_staked,
+        "guaranteed_profit": worst_payout - total_staked,
+    }
@@ -0,0 +1,102 @@
+"""
+Snapshot syncing shared by the incremental slate stores.
+
+ArbitrageIndex (odds/arbitrage/index.py) and ConsensusStore
+(odds/arbitrage/consensus.py) both keep every quote on the slate per line
+and re-evaluate only the lines a change touches. SlateSync holds what they
+share: the lock, the lines and games, single quote updates and removals, and
+syncing to a full odds snapshot. Subclasses provide:
+
+    _set_quote(game, market_key, bookmaker, outcome)
+        Stores one quote. Returns (line key, change), with key None if the
+        quote can't be placed and change LINE, BOOK or None if nothing
+        changed.
+    _remove_quote(key, bookmaker, name)
+        Drops one quote, and the line once it has none left.
+    _evaluate(key, bookmaker=None)
+        Re-evaluates a line, or only bookmaker's quotes on it, and returns
+        the deltas.
+
+Each line must have a quoted() method listing its (bookmaker, outcome name)
+quotes.
+"""
+
+import threading
+
+LINE = "line"  # the whole line needs re-evaluating
+BOOK = "book"  # only the updated book's quotes do
+
+
+class SlateSync:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lines = {}  # (event_id, market, player, line) -> line
+        self._games = {}  # event_id -> game (teams, commence_time)
+
+    def update(self, game, market_key, bookmaker, outcome):
+        """
+        Applies one outcome quote and re-evaluates what it affects.
+
+        Returns:
+            list: Deltas ({"change", "key", ...}) for that line
+        """
+        with self._lock:
+            key, change = self._set_quote(game, market_key, bookmaker, outcome)
+            if key is None or change is None:
+                return []
+            if change == BOOK:
+                return self._evaluate(key, bookmaker)
+            return self._evaluate(key)
+
+    def remove(self, key, bookmaker, name):
+        """Drops bookmaker's quote for outcome name on a line key."""
+        with self._lock:
+            self._remove_quote(key, bookmaker, name)
+            return self._evaluate(key)
+
+    def apply_games(self, games, markets):
+        """
+        Syncs to a full odds snapshot: changed quotes are updated, quotes no
+        longer offered (or on games that dropped off) are removed, and only
+        the lines touched are re-evaluated.
+
+        Returns:
+            list: Deltas for every line whose results changed
+        """
+        with self._lock:
+            dirty = set()
+            seen = set()
+            for game in games:
+                self._games[game["id"]] = game
+                for bookmaker in game.get("bookmakers", []):
+                    for market in bookmaker.get("markets", []):
+                        if market["key"] not in markets:
+                            continue
+                        for outcome in market.get("outcomes", []):
+                            key, change = self._set_quote(
+                                game, market["key"], bookmaker["title"], outcome
+                            )
+                            if key is None:
+                                continue
+                            seen.add((key, bookmaker["title"], outcome["name"]))
+                            if change is not None:
+                                dirty.add(key)
+
+            for key, line in list(self._lines.items()):
+                if key[1] not in markets:
+                    continue
+                for bookmaker, name in line.quoted():
+                    if (key, bookmaker, name) not in seen:
+                        self._remove_quote(key, bookmaker, name)
+                        dirty.add(key)
+
+            # Forget games that no longer have any quotes
+            quoted = {key[0] for key in self._lines}
+            for event_id in list(self._games):
+                if event_id not in quoted:
+                    del self._games[event_id]
+
+            deltas = []
+            for key in dirty:
+                deltas.extend(self._evaluate(key))
+            return deltas
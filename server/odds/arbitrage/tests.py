@@ -1,9 +1,130 @@
 import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
-from django.test import TestCase, Client
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
-from odds.arbitrage.utils import detect_value_bets
+from odds.arbitrage.consensus import ConsensusStore
+from odds.arbitrage.history import (
+    ArbitrageHistory,
+    arbitrage_history,
+    with_verification,
+)
+from odds.arbitrage.index import ArbitrageIndex
+from odds.arbitrage.markets import find_market_arbitrage
+from odds.arbitrage.middles import find_middles
+from odds.arbitrage.scanner import _process_pool, scan_sports
+from odds.arbitrage.utils import BOOKMAKER_URLS, detect_value_bets, find_arbitrage
+from odds.arbitrage.prop_value import PropLineIndex, find_prop_value_bets
+from odds.arbitrage.value import find_value_bets
+from odds.arbitrage.vectorized import find_arbitrage_vectorized
+from odds.arbitrage.verify import verify_opportunities
+
+
+def reference_find_arbitrage(games, market_key="player_points"):
+    """The original pairwise scan, kept as the reference for find_arbitrage."""
+    opportunities = []
+    near_arbs = []
+
+    for game in games:
+        player_markets = {}
+        for bookmaker in game.get("bookmakers", []):
+            for market in bookmaker.get("markets", []):
+                if market["key"] != market_key:
+                    continue
+                for outcome in market.get("outcomes", []):
+                    name = outcome.get("name")
+                    player = outcome.get("description")
+                    price = outcome.get("price")
+                    point = outcome.get("point")
+                    if not all([name, player, price, point]):
+                        continue
+                    player_markets.setdefault(
+                        (player, point), {"Over": [], "Under": []}
+                    )
+                    player_markets[(player, point)][name].append(
+                        {"bookmaker": bookmaker["title"], "price": price}
+                    )
+
+        for (player, point), sides in player_markets.items():
+            for over in sides["Over"]:
+                for under in sides["Under"]:
+                    if over["bookmaker"] == under["bookmaker"]:
+                        continue
+                    total = 1 / over["price"] + 1 / under["price"]
+                    entry = {
+                        "type": market_key,
+                        "event": f"{game['home_team']} vs {game['away_team']}",
+                        "commence_time": game["commence_time"],
+                        "player": player,
+                        "line": point,
+                        "side_1": {
+                            **over,
+                            "name": "Over",
+                            "site": BOOKMAKER_URLS.get(over["bookmaker"]),
+                        },
+                        "side_2": {
+                            **under,
+                            "name": "Under",
+                            "site": BOOKMAKER_URLS.get(under["bookmaker"]),
+                        },
+                    }
+                    if total < 1:
+                        entry["profit_percent"] = round((1 - total) * 100, 2)
+                        opportunities.append(entry)
+                    else:
+                        entry["implied_total"] = round(total, 3)
+                        near_arbs.append(entry)
+
+    opportunities.sort(key=lambda x: x["profit_percent"], reverse=True)
+    near_arbs.sort(key=lambda x: x["implied_total"])
+    return opportunities[:3], near_arbs[:3]
+
+
+def random_prop_slate(rng, games=4, players=6, books=15):
+    # Few distinct prices so rounded ties are common
+    prices = [1.8, 1.83, 1.87, 1.9, 1.91, 1.95, 2.0, 2.05, 2.1, 2.2, 2.35]
+    titles = list(BOOKMAKER_URLS)[:books]
+    slate = []
+    for g in range(games):
+        bookmakers = []
+        for title in titles:
+            outcomes = []
+            for p in range(players):
+                point = rng.choice([14.5, 15.5, 22.5])
+                for name in ("Over", "Under"):
+                    if rng.random() < 0.85:
+                        outcomes.append(
+                            {
+                                "name": name,
+                                "description": f"Player {g}-{p}",
+                                "price": rng.choice(prices),
+                                "point": point,
+                            }
+                        )
+            bookmakers.append(
+                {
+                    "title": title,
+                    "markets": [{"key": "player_points", "outcomes": outcomes}],
+                }
+            )
+        slate.append(
+            {
+                "home_team": f"Home {g}",
+                "away_team": f"Away {g}",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": bookmakers,
+            }
+        )
+    return slate
 
 
 class ValueBetDetectionTest(TestCase):
@@ -94,3 +215,1333 @@ class ArbitrageCalculatorTest(TestCase):
 
         self.assertEqual(response.status_code, 400)
         self.assertIn("error", response.json())
+
+
+class ArbitrageBatchCalculatorTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse("arbitrage:calculate_arbitrage_batch")
+
+    def _post(self, payload):
+        return self.client.post(
+            self.url, data=json.dumps(payload), content_type="application/json"
+        )
+
+    def test_equal_payouts_at_cent_increments(self):
+        """Test that every outcome pays the same, to the cent"""
+        response = self._post(
+            {
+                "candidates": [
+                    {"outcomes": [{"price": 2.1}, {"price": 2.2}]},
+                    {"outcomes": [{"price": 3.4}, {"price": 3.6}, {"price": 3.5}]},
+                ],
+                "stake": 100,
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        two_way, three_way = response.json()["results"]
+        self.assertEqual(two_way["stakes"], [51.16, 48.84])
+        self.assertEqual(two_way["total_staked"], 100)
+        self.assertEqual(two_way["guaranteed_profit"], 7.44)
+        self.assertEqual(len(three_way["stakes"]), 3)
+        self.assertLess(max(three_way["payouts"]) - min(three_way["payouts"]), 0.04)
+
+    def test_rounds_to_book_increments_without_losing_profit(self):
+        """Test that rounded stakes fit the bankroll and still guarantee profit"""
+        rng = random.Random(3)
+        candidates = []
+        for _ in range(50):
+            width = rng.choice([2, 3])
+            candidates.append(
+                {
+                    "outcomes": [
+                        {
+                            "bookmaker": rng.choice(
+                                ["FanDuel", "DraftKings", "BetMGM"]
+                            ),
+                            "price": round(width * rng.uniform(1.05, 1.2), 2),
+                        }
+                        for _ in range(width)
+                    ],
+                    "stake": rng.choice([100, 250, 1000]),
+                }
+            )
+        increments = {"FanDuel": 1, "DraftKings": 5, "BetMGM": 0.5}
+
+        response = self._post({"candidates": candidates, "increments": increments})
+
+        self.assertEqual(response.status_code, 200)
+        for candidate, result in zip(candidates, response.json()["results"]):
+            if "error" in result:
+                continue
+            outcomes = candidate["outcomes"]
+            self.assertLessEqual(result["total_staked"], candidate["stake"])
+            for outcome, stake in zip(outcomes, result["stakes"]):
+                step = increments[outcome["bookmaker"]]
+                self.assertAlmostEqual(stake / step, round(stake / step))
+            worst = min(s * o["price"] for s, o in zip(result["stakes"], outcomes))
+            self.assertGreaterEqual(worst - sum(result["stakes"]), -0.005)
+            self.assertAlmostEqual(
+                worst - sum(result["stakes"]), result["guaranteed_profit"], places=2
+            )
+
+    def test_reports_rows_without_arbitrage(self):
+        """Test per-row errors for candidates that can't be staked profitably"""
+        response = self._post(
+            {
+                "candidates": [
+                    {"outcomes": [{"price": 1.9}, {"price": 1.9}]},
+                    {"outcomes": [{"price": 3.3}, {"price": 3.3}, {"price": 3.3}]},
+                    {"outcomes": [{"price": 3.3}, {"price": 3.3}, {"price": 3.3}]},
+                ],
+                "stake": 10,
+                "increment": 5,
+            }
+        )
+
+        results = response.json()["results"]
+        self.assertIn("No arbitrage", results[0]["error"])
+        # 10 in steps of 5 can't cover three outcomes
+        self.assertIn("increments", results[1]["error"])
+
+    def test_validates_whole_batch(self):
+        """Test that every invalid candidate is reported in one response"""
+        response = self._post(
+            {
+                "candidates": [
+                    {"outcomes": [{"price": 2.1}, {"price": 2.2}], "stake": 100},
+                    {"outcomes": [{"price": 2.1}], "stake": 100},
+                    {"outcomes": [{"price": 0.9}, {"price": 2.2}], "stake": 100},
+                    {"outcomes": [{"price": 2.1}, {"price": 2.2}], "stake": -5},
+                ]
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error["index"] for error in response.json()["details"]], [1, 2, 3]
+        )
+
+    def test_rejects_malformed_bookmakers_and_non_finite_numbers(self):
+        """Test 400s for unhashable bookmakers and inf/nan prices or stakes"""
+        good = {"price": 2.1, "bookmaker": "FanDuel"}
+        response = self._post(
+            {
+                "candidates": [
+                    {"outcomes": [good, {"price": 2.2, "bookmaker": ["BetMGM"]}]},
+                    {"outcomes": [good, {"price": 2.2, "bookmaker": {"a": 1}}]},
+                    {"outcomes": [good, {"price": "inf"}]},
+                    {"outcomes": [good, {"price": "nan"}]},
+                    {"outcomes": [good, {"price": 2.2}], "stake": "inf"},
+                ],
+                "stake": 100,
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error["index"] for error in response.json()["details"]], [0, 1, 2, 3, 4]
+        )
+
+        candidates = [{"outcomes": [good, {"price": 2.2}], "stake": 100}]
+        for increments in ({"increment": "inf"}, {"increments": {"FanDuel": "nan"}}):
+            response = self._post({"candidates": candidates, **increments})
+            self.assertEqual(response.status_code, 400)
+
+
+class FindArbitrageTest(TestCase):
+    def test_matches_pairwise_scan_on_random_slates(self):
+        """Test the best-first scanner against the original pairwise scan"""
+        rng = random.Random(7)
+        for _ in range(40):
+            slate = random_prop_slate(rng, books=rng.randint(2, 15))
+            self.assertEqual(find_arbitrage(slate), reference_find_arbitrage(slate))
+
+    def test_several_arbs_on_one_line(self):
+        """Test that one line can contribute more than one arb"""
+        slate = [
+            {
+                "home_team": "Lakers",
+                "away_team": "Warriors",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": [
+                    {
+                        "title": title,
+                        "markets": [
+                            {
+                                "key": "player_points",
+                                "outcomes": [
+                                    {
+                                        "name": "Over",
+                                        "description": "LeBron James",
+                                        "price": over,
+                                        "point": 25.5,
+                                    },
+                                    {
+                                        "name": "Under",
+                                        "description": "LeBron James",
+                                        "price": under,
+                                        "point": 25.5,
+                                    },
+                                ],
+                            }
+                        ],
+                    }
+                    for title, over, under in (
+                        ("FanDuel", 2.2, 1.6),
+                        ("DraftKings", 2.15, 1.7),
+                        ("BetMGM", 1.6, 2.25),
+                    )
+                ],
+            }
+        ]
+
+        opportunities, near_arbs = find_arbitrage(slate)
+
+        self.assertEqual(len(opportunities), 2)
+        self.assertEqual(opportunities[0]["side_1"]["bookmaker"], "FanDuel")
+        self.assertEqual(opportunities[0]["side_2"]["bookmaker"], "BetMGM")
+        self.assertEqual((opportunities, near_arbs), reference_find_arbitrage(slate))
+
+    def test_top_k(self):
+        """Test that top_k bounds both result lists"""
+        slate = random_prop_slate(random.Random(3))
+        opportunities, near_arbs = find_arbitrage(slate, top_k=10)
+
+        self.assertLessEqual(len(opportunities), 10)
+        self.assertEqual(len(near_arbs), 10)
+        self.assertEqual(
+            [e["implied_total"] for e in near_arbs],
+            sorted(e["implied_total"] for e in near_arbs),
+        )
+
+
+class VectorizedArbitrageTest(TestCase):
+    def test_matches_python_engine_on_random_slates(self):
+        """Test that the NumPy engine returns exactly the python engine's results"""
+        rng = random.Random(11)
+        for _ in range(40):
+            slate = random_prop_slate(rng, books=rng.randint(2, 15))
+            top_k = rng.choice([1, 3, 10])
+            self.assertEqual(
+                find_arbitrage_vectorized(slate, top_k=top_k),
+                find_arbitrage(slate, top_k=top_k, engine="python"),
+            )
+
+    def test_keeps_original_price_values(self):
+        """Test that integer prices come back unchanged in the entries"""
+        slate = random_prop_slate(random.Random(5), games=1, players=1, books=2)
+        for bookmaker in slate[0]["bookmakers"]:
+            for outcome in bookmaker["markets"][0]["outcomes"]:
+                outcome["price"] = 2 if outcome["name"] == "Over" else 3
+
+        opportunities, _ = find_arbitrage_vectorized(slate)
+
+        self.assertEqual(opportunities, find_arbitrage(slate, engine="python")[0])
+        self.assertIs(type(opportunities[0]["side_1"]["price"]), int)
+
+    def test_empty_slate(self):
+        self.assertEqual(find_arbitrage_vectorized([]), ([], []))
+
+    @override_settings(ARBITRAGE_ENGINE="numpy")
+    def test_engine_setting_selects_numpy(self):
+        """Test that ARBITRAGE_ENGINE switches find_arbitrage's backend"""
+        slate = random_prop_slate(random.Random(2))
+        self.assertEqual(find_arbitrage(slate), reference_find_arbitrage(slate))
+
+
+def prop_game(quotes):
+    """One game from (bookmaker, player, name, point, price) quotes."""
+    bookmakers = {}
+    for title, player, name, point, price in quotes:
+        bookmakers.setdefault(title, []).append(
+            {"name": name, "description": player, "point": point, "price": price}
+        )
+    return {
+        "home_team": "Lakers",
+        "away_team": "Warriors",
+        "commence_time": "2025-04-01T00:00:00Z",
+        "bookmakers": [
+            {"title": title, "markets": [{"key": "player_points", "outcomes": o}]}
+            for title, o in bookmakers.items()
+        ],
+    }
+
+
+class FindMiddlesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.game = prop_game(
+            [
+                ("FanDuel", "LeBron James", "Over", 20.5, 2.05),
+                ("FanDuel", "LeBron James", "Under", 20.5, 1.8),
+                ("DraftKings", "LeBron James", "Over", 22.5, 2.4),
+                ("DraftKings", "LeBron James", "Under", 22.5, 1.6),
+                ("BetMGM", "LeBron James", "Over", 21.5, 1.8),
+                ("BetMGM", "LeBron James", "Under", 21.5, 2.0),
+            ]
+        )
+
+    def test_pairs_lower_over_with_higher_under(self):
+        """Test that a middle pairs an Over with an Under at a higher point"""
+        middles = find_middles([self.game])
+
+        best = middles[0]
+        self.assertEqual(
+            (best["side_1"]["bookmaker"], best["side_1"]["point"]), ("FanDuel", 20.5)
+        )
+        self.assertEqual(
+            (best["side_2"]["bookmaker"], best["side_2"]["point"]), ("BetMGM", 21.5)
+        )
+        self.assertEqual(best["window"], 1.0)
+        self.assertEqual(best["implied_total"], 0.988)
+        self.assertGreater(best["middle_profit_percent"], best["profit_percent"])
+        for middle in middles:
+            self.assertLess(middle["side_1"]["point"], middle["side_2"]["point"])
+
+    def test_matches_all_pairs_scan(self):
+        """Test against checking every cross-line Over/Under pair"""
+        rng = random.Random(4)
+        slate = random_prop_slate(rng, games=3, players=4, books=10)
+        middles = find_middles(slate, max_implied_total=1.05, top_k=10_000)
+
+        expected = set()
+        for game in slate:
+            best = {}
+            for bookmaker in game["bookmakers"]:
+                for o in bookmaker["markets"][0]["outcomes"]:
+                    key = (o["description"], o["name"], o["point"])
+                    best[key] = max(best.get(key, 0), o["price"])
+            for (player, name, low), over in best.items():
+                for (other, side, high), under in best.items():
+                    if (other, name, side) != (player, "Over", "Under"):
+                        continue
+                    if low < high and 1 / over + 1 / under <= 1.05:
+                        expected.add((player, low, high, over, under))
+
+        found = {
+            (
+                m["player"],
+                m["side_1"]["point"],
+                m["side_2"]["point"],
+                m["side_1"]["price"],
+                m["side_2"]["price"],
+            )
+            for m in middles
+        }
+        self.assertEqual(found, expected)
+        self.assertTrue(expected)
+
+    def test_top_k_keeps_the_best_middles(self):
+        """Test that a bounded scan returns the head of the full ranking"""
+        rng = random.Random(12)
+        for _ in range(20):
+            slate = random_prop_slate(rng, games=2, players=4, books=12)
+            ranking = [
+                (m["implied_total"], -m["window"])
+                for m in find_middles(slate, max_implied_total=1.05, top_k=10_000)
+            ]
+            for top_k in (1, 3, 10):
+                top = find_middles(slate, max_implied_total=1.05, top_k=top_k)
+                self.assertEqual(
+                    [(m["implied_total"], -m["window"]) for m in top],
+                    ranking[:top_k],
+                )
+
+    @patch("odds.arbitrage.player_props.fetch_player_prop_odds")
+    def test_middles_endpoint(self, mock_fetch):
+        mock_fetch.return_value = ([self.game], [])
+
+        response = self.client.get(
+            reverse("arbitrage:player-prop-middles"), {"max_implied_total": "1.0"}
+        )
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data["middles"]), 1)
+        self.assertEqual(data["failed_events"], [])
+
+
+def market_game(home, away, books):
+    """One game from {bookmaker: {market_key: outcomes}}."""
+    return {
+        "home_team": home,
+        "away_team": away,
+        "commence_time": "2025-04-01T00:00:00Z",
+        "bookmakers": [
+            {
+                "title": title,
+                "markets": [
+                    {"key": key, "outcomes": outcomes}
+                    for key, outcomes in markets.items()
+                ],
+            }
+            for title, markets in books.items()
+        ],
+    }
+
+
+class MarketArbitrageTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def tearDown(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def test_two_way_h2h(self):
+        """Test that the best price per team is combined across books"""
+        game = market_game(
+            "Chicago Bulls",
+            "Miami Heat",
+            {
+                "DraftKings": {
+                    "h2h": [
+                        {"name": "Chicago Bulls", "price": 2.2},
+                        {"name": "Miami Heat", "price": 1.8},
+                    ]
+                },
+                "FanDuel": {
+                    "h2h": [
+                        {"name": "Chicago Bulls", "price": 1.7},
+                        {"name": "Miami Heat", "price": 2.1},
+                    ]
+                },
+            },
+        )
+
+        [entry] = find_market_arbitrage([game])
+
+        self.assertEqual(entry["side_1"]["bookmaker"], "DraftKings")
+        self.assertEqual(entry["side_2"]["bookmaker"], "FanDuel")
+        self.assertEqual(
+            entry["profit_percent"], round((1 - 1 / 2.2 - 1 / 2.1) * 100, 2)
+        )
+
+    def test_three_way_needs_the_draw(self):
+        """Test that a 3-way market is only an arb with the draw priced"""
+        books = {
+            "Bet365": {
+                "h2h": [
+                    {"name": "Arsenal", "price": 3.2},
+                    {"name": "Chelsea", "price": 2.6},
+                    {"name": "Draw", "price": 3.1},
+                ]
+            },
+            "Unibet": {
+                "h2h": [
+                    {"name": "Arsenal", "price": 2.5},
+                    {"name": "Chelsea", "price": 3.3},
+                ]
+            },
+        }
+        game = market_game("Arsenal", "Chelsea", books)
+        [entry] = find_market_arbitrage([game])
+        self.assertEqual(entry["side_3"]["name"], "Draw")
+
+        # Arsenal + Chelsea alone would be an arb, but the draw is an outcome
+        books["Bet365"]["h2h"][2]["price"] = 2.5
+        self.assertEqual(
+            find_market_arbitrage([market_game("Arsenal", "Chelsea", books)]), []
+        )
+
+    def test_spreads_pair_opposite_points(self):
+        """Test that +p on one team pairs only with -p on the other"""
+        game = market_game(
+            "Lakers",
+            "Warriors",
+            {
+                "FanDuel": {
+                    "spreads": [
+                        {"name": "Lakers", "price": 2.15, "point": 3.5},
+                        {"name": "Warriors", "price": 1.7, "point": -3.5},
+                    ]
+                },
+                "BetMGM": {
+                    "spreads": [
+                        {"name": "Lakers", "price": 1.6, "point": 4.5},
+                        {"name": "Warriors", "price": 2.3, "point": -4.5},
+                    ]
+                },
+                "Caesars": {
+                    "spreads": [
+                        {"name": "Lakers", "price": 1.75, "point": 3.5},
+                        {"name": "Warriors", "price": 2.05, "point": -3.5},
+                    ]
+                },
+            },
+        )
+
+        [entry] = find_market_arbitrage([game], markets=["spreads"])
+
+        self.assertEqual(entry["line"], 3.5)
+        self.assertEqual(
+            (entry["side_1"]["bookmaker"], entry["side_2"]["bookmaker"]),
+            ("FanDuel", "Caesars"),
+        )
+
+    def test_totals(self):
+        game = market_game(
+            "Lakers",
+            "Warriors",
+            {
+                "FanDuel": {"totals": [{"name": "Over", "price": 2.1, "point": 228.5}]},
+                "BetMGM": {
+                    "totals": [{"name": "Under", "price": 2.05, "point": 228.5}]
+                },
+            },
+        )
+
+        [entry] = find_market_arbitrage([game], markets=["totals"])
+        self.assertEqual(entry["line"], 228.5)
+
+    @patch("odds.utils.upstream.session.get")
+    def test_opportunities_view_scans_full_slate(self, mock_get):
+        """Test that the h2h endpoint finds arbs beyond the first five games"""
+        games = [
+            market_game(
+                f"Home {i}",
+                f"Away {i}",
+                {
+                    "DraftKings": {
+                        "h2h": [
+                            {"name": f"Home {i}", "price": 2.2 if i == 7 else 1.9},
+                            {"name": f"Away {i}", "price": 1.8},
+                        ]
+                    },
+                    "FanDuel": {
+                        "h2h": [
+                            {"name": f"Home {i}", "price": 1.7},
+                            {"name": f"Away {i}", "price": 2.1 if i == 7 else 1.9},
+                        ]
+                    },
+                },
+            )
+            for i in range(8)
+        ]
+        mock_get.return_value = MagicMock(status_code=200, headers={})
+        mock_get.return_value.json.return_value = games
+
+        response = self.client.get(reverse("arbitrage:arbitrage-opportunities"))
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["event"] for entry in data], ["Home 7 vs Away 7"])
+
+
+class ArbitrageIndexTest(TestCase):
+    def _slate(self, rng, games=5):
+        titles = list(BOOKMAKER_URLS)[:8]
+        prices = [1.7, 1.8, 1.9, 2.0, 2.1, 2.2, 2.3]
+        slate = []
+        for g in range(games):
+            home, away = f"Home {g}", f"Away {g}"
+            books = {}
+            for title in titles:
+                if rng.random() < 0.2:
+                    continue
+                books[title] = {
+                    "h2h": [
+                        {"name": home, "price": rng.choice(prices)},
+                        {"name": away, "price": rng.choice(prices)},
+                    ],
+                    "totals": [
+                        {"name": "Over", "price": rng.choice(prices), "point": 220.5},
+                        {"name": "Under", "price": rng.choice(prices), "point": 220.5},
+                    ],
+                }
+            game = market_game(home, away, books)
+            game["id"] = f"event{g}"
+            slate.append(game)
+        return slate
+
+    def _summary(self, entries):
+        return sorted(
+            (e["event"], e["type"], e["line"], e["profit_percent"]) for e in entries
+        )
+
+    def test_tracks_full_recompute_across_snapshots(self):
+        """Test that incremental syncs agree with recomputing from scratch"""
+        rng = random.Random(9)
+        index = ArbitrageIndex()
+        markets = ("h2h", "totals")
+
+        for _ in range(20):
+            slate = self._slate(rng, games=rng.randint(2, 5))
+            index.apply_games(slate, markets)
+            self.assertEqual(
+                self._summary(index.opportunities()),
+                self._summary(find_market_arbitrage(slate, markets=markets)),
+            )
+
+    def test_single_updates_emit_deltas(self):
+        """Test added, changed and removed deltas for one line"""
+        game = market_game("Lakers", "Warriors", {})
+        game["id"] = "event1"
+        index = ArbitrageIndex()
+
+        index.update(game, "h2h", "FanDuel", {"name": "Lakers", "price": 2.2})
+        [added] = index.update(
+            game, "h2h", "DraftKings", {"name": "Warriors", "price": 2.1}
+        )
+        [changed] = index.update(
+            game, "h2h", "BetMGM", {"name": "Warriors", "price": 2.3}
+        )
+        self.assertEqual(
+            index.update(game, "h2h", "Caesars", {"name": "Warriors", "price": 1.5}), []
+        )
+        [removed] = index.update(
+            game, "h2h", "FanDuel", {"name": "Lakers", "price": 1.6}
+        )
+
+        self.assertEqual(
+            [d["change"] for d in (added, changed, removed)],
+            ["added", "changed", "removed"],
+        )
+        self.assertEqual(changed["opportunity"]["side_2"]["bookmaker"], "BetMGM")
+        self.assertEqual(index.opportunities(), [])
+
+    def test_same_book_falls_back_to_second_best(self):
+        """Test that excluding same-book pairs uses the runner-up price"""
+        game = market_game("Lakers", "Warriors", {})
+        game["id"] = "event1"
+        index = ArbitrageIndex(include_same_book=False)
+
+        for title, home, away in (("FanDuel", 2.3, 2.3), ("DraftKings", 2.1, 1.5)):
+            index.update(game, "h2h", title, {"name": "Lakers", "price": home})
+            index.update(game, "h2h", title, {"name": "Warriors", "price": away})
+
+        [entry] = index.opportunities()
+        self.assertEqual(
+            {entry["side_1"]["bookmaker"], entry["side_2"]["bookmaker"]},
+            {"FanDuel", "DraftKings"},
+        )
+        self.assertEqual(entry["side_2"]["price"], 2.3)
+
+
+def history_entry(player, over_book, under_book, profit, market="player_points"):
+    return {
+        "type": market,
+        "event": "Lakers vs Warriors",
+        "commence_time": "2025-04-01T00:00:00Z",
+        "player": player,
+        "line": 20.5,
+        "side_1": {"name": "Over", "bookmaker": over_book, "price": 2.1},
+        "side_2": {"name": "Under", "bookmaker": under_book, "price": 2.05},
+        "profit_percent": profit,
+    }
+
+
+@override_settings(ARBITRAGE_HISTORY_GAP=180)
+class ArbitrageHistoryTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "history.sqlite3")
+        self.history = ArbitrageHistory(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sightings_extend_one_lifetime_until_a_gap(self):
+        """Test that repeat sightings within the gap share a lifetime"""
+        start = time.time() - 3600
+        for offset, profit in ((0, 1.0), (60, 2.5), (120, 1.5), (1000, 0.5)):
+            self.history.record(
+                [history_entry("LeBron James", "FanDuel", "DraftKings", profit)],
+                seen_at=start + offset,
+            )
+        self.history.flush()
+
+        later, first = self.history.lifetimes()
+        self.assertEqual(first["survival_seconds"], 120)
+        self.assertEqual(first["sightings"], 3)
+        self.assertEqual(
+            (first["first_profit"], first["peak_profit"], first["last_profit"]),
+            (1.0, 2.5, 1.5),
+        )
+        self.assertEqual(later["sightings"], 1)
+        self.assertEqual(later["first_seen"], start + 1000)
+
+    def test_survival_per_book_pair_and_market(self):
+        """Test survival aggregates and the bookmaker filter"""
+        start = time.time() - 3600
+        batches = [
+            [
+                history_entry("LeBron James", "FanDuel", "DraftKings", 1.0),
+                history_entry("Stephen Curry", "DraftKings", "FanDuel", 2.0),
+                history_entry("Anthony Davis", "BetMGM", "FanDuel", 3.0),
+            ],
+            [history_entry("LeBron James", "FanDuel", "DraftKings", 1.2)],
+            [history_entry("LeBron James", "FanDuel", "DraftKings", 0.8)],
+        ]
+        # One batch a minute; the writer coalesces them into one transaction
+        for minute, batch in enumerate(batches):
+            self.history.record(batch, seen_at=start + 60 * minute)
+        self.history.flush()
+
+        survival = {row["book_pair"]: row for row in self.history.survival()}
+        pair = survival["DraftKings / FanDuel"]
+        self.assertEqual(pair["lifetimes"], 2)
+        self.assertEqual(pair["single_sightings"], 1)
+        self.assertEqual(pair["max_survival_seconds"], 120)
+        self.assertEqual(pair["avg_survival_seconds"], 60)
+        self.assertEqual(survival["BetMGM / FanDuel"]["lifetimes"], 1)
+
+        self.assertEqual(
+            [row["player"] for row in self.history.lifetimes(bookmaker="BetMGM")],
+            ["Anthony Davis"],
+        )
+        self.assertEqual(self.history.survival(since=time.time()), [])
+
+    def test_with_verification_leaves_out_dropped_lines(self):
+        """Test that rechecked entries replace or remove their lines"""
+        detected = [
+            history_entry("LeBron James", "FanDuel", "DraftKings", 1.0),
+            history_entry("Stephen Curry", "DraftKings", "FanDuel", 2.0),
+            history_entry("Anthony Davis", "BetMGM", "FanDuel", 3.0),
+        ]
+        confirmed = {**detected[0], "profit_percent": 0.6, "verification": "confirmed"}
+
+        recorded = with_verification(detected, [confirmed], [detected[2]])
+
+        self.assertEqual(
+            [(entry["player"], entry["profit_percent"]) for entry in recorded],
+            [("Stephen Curry", 2.0), ("LeBron James", 0.6)],
+        )
+
+    @patch("odds.arbitrage.player_props.fetch_player_prop_odds")
+    def test_player_prop_view_records_every_detected_line(self, mock_fetch):
+        """Test that history gets every arbitrage line, not just the top 3 shown"""
+        game = prop_game(
+            [("FanDuel", f"Player {n}", "Over", 20.5, 2.1 + n / 100) for n in range(5)]
+            + [("DraftKings", f"Player {n}", "Under", 20.5, 2.1) for n in range(5)]
+        )
+        mock_fetch.return_value = ([game], [])
+
+        with override_settings(ARBITRAGE_HISTORY_PATH=self.path):
+            response = self.client.get(reverse("arbitrage:player-prop-arbitrage"))
+            arbitrage_history.flush()
+            lifetimes = arbitrage_history.lifetimes()
+
+        self.assertEqual(len(response.json()["arbitrage"]), 3)
+        self.assertEqual(len(lifetimes), 5)
+
+    def test_history_endpoints(self):
+        """Test the history and survival views over the shared store"""
+        with override_settings(ARBITRAGE_HISTORY_PATH=self.path):
+            arbitrage_history.record(
+                [history_entry("LeBron James", "FanDuel", "DraftKings", 1.0)]
+            )
+            arbitrage_history.flush()
+
+            lifetimes = self.client.get(
+                reverse("arbitrage:arbitrage-history"), {"player": "LeBron James"}
+            ).json()["lifetimes"]
+            survival = self.client.get(
+                reverse("arbitrage:arbitrage-survival"), {"hours": 1}
+            ).json()["survival"]
+            bad = self.client.get(
+                reverse("arbitrage:arbitrage-history"), {"limit": "x"}
+            )
+
+        self.assertEqual(len(lifetimes), 1)
+        self.assertEqual(survival[0]["book_pair"], "DraftKings / FanDuel")
+        self.assertEqual(bad.status_code, 400)
+
+
+class MultiSportScanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Start the worker processes before any scan deadline is running
+        _process_pool().submit(int).result()
+
+    def setUp(self):
+        self.release = threading.Event()
+        arb = market_game(
+            "Lakers",
+            "Warriors",
+            {
+                "FanDuel": {"h2h": [{"name": "Lakers", "price": 2.2}]},
+                "DraftKings": {"h2h": [{"name": "Warriors", "price": 2.1}]},
+                "BetMGM": {
+                    "h2h": [
+                        {"name": "Lakers", "price": 1.8},
+                        {"name": "Warriors", "price": 1.8},
+                    ]
+                },
+            },
+        )
+        value = market_game(
+            "Bruins",
+            "Rangers",
+            {
+                title: {
+                    "h2h": [
+                        {"name": "Bruins", "price": price},
+                        {"name": "Rangers", "price": 1.6},
+                    ]
+                }
+                for title, price in (
+                    ("FanDuel", 1.9),
+                    ("BetMGM", 1.9),
+                    ("Caesars", 2.6),
+                )
+            },
+        )
+        self.odds = {"basketball_nba": [arb], "icehockey_nhl": [value]}
+
+    def tearDown(self):
+        self.release.set()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def _fake_get(self, url, params=None, timeout=None):
+        response = MagicMock()
+        response.status_code = 200
+        if url.endswith("/v4/sports/"):
+            response.json.return_value = [
+                {"key": "basketball_nba", "active": True, "has_outrights": False},
+                {"key": "icehockey_nhl", "active": True, "has_outrights": False},
+                {"key": "soccer_epl", "active": True, "has_outrights": False},
+                {"key": "golf_masters", "active": True, "has_outrights": True},
+                {"key": "baseball_mlb", "active": False, "has_outrights": False},
+            ]
+            return response
+
+        sport = url.split("/sports/")[1].split("/")[0]
+        if sport == "soccer_epl":
+            # Stuck until the test finishes
+            self.release.wait(10)
+        response.json.return_value = json.loads(json.dumps(self.odds.get(sport, [])))
+        return response
+
+    @patch("odds.utils.upstream.session.get")
+    def test_merges_sports_and_times_out_slow_ones(self, mock_get):
+        """Test that a stuck sport times out without holding back the rest"""
+        mock_get.side_effect = self._fake_get
+
+        results = scan_sports(timeout=1.5)
+
+        self.assertEqual(
+            set(results["sports"]), {"basketball_nba", "icehockey_nhl", "soccer_epl"}
+        )
+        self.assertEqual(results["sports"]["soccer_epl"]["status"], "timeout")
+        nba = results["sports"]["basketball_nba"]
+        self.assertEqual(nba["status"], "ok")
+        self.assertEqual(nba["events"], 1)
+        self.assertIn("detect_seconds", nba)
+
+        [arb] = results["arbitrage"]
+        self.assertEqual(arb["sport"], "basketball_nba")
+        self.assertEqual(arb["profit_percent"], 6.93)
+        top_value = results["value_bets"][0]
+        self.assertEqual(
+            (top_value["sport"], top_value["team"]), ("icehockey_nhl", "Bruins")
+        )
+        values = [bet["value_percentage"] for bet in results["value_bets"]]
+        self.assertEqual(values, sorted(values, reverse=True))
+
+    @patch("odds.utils.upstream.session.get")
+    def test_scan_endpoint(self, mock_get):
+        """Test the endpoint with an explicit sports list"""
+        mock_get.side_effect = self._fake_get
+
+        response = self.client.get(
+            reverse("arbitrage:multi-sport-scan"),
+            {"sports": "basketball_nba,icehockey_nhl"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["arbitrage"][0]["sport"], "basketball_nba")
+        self.assertEqual(
+            {sport: entry["status"] for sport, entry in data["sports"].items()},
+            {"basketball_nba": "ok", "icehockey_nhl": "ok"},
+        )
+
+
+def with_ids(game, event_id):
+    """Adds the event id and bookmaker keys the live API payloads carry."""
+    game["id"] = event_id
+    for bookmaker in game["bookmakers"]:
+        bookmaker["key"] = bookmaker["title"].lower()
+    return game
+
+
+class VerifyOpportunitiesTest(TestCase):
+    def setUp(self):
+        self.games = [
+            with_ids(
+                market_game(
+                    home,
+                    away,
+                    {
+                        "FanDuel": {"h2h": [{"name": home, "price": 2.2}]},
+                        "DraftKings": {"h2h": [{"name": away, "price": 2.1}]},
+                        "BetMGM": {
+                            "h2h": [
+                                {"name": home, "price": 1.8},
+                                {"name": away, "price": 1.8},
+                            ]
+                        },
+                    },
+                ),
+                event_id,
+            )
+            for event_id, home, away in (
+                ("event1", "Lakers", "Warriors"),
+                ("event2", "Celtics", "Knicks"),
+            )
+        ]
+        # Live prices: event1 moved but still an arb, event2's arb is gone
+        self.live = {
+            "event1": {"fanduel": 2.15, "draftkings": 2.1},
+            "event2": {"fanduel": 1.9, "draftkings": 2.1},
+        }
+        self.delay = 0
+
+    def _fake_get(self, url, params=None, timeout=None):
+        time.sleep(self.delay)
+        event_id = url.split("/events/")[1].split("/")[0]
+        game = next(g for g in self.games if g["id"] == event_id)
+        sides = {"fanduel": game["home_team"], "draftkings": game["away_team"]}
+        titles = {"fanduel": "FanDuel", "draftkings": "DraftKings"}
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {
+            "id": event_id,
+            "bookmakers": [
+                {
+                    "key": key,
+                    "title": titles[key],
+                    "markets": [
+                        {
+                            "key": "h2h",
+                            "outcomes": [{"name": sides[key], "price": price}],
+                        }
+                    ],
+                }
+                for key, price in self.live[event_id].items()
+                if key in params["bookmakers"].split(",")
+            ],
+        }
+        return response
+
+    @patch("odds.utils.upstream.session.get")
+    def test_confirms_and_drops_with_targeted_fetches(self, mock_get):
+        """Test one bookmaker-filtered request per event and the recheck result"""
+        mock_get.side_effect = self._fake_get
+        candidates = find_market_arbitrage(self.games)
+
+        kept, dropped = verify_opportunities(candidates, self.games, "basketball_nba")
+
+        self.assertEqual(mock_get.call_count, 2)
+        for call in mock_get.call_args_list:
+            query = call.kwargs["params"]
+            self.assertEqual(query["bookmakers"], "fanduel,draftkings")
+            self.assertEqual(query["markets"], "h2h")
+            self.assertNotIn("regions", query)
+
+        [confirmed] = kept
+        self.assertEqual(confirmed["verification"], "confirmed")
+        self.assertEqual(confirmed["side_1"]["price"], 2.15)
+        self.assertEqual(confirmed["profit_percent"], 5.87)
+        self.assertEqual([entry["event"] for entry in dropped], ["Celtics vs Knicks"])
+
+    @patch("odds.utils.upstream.session.get")
+    def test_keeps_candidates_unverified_past_the_budget(self, mock_get):
+        """Test that a slow recheck returns the candidates flagged unverified"""
+        self.delay = 0.5
+        mock_get.side_effect = self._fake_get
+        candidates = find_market_arbitrage(self.games)
+
+        started = time.monotonic()
+        kept, dropped = verify_opportunities(
+            candidates, self.games, "basketball_nba", budget=0.1
+        )
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(dropped, [])
+        self.assertEqual(
+            [entry["verification"] for entry in kept], ["unverified", "unverified"]
+        )
+
+    @patch("odds.utils.upstream.session.get")
+    def test_rechecks_player_prop_lines(self, mock_get):
+        """Test that prop entries are matched on player and line"""
+        game = with_ids(
+            prop_game(
+                [
+                    ("FanDuel", "LeBron James", "Over", 24.5, 2.2),
+                    ("DraftKings", "LeBron James", "Under", 24.5, 2.1),
+                ]
+            ),
+            "event1",
+        )
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = game
+        mock_get.return_value = response
+        candidates, _ = find_arbitrage([game])
+
+        kept, _ = verify_opportunities(candidates, [game], "basketball_nba")
+
+        self.assertEqual(kept[0]["verification"], "confirmed")
+        self.assertEqual(kept[0]["profit_percent"], candidates[0]["profit_percent"])
+
+
+def reference_value_bets(games, threshold, market_key):
+    """Loop-by-loop de-vigged consensus, the reference for find_value_bets."""
+    value_bets = []
+    for game in games:
+        lines = {}  # line -> {book: {name: price}}
+        for bookmaker in game["bookmakers"]:
+            for market in bookmaker["markets"]:
+                if market["key"] != market_key:
+                    continue
+                for outcome in market["outcomes"]:
+                    line = outcome.get("point") if market_key == "totals" else None
+                    book = lines.setdefault(line, {}).setdefault(bookmaker["title"], {})
+                    book[outcome["name"]] = outcome["price"]
+
+        for line, books in lines.items():
+            names = []
+            for prices in books.values():
+                names.extend(name for name in prices if name not in names)
+            fair = {name: [] for name in names}
+            for prices in books.values():
+                if len(prices) == len(names) >= 2:
+                    overround = sum(1 / price for price in prices.values())
+                    for name, price in prices.items():
+                        fair[name].append(1 / price / overround)
+
+            for name in names:
+                quotes = [(t, p[name]) for t, p in books.items() if name in p]
+                if len(quotes) < 2 or not fair[name]:
+                    continue
+                consensus_odds = len(fair[name]) / sum(fair[name])
+                for title, price in quotes:
+                    value = (price - consensus_odds) / consensus_odds * 100
+                    if value >= threshold:
+                        value_bets.append((title, name, line, price, round(value, 2)))
+    return sorted(value_bets)
+
+
+def random_value_slate(rng):
+    # h2h (with a draw on odd games) and totals lines, some books partial
+    titles = list(BOOKMAKER_URLS)[:10]
+    slate = []
+    for g in range(6):
+        books = {}
+        for title in titles:
+            markets = {}
+            if rng.random() < 0.9:
+                markets["h2h"] = [
+                    {"name": name, "price": rng.choice([1.6, 1.8, 1.9, 2.1, 2.4])}
+                    for name in (f"Home {g}", f"Away {g}", "Draw")
+                    if name != "Draw" or g % 2
+                    if rng.random() < 0.9
+                ]
+            point = rng.choice([210.5, 215.5])
+            markets["totals"] = [
+                {"name": name, "price": rng.choice([1.8, 1.9, 2.0]), "point": point}
+                for name in ("Over", "Under")
+            ]
+            books[title] = markets
+        slate.append(
+            with_ids(market_game(f"Home {g}", f"Away {g}", books), f"event{g}")
+        )
+    return slate
+
+
+def value_bet_summary(value_bets):
+    return sorted(
+        (b["bookmaker"], b["team"], b.get("point"), b["odds"], b["value_percentage"])
+        for b in value_bets
+    )
+
+
+class ValueEngineTest(TestCase):
+    def test_matches_loop_reference_on_random_slates(self):
+        """Test the array pass against a loop-by-loop de-vigged consensus"""
+        rng = random.Random(11)
+        for _ in range(10):
+            slate = random_value_slate(rng)
+            for market_key in ("h2h", "totals"):
+                self.assertEqual(
+                    value_bet_summary(
+                        find_value_bets(slate, 3.0, markets=(market_key,))
+                    ),
+                    reference_value_bets(slate, 3.0, market_key),
+                )
+
+    def test_removes_each_books_vig(self):
+        """Test that a heavily juiced book doesn't drag the consensus down"""
+        game = market_game(
+            "Lakers",
+            "Warriors",
+            {
+                # Fair 50/50 at 10% and 2% margins
+                "FanDuel": {
+                    "h2h": [
+                        {"name": "Lakers", "price": 1.82},
+                        {"name": "Warriors", "price": 1.82},
+                    ]
+                },
+                "DraftKings": {
+                    "h2h": [
+                        {"name": "Lakers", "price": 1.96},
+                        {"name": "Warriors", "price": 1.96},
+                    ]
+                },
+                # Only one side listed: scored, but can't set the consensus
+                "BetMGM": {"h2h": [{"name": "Lakers", "price": 2.12}]},
+            },
+        )
+
+        [bet] = detect_value_bets([game], threshold=5.0)
+
+        self.assertEqual(bet["bookmaker"], "BetMGM")
+        self.assertEqual(bet["consensus_odds"], 2.0)
+        self.assertEqual(bet["value_percentage"], 6.0)
+        self.assertNotIn("market", bet)
+
+    def test_other_markets_report_line(self):
+        """Test that totals bets carry their market and point"""
+        game = market_game(
+            "Lakers",
+            "Warriors",
+            {
+                title: {
+                    "totals": [
+                        {"name": "Over", "price": over, "point": 220.5},
+                        {"name": "Under", "price": 1.9, "point": 220.5},
+                    ]
+                }
+                for title, over in (
+                    ("FanDuel", 1.9),
+                    ("DraftKings", 1.9),
+                    ("BetMGM", 2.2),
+                )
+            },
+        )
+
+        [bet] = detect_value_bets([game], markets=("totals",))
+
+        self.assertEqual(
+            (bet["market"], bet["team"], bet["point"]), ("totals", "Over", 220.5)
+        )
+
+
+class PropValueBetsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_scores_quotes_against_devigged_line(self):
+        """Test a book's lone Over against two de-vigged books on its line"""
+        game = prop_game(
+            [
+                ("FanDuel", "LeBron James", "Over", 20.5, 1.9),
+                ("FanDuel", "LeBron James", "Under", 20.5, 1.9),
+                ("DraftKings", "LeBron James", "Over", 20.5, 2.0),
+                ("DraftKings", "LeBron James", "Under", 20.5, 1.8),
+                ("BetMGM", "LeBron James", "Over", 20.5, 2.2),
+            ]
+        )
+
+        [bet] = find_prop_value_bets([game])
+
+        fair = (0.5 + (1 / 2.0) / (1 / 2.0 + 1 / 1.8)) / 2
+        self.assertEqual(
+            (bet["bookmaker"], bet["side"], bet["point"]), ("BetMGM", "Over", 20.5)
+        )
+        self.assertEqual(bet["value_percentage"], round((2.2 * fair - 1) * 100, 2))
+        self.assertEqual(bet["consensus_odds"], round(1 / fair, 2))
+        self.assertEqual((bet["consensus"], bet["consensus_books"]), ("line", 2))
+
+    def test_alternate_points_interpolate_consensus(self):
+        """Test that a point only one book posts borrows its neighbours' consensus"""
+        quotes = []
+        for title in ("FanDuel", "DraftKings"):
+            quotes += [
+                (title, "LeBron James", "Over", 19.5, 1.6),
+                (title, "LeBron James", "Under", 19.5, 2.4),
+                (title, "LeBron James", "Over", 21.5, 2.4),
+                (title, "LeBron James", "Under", 21.5, 1.6),
+            ]
+        quotes += [
+            ("Caesars", "LeBron James", "Over", 20.5, 2.15),
+            ("Caesars", "LeBron James", "Under", 20.5, 1.7),
+            # Beyond every other book's points: no consensus
+            ("Caesars", "LeBron James", "Over", 24.5, 9.0),
+        ]
+
+        [bet] = find_prop_value_bets([prop_game(quotes)])
+
+        self.assertEqual(
+            (bet["bookmaker"], bet["side"], bet["point"]), ("Caesars", "Over", 20.5)
+        )
+        self.assertEqual(bet["consensus"], "interpolated")
+        self.assertEqual(bet["fair_probability"], 0.5)
+        self.assertEqual(bet["value_percentage"], 7.5)
+
+    def test_index_holds_both_sides_per_book(self):
+        """Test the (player, market, point) index keeps each book's prices"""
+        game = prop_game(
+            [
+                ("FanDuel", "LeBron James", "Over", 20.5, 1.9),
+                ("FanDuel", "LeBron James", "Under", 20.5, 1.85),
+                ("DraftKings", "LeBron James", "Over", 21.5, 2.05),
+            ]
+        )
+
+        index = PropLineIndex([game])
+        fair_over, books, interpolated = index.consensus(min_books=1)
+
+        self.assertEqual(len(index), 2)
+        row = index.rows[("LeBron James", "player_points", 20.5)]
+        fanduel = (1 / 1.9) / (1 / 1.9 + 1 / 1.85)
+        self.assertAlmostEqual(fair_over[row], fanduel)
+        self.assertEqual((books[row], interpolated[row]), (1, False))
+        # DraftKings prices only the Over at 21.5, so it can't be de-vigged
+        row = index.rows[("LeBron James", "player_points", 21.5)]
+        self.assertTrue(math.isnan(fair_over[row]))
+        self.assertEqual(books[row], 0)
+        self.assertNotIn(("LeBron James", "player_points", 30.5), index.rows)
+
+    @patch("odds.arbitrage.player_props.fetch_player_prop_odds")
+    def test_value_endpoint(self, mock_fetch):
+        mock_fetch.return_value = (
+            [
+                prop_game(
+                    [
+                        ("FanDuel", "LeBron James", "Over", 20.5, 1.9),
+                        ("FanDuel", "LeBron James", "Under", 20.5, 1.9),
+                        ("DraftKings", "LeBron James", "Over", 20.5, 1.9),
+                        ("DraftKings", "LeBron James", "Under", 20.5, 1.9),
+                        ("BetMGM", "LeBron James", "Under", 20.5, 2.1),
+                    ]
+                )
+            ],
+            [],
+        )
+
+        response = self.client.get(
+            reverse("arbitrage:player-prop-value"), {"threshold": "4"}
+        )
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(b["bookmaker"], b["value_percentage"]) for b in data["value_bets"]],
+            [("BetMGM", 5.0)],
+        )
+        self.assertEqual(data["failed_events"], [])
+        mock_fetch.assert_called_once_with("basketball_nba", "player_points")
+
+        response = self.client.get(
+            reverse("arbitrage:player-prop-value"), {"threshold": "high"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ConsensusStoreTest(TestCase):
+    markets = ("h2h", "totals")
+
+    def _recomputed(self, slate):
+        return value_bet_summary(find_value_bets(slate, 5.0, markets=self.markets))
+
+    def test_tracks_full_recompute_across_snapshots(self):
+        """Test that syncing whole snapshots agrees with recomputing them"""
+        rng = random.Random(5)
+        store = ConsensusStore()
+
+        for _ in range(10):
+            slate = random_value_slate(rng)
+            store.apply_games(slate, self.markets)
+            self.assertEqual(
+                value_bet_summary(store.value_bets()), self._recomputed(slate)
+            )
+
+    def test_tracks_full_recompute_across_single_updates(self):
+        """Test that one price at a time agrees with recomputing the slate"""
+        rng = random.Random(6)
+        slate = random_value_slate(rng)
+        store = ConsensusStore()
+        store.apply_games(slate, self.markets)
+
+        for _ in range(300):
+            game = rng.choice(slate)
+            bookmaker = rng.choice(game["bookmakers"])
+            market = rng.choice(bookmaker["markets"])
+            if not market["outcomes"]:
+                continue
+            outcome = rng.choice(market["outcomes"])
+            outcome["price"] = rng.choice([1.5, 1.7, 1.9, 2.1, 2.3, 2.6])
+
+            store.update(game, market["key"], bookmaker["title"], outcome)
+
+        self.assertEqual(value_bet_summary(store.value_bets()), self._recomputed(slate))
+
+    def test_consensus_does_not_drift_over_many_updates(self):
+        """Test that a long-lived line's consensus equals a fresh store's exactly"""
+        rng = random.Random(7)
+        slate = random_value_slate(rng)
+        store = ConsensusStore()
+        store.apply_games(slate, self.markets)
+
+        game = slate[0]
+        for _ in range(2000):
+            bookmaker = rng.choice(game["bookmakers"])
+            outcome = rng.choice(bookmaker["markets"][-1]["outcomes"])
+            outcome["price"] = rng.choice([1.53, 1.71, 1.87, 1.93, 2.07, 2.61])
+            store.update(game, "totals", bookmaker["title"], outcome)
+
+        fresh = ConsensusStore()
+        fresh.apply_games(slate, self.markets)
+        for key in store._lines:
+            self.assertEqual(store.consensus(key), fresh.consensus(key))
+        self.assertEqual(value_bet_summary(store.value_bets()), self._recomputed(slate))
+
+    def test_single_updates_emit_deltas(self):
+        """Test added, changed and removed deltas as one book's price moves"""
+        game = market_game("Lakers", "Warriors", {})
+        game["id"] = "event1"
+        store = ConsensusStore()
+        for title in ("FanDuel", "DraftKings"):
+            store.update(game, "h2h", title, {"name": "Lakers", "price": 1.9})
+            store.update(game, "h2h", title, {"name": "Warriors", "price": 1.9})
+
+        [added] = store.update(game, "h2h", "BetMGM", {"name": "Lakers", "price": 2.1})
+        [changed] = store.update(
+            game, "h2h", "BetMGM", {"name": "Lakers", "price": 2.2}
+        )
+        # A partial book doesn't move the consensus: nothing else is re-scored
+        self.assertEqual(
+            store.update(game, "h2h", "Caesars", {"name": "Warriors", "price": 1.5}),
+            [],
+        )
+        # FanDuel drifting on the Lakers lowers their fair probability
+        moved = store.update(game, "h2h", "FanDuel", {"name": "Lakers", "price": 2.6})
+
+        self.assertEqual([d["change"] for d in (added, changed)], ["added", "changed"])
+        self.assertEqual(
+            sorted((d["change"], d["key"][1]) for d in moved),
+            [("added", "FanDuel"), ("removed", "BetMGM")],
+        )
+        self.assertEqual(
+            added["key"], (("event1", "h2h", None, None), "BetMGM", "Lakers")
+        )
+        self.assertEqual(added["value_bet"]["value_percentage"], 5.0)
+        self.assertEqual(changed["value_bet"]["value_percentage"], 10.0)
+
+        fanduel = (1 / 2.6) / (1 / 2.6 + 1 / 1.9)
+        consensus = store.consensus(("event1", "h2h", None, None))
+        self.assertAlmostEqual(consensus["Lakers"], (fanduel + 0.5) / 2)
+        self.assertAlmostEqual(consensus["Warriors"], (1 - fanduel + 0.5) / 2)
+        self.assertEqual(
+            [(b["bookmaker"], b["value_percentage"]) for b in store.value_bets()],
+            [("FanDuel", 19.89)],
+        )
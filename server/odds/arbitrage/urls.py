@@ -1,10 +1,18 @@
 from django.urls import path
 
-from .player_props import player_prop_arbitrage
+from .player_props import (
+    player_prop_arbitrage,
+    player_prop_middles,
+    player_prop_value_bets,
+)
 from .value_detection import value_bet_opportunities
 from .views import (
+    arbitrage_history_view,
     arbitrage_opportunities,
+    arbitrage_survival,
     calculate_arbitrage_stakes,
+    calculate_arbitrage_stakes_batch,
+    multi_sport_scan,
     test_arbitrage_with_fake_data,  # Remove: Later Test Data
 )
 
@@ -14,8 +22,18 @@ urlpatterns = [
     path("find/", arbitrage_opportunities, name="find_arbitrage"),
     path("opportunities/", arbitrage_opportunities, name="arbitrage-opportunities"),
     path("calculate/", calculate_arbitrage_stakes, name="calculate_arbitrage"),
+    path(
+        "calculate/batch/",
+        calculate_arbitrage_stakes_batch,
+        name="calculate_arbitrage_batch",
+    ),
+    path("history/", arbitrage_history_view, name="arbitrage-history"),
+    path("history/survival/", arbitrage_survival, name="arbitrage-survival"),
+    path("scan/", multi_sport_scan, name="multi-sport-scan"),
     path("valuebets/", value_bet_opportunities, name="value_bet_opportunities"),
     path("player-props/", player_prop_arbitrage, name="player-prop-arbitrage"),
+    path("player-props/middles/", player_prop_middles, name="player-prop-middles"),
+    path("player-props/value/", player_prop_value_bets, name="player-prop-value"),
     path(
         "test/", test_arbitrage_with_fake_data, name="arbitrage-fake"
     ),  # New fake data route
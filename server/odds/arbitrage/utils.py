@@ -1,3 +1,7 @@
+import heapq
+
+from django.conf import settings
+
 BOOKMAKER_URLS = {
     "FanDuel": "https://sportsbook.fanduel.com",
     "DraftKings": "https://sportsbook.draftkings.com",
@@ -40,145 +44,211 @@ def calculate_arbitrage(odds_team1, odds_team2):
         return False, 0
 
 
-def find_arbitrage(games, market_key="player_points", include_same_book=False):
-    opportunities = []
-    near_arbs = []
+class _TopK:
+    """Keeps the k highest-priority items in a bounded min-heap."""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def can_improve(self, priority):
+        return len(self.heap) < self.k or (self.k > 0 and priority > self.heap[0][0])
+
+    def offer(self, priority, item):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (priority, item))
+        elif self.k > 0 and priority > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (priority, item))
 
-    for game in games:
-        event = f"{game['home_team']} vs {game['away_team']}"
-        commence_time = game["commence_time"]
-        player_markets = {}
+    def items(self):
+        return [item for _, item in sorted(self.heap, reverse=True)]
 
-        for bookmaker in game.get("bookmakers", []):
-            title = bookmaker["title"]
-            for market in bookmaker.get("markets", []):
-                if market["key"] != market_key:
+
+def _collect_lines(game, market_key):
+    # (player, point) -> {"Over": [...], "Under": [...]} in bookmaker order
+    player_markets = {}
+
+    for bookmaker in game.get("bookmakers", []):
+        title = bookmaker["title"]
+        for market in bookmaker.get("markets", []):
+            if market["key"] != market_key:
+                continue
+
+            for outcome in market.get("outcomes", []):
+                name = outcome.get("name")
+                player = outcome.get("description")
+                price = outcome.get("price")
+                point = outcome.get("point")
+
+                if not all([name, player, price, point]):
                     continue
 
-                for outcome in market.get("outcomes", []):
-                    name = outcome.get("name")
-                    player = outcome.get("description")
-                    price = outcome.get("price")
-                    point = outcome.get("point")
+                sides = player_markets.setdefault(
+                    (player, point), {"Over": [], "Under": []}
+                )
+                if name in sides:
+                    sides[name].append({"bookmaker": title, "price": price})
 
-                    if not all([name, player, price, point]):
-                        continue
+    return player_markets
 
-                    key = (player, point)
-                    player_markets.setdefault(key, {"Over": [], "Under": []})
-                    player_markets[key][name].append(
-                        {
-                            "bookmaker": title,
-                            "price": price,
-                        }
-                    )
 
-        for (player, point), sides in player_markets.items():
-            #  print(f"\n[CHECK] Player: {player} | Line: {point}")
-            # print(f"  Over: {[o['bookmaker'] + '@' + str(o['price']) for o in sides['Over']]}")
-            # print(f"  Under: {[u['bookmaker'] + '@' + str(u['price']) for u in sides['Under']]}")
+def _pairs_best_first(overs, unders, include_same_book):
+    """
+    Yields (total_implied, over_index, under_index) for Over/Under pairs in
+    ascending total implied probability, best prices first.
 
-            for over in sides["Over"]:
-                for under in sides["Under"]:
-                    if over["bookmaker"] == under["bookmaker"]:
-                        continue
+    Each side is ordered by implied probability once, then pairs are walked
+    best-first over that grid, so callers can stop as soon as the remaining
+    pairs can't matter instead of building all len(overs) * len(unders).
+    """
+    over_implied = [1 / o["price"] for o in overs]
+    under_implied = [1 / u["price"] for u in unders]
+    over_order = sorted(range(len(overs)), key=over_implied.__getitem__)
+    under_order = sorted(range(len(unders)), key=under_implied.__getitem__)
+    if not over_order or not under_order:
+        return
+
+    def pair(a, b):
+        i, j = over_order[a], under_order[b]
+        return (over_implied[i] + under_implied[j], a, b)
+
+    frontier = [pair(0, 0)]
+    seen = {(0, 0)}
+    while frontier:
+        total, a, b = heapq.heappop(frontier)
+        for next_a, next_b in ((a + 1, b), (a, b + 1)):
+            if (
+                next_a < len(over_order)
+                and next_b < len(under_order)
+                and (next_a, next_b) not in seen
+            ):
+                seen.add((next_a, next_b))
+                heapq.heappush(frontier, pair(next_a, next_b))
+
+        i, j = over_order[a], under_order[b]
+        if not include_same_book and overs[i]["bookmaker"] == unders[j]["bookmaker"]:
+            continue
+        yield total, i, j
+
+
+def _arbitrage_entry(market_key, game, player, point, over, under):
+    return {
+        "type": market_key,
+        "event": f"{game['home_team']} vs {game['away_team']}",
+        "commence_time": game["commence_time"],
+        "player": player,
+        "line": point,
+        "side_1": {
+            **over,
+            "name": "Over",
+            "site": BOOKMAKER_URLS.get(over["bookmaker"]),
+        },
+        "side_2": {
+            **under,
+            "name": "Under",
+            "site": BOOKMAKER_URLS.get(under["bookmaker"]),
+        },
+    }
+
+
+def find_arbitrage(
+    games, market_key="player_points", include_same_book=False, top_k=3, engine=None
+):
+    """
+    Finds the best Over/Under arbitrage and near-arbitrage pairs across books.
 
-                    implied_1 = 1 / over["price"]
-                    implied_2 = 1 / under["price"]
-                    total = implied_1 + implied_2
+    Pairs are ranked by rounded profit (arbs) or rounded implied total (near
+    arbs); ties keep the order the pairs appear in the games, so results
+    match a full pairwise scan.
+
+    Args:
+        games (list): Event odds payloads with bookmakers and markets
+        market_key (str): Player prop market, e.g. "player_points"
+        include_same_book (bool): Also pair an Over with the same book's Under
+        top_k (int): How many arbs and near arbs to return
+        engine (str): "python" or "numpy" (odds/arbitrage/vectorized.py);
+            defaults to settings.ARBITRAGE_ENGINE
+
+    Returns:
+        tuple: (opportunities, near_arbs), best first
+    """
+    if (engine or settings.ARBITRAGE_ENGINE) == "numpy":
+        from odds.arbitrage.vectorized import find_arbitrage_vectorized
+
+        return find_arbitrage_vectorized(
+            games, market_key, include_same_book=include_same_book, top_k=top_k
+        )
+
+    opportunities = _TopK(top_k)
+    near_arbs = _TopK(top_k)
+
+    for game_index, game in enumerate(games):
+        player_markets = _collect_lines(game, market_key)
+
+        for line_index, ((player, point), sides) in enumerate(player_markets.items()):
+            overs, unders = sides["Over"], sides["Under"]
+            line = (game, player, point)
+            arbs_done = False
+
+            for total, i, j in _pairs_best_first(overs, unders, include_same_book):
+                # Position of the pair in a full scan, earlier ranks higher
+                order = (-game_index, -line_index, -i, -j)
+                # The best any later pair on this line could rank
+                best_order = (-game_index, -line_index, 0, 0)
+
+                if total < 1:
                     profit = round((1 - total) * 100, 2)
+                    if arbs_done or not opportunities.can_improve(
+                        (profit, *best_order)
+                    ):
+                        arbs_done = True
+                        continue
+                    opportunities.offer(
+                        (profit, *order), (line, overs[i], unders[j], profit)
+                    )
+                else:
+                    implied_total = round(total, 3)
+                    if not near_arbs.can_improve((-implied_total, *best_order)):
+                        break
+                    near_arbs.offer(
+                        (-implied_total, *order),
+                        (line, overs[i], unders[j], implied_total),
+                    )
 
-                    entry = {
-                        "type": market_key,
-                        "event": event,
-                        "commence_time": commence_time,
-                        "player": player,
-                        "line": point,
-                        "side_1": {
-                            **over,
-                            "name": "Over",
-                            "site": BOOKMAKER_URLS.get(over["bookmaker"]),
-                        },
-                        "side_2": {
-                            **under,
-                            "name": "Under",
-                            "site": BOOKMAKER_URLS.get(under["bookmaker"]),
-                        },
-                    }
-
-                    if total < 1:
-                        entry["profit_percent"] = profit
-                        opportunities.append(entry)
-
-                        import json
-
-                        print("[DEBUG] Arbitrage Entry:", json.dumps(entry, indent=2))
-
-                    else:
-                        entry["implied_total"] = round(total, 3)
-                        near_arbs.append(entry)
-
-                opportunities = sorted(
-                    opportunities, key=lambda x: x["profit_percent"], reverse=True
-                )[:3]
-                near_arbs = sorted(near_arbs, key=lambda x: x["implied_total"])[:3]
-
-    # print(f"[DEBUG] Found {len(opportunities)} arbitrage opportunities.")
-    return opportunities, near_arbs
+    return (
+        _ranked_entries(opportunities, "profit_percent", market_key),
+        _ranked_entries(near_arbs, "implied_total", market_key),
+    )
+
+
+def _ranked_entries(top, field, market_key):
+    entries = []
+    for (game, player, point), over, under, value in top.items():
+        entry = _arbitrage_entry(market_key, game, player, point, over, under)
+        entry[field] = value
+        entries.append(entry)
+    return entries
 
 
 # VALUE BET DETECTOR
-# Detects value bets based on deviation from consensus odds.
+# Detects value bets based on deviation from the de-vigged consensus odds.
 # We'll return opportunities with EV% over a given threshold.
-def detect_value_bets(games, threshold=5.0):
-    value_bets = []
-
-    for game in games:
-        market_odds = {}  # Dictionary to collect odds for each team
-
-        for bookmaker in game.get("bookmakers", []):
-            for market in bookmaker.get("markets", []):
-                if market.get("key") == "h2h":
-                    for outcome in market.get("outcomes", []):
-                        team = outcome["name"]
-                        odds = outcome["price"]
-
-                        # Group odds by team
-                        market_odds.setdefault(team, []).append(
-                            {"bookmaker": bookmaker["title"], "odds": odds}
-                        )
-        # Iterate over teams and evaluate value
-        for team, entries in market_odds.items():
-            if len(entries) < 2:
-                continue  # Not enough data to compare
-
-            # Calculate consensus implied probability
-            implied_probs = [1 / e["odds"] for e in entries]
-            consensus_prob = sum(implied_probs) / len(implied_probs)
-            consensus_odds = 1 / consensus_prob
-
-            for entry in entries:
-                bookmaker_odds = entry["odds"]
-                # Calculate value percentage (potential misprice)
-                value_percentage = (
-                    (bookmaker_odds - consensus_odds) / consensus_odds
-                ) * 100
-
-                # Only include bets above the value threshold
-                if value_percentage >= threshold:
-                    value_bets.append(
-                        {
-                            "team": team,
-                            "bookmaker": entry["bookmaker"],
-                            "odds": bookmaker_odds,
-                            "consensus_odds": round(consensus_odds, 2),
-                            "value_percentage": round(value_percentage, 2),
-                            "game": {
-                                "home_team": game["home_team"],
-                                "away_team": game["away_team"],
-                                "commence_time": game["commence_time"],
-                            },
-                        }
-                    )
+def detect_value_bets(games, threshold=5.0, markets=("h2h",)):
+    """
+    Finds quotes priced above the consensus fair odds.
+
+    Each book's vig is removed per market before the consensus is taken;
+    see odds/arbitrage/value.py.
+
+    Args:
+        games (list): Odds payloads with bookmakers and markets
+        threshold (float): Minimum value_percentage to report
+        markets (iterable): Market keys to score, e.g. ("h2h", "totals")
+
+    Returns:
+        list: Value bets with team, bookmaker, odds, consensus_odds,
+              value_percentage and game
+    """
+    from odds.arbitrage.value import find_value_bets
 
-    return value_bets
+    return find_value_bets(games, threshold=threshold, markets=markets)
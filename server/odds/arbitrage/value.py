@@ -0,0 +1,163 @@
+"""
+De-vigged consensus value engine.
+
+Every quote on the slate is loaded into one (line x outcome x book) array of
+implied probabilities, where a line is one market on one game (per player
+and point for props, per point for spreads and totals; see
+odds/arbitrage/markets.py). Each book's overround is removed by normalising
+its probabilities over the line's outcomes, the fair consensus is the mean of
+those vig-free probabilities across books, and every quote is scored against
+it in the same array pass:
+
+    value_percentage = (price - consensus_odds) / consensus_odds * 100
+
+Only books that price every outcome of a line can be de-vigged, so only they
+set the consensus; quotes from books with a partial line are still scored.
+"""
+
+import numpy as np
+
+from odds.arbitrage.markets import outcome_group
+
+
+def build_probability_array(games, markets):
+    """
+    Loads a slate's quotes for markets into an implied probability array.
+
+    Args:
+        games (list): Odds payloads with bookmakers and markets
+        markets (iterable): Market keys, e.g. ("h2h", "totals")
+
+    Returns:
+        tuple: (lines, books, probabilities, quotes) where lines lists
+               (game, group key, outcome names) in scan order, books the
+               bookmaker titles, probabilities a float array of shape
+               (lines, outcomes, books) with NaN where a book has no quote,
+               and quotes maps (line, outcome, book) to the best quote
+    """
+    markets = set(markets)
+    lines, line_index = [], {}
+    books, book_index = [], {}
+    quotes = {}
+
+    for game_number, game in enumerate(games):
+        for bookmaker in game.get("bookmakers", []):
+            title = bookmaker["title"]
+            book = book_index.setdefault(title, len(books))
+            if book == len(books):
+                books.append(title)
+
+            for market in bookmaker.get("markets", []):
+                if market["key"] not in markets:
+                    continue
+                for outcome in market.get("outcomes", []):
+                    price = outcome.get("price")
+                    placed = outcome_group(game, market["key"], outcome)
+                    if not price or placed is None:
+                        continue
+
+                    group, name = placed
+                    line = line_index.get((game_number, group))
+                    if line is None:
+                        line = line_index[(game_number, group)] = len(lines)
+                        lines.append((game, group, []))
+                    names = lines[line][2]
+                    if name not in names:
+                        names.append(name)
+
+                    cell = (line, names.index(name), book)
+                    # A book quoting an outcome twice keeps its best price
+                    if cell not in quotes or price > quotes[cell]["price"]:
+                        quotes[cell] = {"price": price, "point": outcome.get("point")}
+
+    width = max((len(names) for _, _, names in lines), default=0)
+    probabilities = np.full((len(lines), max(width, 1), max(len(books), 1)), np.nan)
+    if quotes:
+        index = tuple(np.array(axis, dtype=np.intp) for axis in zip(*quotes))
+        prices = np.array([quote["price"] for quote in quotes.values()], dtype=float)
+        probabilities[index] = 1 / prices
+
+    return lines, books, probabilities, quotes
+
+
+def complete_books(probabilities):
+    """
+    Books that price every outcome listed on a line (at least two).
+
+    Returns:
+        np.ndarray: Boolean, shape (lines, books)
+    """
+    quoted = ~np.isnan(probabilities)
+    outcomes = quoted.any(axis=2).sum(axis=1)  # outcomes listed on each line
+    return (quoted.sum(axis=1) == outcomes[:, None]) & (outcomes[:, None] >= 2)
+
+
+def consensus_probabilities(probabilities):
+    """
+    Fair probability per (line, outcome): the mean of the vig-free
+    probabilities of every book that prices all of the line's outcomes.
+
+    Returns:
+        np.ndarray: Shape (lines, outcomes), NaN where no book can be de-vigged
+    """
+    complete = complete_books(probabilities)
+    books = complete.sum(axis=1)[:, None]
+
+    # Books without a quote on a line sum to 0; they are masked out anyway
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overround = np.nansum(probabilities, axis=1)  # (lines, books)
+        fair = np.where(
+            complete[:, None, :], probabilities / overround[:, None, :], np.nan
+        )
+        return np.where(books > 0, np.nansum(fair, axis=2) / books, np.nan)
+
+
+def find_value_bets(games, threshold=5.0, markets=("h2h",)):
+    """
+    Scores every quote against the de-vigged consensus in one array pass.
+
+    Args:
+        games (list): Odds payloads with bookmakers and markets
+        threshold (float): Minimum value_percentage to report
+        markets (iterable): Market keys to score
+
+    Returns:
+        list: Value bets (team, bookmaker, odds, consensus_odds,
+              value_percentage, game) in game, line, outcome and book order;
+              markets other than h2h add market, player and point
+    """
+    lines, books, probabilities, quotes = build_probability_array(games, markets)
+    if not quotes:
+        return []
+
+    consensus = consensus_probabilities(probabilities)
+    # Value against the fair price 1 / consensus, for every quote at once
+    with np.errstate(invalid="ignore"):
+        values = (consensus[:, :, None] / probabilities - 1) * 100
+
+    # As before, an outcome needs at least two quotes to compare
+    enough = (~np.isnan(probabilities)).sum(axis=2) >= 2
+    hits = np.argwhere((values >= threshold) & enough[:, :, None])
+
+    value_bets = []
+    for line, outcome, book in hits:
+        game, (market_key, player, _), names = lines[line]
+        quote = quotes[(line, outcome, book)]
+        consensus_odds = 1 / consensus[line, outcome]
+        entry = {
+            "team": names[outcome],
+            "bookmaker": books[book],
+            "odds": quote["price"],
+            "consensus_odds": round(float(consensus_odds), 2),
+            "value_percentage": round(float(values[line, outcome, book]), 2),
+            "game": {
+                "home_team": game["home_team"],
+                "away_team": game["away_team"],
+                "commence_time": game["commence_time"],
+            },
+        }
+        if market_key != "h2h":
+            entry.update(market=market_key, player=player, point=quote["point"])
+        value_bets.append(entry)
+
+    return value_bets
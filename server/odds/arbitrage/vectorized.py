@@ -0,0 +1,185 @@
+"""
+NumPy arbitrage engine for whole-slate scans.
+
+Every Over/Under line on the slate is loaded into one (line x bookmaker x
+side) price array. Implied probabilities and the cross-book pair totals are
+computed as array operations, chunked by line to bound memory, and only the
+few pairs that can make the top k are turned back into Python entries.
+
+Results match odds.arbitrage.utils.find_arbitrage, rounding and tie order
+included, as long as each bookmaker quotes a line once (as the Odds API
+does); if a book repeats a line, its best price per side is used.
+"""
+
+import numpy as np
+
+from odds.arbitrage.utils import _arbitrage_entry
+
+SIDES = {"Over": 0, "Under": 1}
+
+# Lines per chunk: 4096 lines x 16 x 16 books is ~8 MB of pair totals
+CHUNK_LINES = 4096
+
+# A pair can only reach the rounded top k if its unrounded value is within
+# one rounding step of the k-th best unrounded value
+PROFIT_SLACK = 0.011
+TOTAL_SLACK = 0.0011
+
+
+def build_price_tensor(games, market_key):
+    """
+    Loads a slate's Over/Under outcomes for market_key into a price array.
+
+    Args:
+        games (list): Event odds payloads with bookmakers and markets
+        market_key (str): Player prop market, e.g. "player_points"
+
+    Returns:
+        tuple: (lines, prices, quotes) where lines lists (game, player, point,
+               bookmaker titles) in scan order, prices is a float array of
+               shape (lines, bookmakers, 2) with NaN where a book has no
+               quote, and quotes holds the (line, book, side) index arrays
+               and original price values of every outcome
+    """
+    lines = []
+    line_ids, book_ids, side_ids, values = [], [], [], []
+    max_books = 0
+
+    for game in games:
+        line_index = {}
+        titles = [bookmaker["title"] for bookmaker in game.get("bookmakers", [])]
+        max_books = max(max_books, len(titles))
+
+        for book, bookmaker in enumerate(game.get("bookmakers", [])):
+            for market in bookmaker.get("markets", []):
+                if market["key"] != market_key:
+                    continue
+
+                for outcome in market.get("outcomes", []):
+                    name = outcome.get("name")
+                    player = outcome.get("description")
+                    price = outcome.get("price")
+                    point = outcome.get("point")
+
+                    side = SIDES.get(name)
+                    if side is None or not all([player, price, point]):
+                        continue
+
+                    line = line_index.get((player, point))
+                    if line is None:
+                        line = line_index[(player, point)] = len(lines)
+                        lines.append((game, player, point, titles))
+
+                    line_ids.append(line)
+                    book_ids.append(book)
+                    side_ids.append(side)
+                    values.append(price)
+
+    index = (
+        np.array(line_ids, dtype=np.intp),
+        np.array(book_ids, dtype=np.intp),
+        np.array(side_ids, dtype=np.intp),
+    )
+    prices = np.full((len(lines), max(max_books, 1), 2), np.nan)
+    # fmax keeps a book's best price if it quotes a line twice
+    np.fmax.at(prices, index, np.array(values, dtype=float))
+
+    return lines, prices, (*index, values)
+
+
+def _top_candidates(values, top_k, largest, slack):
+    # Flat indices of every value that could rank in the top k once rounded
+    if values.size == 0 or top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if values.size > top_k:
+        if largest:
+            kth = np.partition(values, -top_k)[-top_k]
+        else:
+            kth = np.partition(values, top_k - 1)[top_k - 1]
+    else:
+        kth = values.min() if largest else values.max()
+
+    return np.flatnonzero(values >= kth - slack if largest else values <= kth + slack)
+
+
+def find_arbitrage_vectorized(
+    games, market_key="player_points", include_same_book=False, top_k=3
+):
+    """
+    NumPy version of find_arbitrage with the same arguments and results.
+
+    Returns:
+        tuple: (opportunities, near_arbs), best first
+    """
+    lines, prices, quotes = build_price_tensor(games, market_key)
+    implied = 1 / prices
+    books = prices.shape[1]
+
+    arb_candidates = []
+    near_candidates = []
+
+    for start in range(0, len(lines), CHUNK_LINES):
+        chunk = implied[start : start + CHUNK_LINES]
+        # totals[line, over_book, under_book]; NaN where either side is missing
+        totals = chunk[:, :, None, 0] + chunk[:, None, :, 1]
+        if not include_same_book:
+            totals[:, np.arange(books), np.arange(books)] = np.nan
+
+        is_arb = totals < 1
+        arb_index = np.flatnonzero(is_arb)
+        profits = (1 - totals.ravel()[arb_index]) * 100
+        keep = arb_index[_top_candidates(profits, top_k, True, PROFIT_SLACK)]
+        arb_candidates.extend(_unravel(keep, totals, start))
+
+        near_index = np.flatnonzero(~is_arb & ~np.isnan(totals))
+        near_totals = totals.ravel()[near_index]
+        keep = near_index[_top_candidates(near_totals, top_k, False, TOTAL_SLACK)]
+        near_candidates.extend(_unravel(keep, totals, start))
+
+    # Final ranking in Python so rounding matches round() exactly; ties go to
+    # the pair a full scan would have seen first
+    opportunities = sorted(
+        (-round((1 - total) * 100, 2), line, i, j)
+        for line, i, j, total in arb_candidates
+    )[:top_k]
+    near_arbs = sorted(
+        (round(total, 3), line, i, j) for line, i, j, total in near_candidates
+    )[:top_k]
+
+    return (
+        [
+            _entry(market_key, lines, quotes, line, i, j, "profit_percent", -profit)
+            for profit, line, i, j in opportunities
+        ],
+        [
+            _entry(market_key, lines, quotes, line, i, j, "implied_total", total)
+            for total, line, i, j in near_arbs
+        ],
+    )
+
+
+def _unravel(flat_index, totals, line_offset):
+    lines, overs, unders = np.unravel_index(flat_index, totals.shape)
+    values = totals.ravel()[flat_index]
+    return [
+        (int(line) + line_offset, int(i), int(j), float(total))
+        for line, i, j, total in zip(lines, overs, unders, values)
+    ]
+
+
+def _quoted_price(quotes, line, book, side):
+    # The original value (int or float) of the best quote behind a tensor cell
+    line_ids, book_ids, side_ids, values = quotes
+    matches = np.flatnonzero(
+        (line_ids == line) & (book_ids == book) & (side_ids == side)
+    )
+    return max((values[k] for k in matches), key=float)
+
+
+def _entry(market_key, lines, quotes, line, i, j, field, value):
+    game, player, point, titles = lines[line]
+    over = {"bookmaker": titles[i], "price": _quoted_price(quotes, line, i, 0)}
+    under = {"bookmaker": titles[j], "price": _quoted_price(quotes, line, j, 1)}
+    entry = _arbitrage_entry(market_key, game, player, point, over, under)
+    entry[field] = value
+    return entry
@@ -0,0 +1,184 @@
+"""
+Recheck of arbitrage candidates against live prices before they are shown.
+
+Snapshots can be up to a TTL old, so a candidate's prices may already have
+moved. For each event and market in the candidate list, one targeted request
+to the per-event odds endpoint fetches only the bookmakers involved (the Odds
+API `bookmakers` filter, at most 10 per request). Each candidate is then
+re-priced from the fresh quotes:
+
+    confirmed   still an arbitrage; prices and profit are updated
+    dropped     no longer an arbitrage, or a side's quote was pulled
+    unverified  the recheck didn't finish within the latency budget (or the
+                candidate can't be traced to an event), so it is kept as is
+
+All requests run concurrently and the whole recheck is bounded by one
+deadline (settings.ARBITRAGE_VERIFY_BUDGET seconds).
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from odds.arbitrage.markets import entry_sides
+from odds.utils.cache_helpers import UpstreamError
+from odds.utils.upstream import odds_api_get
+
+logger = logging.getLogger(__name__)
+
+# Books per request: the Odds API bills every 10 bookmakers like one region
+MAX_BOOKMAKERS_PER_REQUEST = 10
+
+
+def _event_index(games):
+    # "Home vs Away" -> (event id, bookmaker title -> key)
+    index = {}
+    for game in games:
+        titles = {
+            bookmaker["title"]: bookmaker.get("key")
+            for bookmaker in game.get("bookmakers", [])
+        }
+        index[f"{game['home_team']} vs {game['away_team']}"] = (game.get("id"), titles)
+    return index
+
+
+def _fetch_quotes(sport, event_id, market, bookmaker_keys, timeout):
+    """
+    Fetches one event's market for the given bookmakers only.
+
+    Returns:
+        dict: (bookmaker title, outcome name, description, point) -> price
+    """
+    quotes = {}
+    for start in range(0, len(bookmaker_keys), MAX_BOOKMAKERS_PER_REQUEST):
+        response = odds_api_get(
+            f"/v4/sports/{sport}/events/{event_id}/odds/",
+            params={
+                "bookmakers": ",".join(
+                    bookmaker_keys[start : start + MAX_BOOKMAKERS_PER_REQUEST]
+                ),
+                "markets": market,
+                "oddsFormat": "decimal",
+            },
+            timeout=timeout,
+            consumer="verify",
+        )
+        if response.status_code != 200:
+            raise UpstreamError(response.status_code, response.text)
+
+        for bookmaker in response.json().get("bookmakers", []):
+            for fresh_market in bookmaker.get("markets", []):
+                if fresh_market["key"] != market:
+                    continue
+                for outcome in fresh_market.get("outcomes", []):
+                    key = (
+                        bookmaker["title"],
+                        outcome.get("name"),
+                        outcome.get("description"),
+                        outcome.get("point"),
+                    )
+                    quotes[key] = outcome.get("price")
+    return quotes
+
+
+def _reprice(entry, quotes):
+    # Returns the entry at fresh prices, or None if it's no longer an arbitrage
+    fresh = dict(entry)
+    total = 0
+    for key in sorted(entry):
+        if not key.startswith("side_"):
+            continue
+        side = entry[key]
+        # Prop entries keep the point on the line, market entries on the side
+        point = side["point"] if "point" in side else entry["line"]
+        price = quotes.get((side["bookmaker"], side["name"], entry["player"], point))
+        if not price:
+            return None
+        fresh[key] = {**side, "price": price}
+        total += 1 / price
+
+    if total >= 1:
+        return None
+    fresh["profit_percent"] = round((1 - total) * 100, 2)
+    if "implied_total" in entry:
+        fresh["implied_total"] = round(total, 3)
+    return fresh
+
+
+def verify_opportunities(opportunities, games, sport, budget=None):
+    """
+    Rechecks arbitrage candidates against each involved bookmaker's live odds.
+
+    Args:
+        opportunities (list): Entries from find_arbitrage or
+            find_market_arbitrage
+        games (list): The odds payloads they were found in (for event ids and
+            bookmaker keys)
+        sport (str): e.g., "basketball_nba"
+        budget (float): Seconds for the whole recheck (defaults to
+            settings.ARBITRAGE_VERIFY_BUDGET)
+
+    Returns:
+        tuple: (kept, dropped) where kept holds confirmed candidates (at fresh
+               prices) and unverified ones, most profitable first, each with a
+               "verification" status, and dropped the candidates that are gone
+    """
+    if budget is None:
+        budget = settings.ARBITRAGE_VERIFY_BUDGET
+    deadline = time.monotonic() + budget
+    events = _event_index(games)
+
+    # (event id, market) -> bookmaker keys involved, in first-seen order
+    fetches = {}
+    targets = []
+    for entry in opportunities:
+        event_id, titles = events.get(entry["event"], (None, {}))
+        keys = [titles.get(side["bookmaker"]) for side in entry_sides(entry)]
+        if event_id is None or None in keys:
+            targets.append(None)
+            continue
+        target = (event_id, entry["type"])
+        books = fetches.setdefault(target, [])
+        books.extend(key for key in keys if key not in books)
+        targets.append(target)
+
+    results = {}
+    if fetches:
+        executor = ThreadPoolExecutor(
+            max_workers=min(len(fetches), settings.ODDS_FANOUT_MAX_WORKERS)
+        )
+        futures = {
+            executor.submit(
+                _fetch_quotes,
+                sport,
+                event_id,
+                market,
+                books,
+                (settings.ODDS_API_CONNECT_TIMEOUT, budget),
+            ): (event_id, market)
+            for (event_id, market), books in fetches.items()
+        }
+        done, _ = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                logger.warning("arbitrage recheck %s failed: %s", futures[future], e)
+
+    kept, dropped = [], []
+    for entry, target in zip(opportunities, targets):
+        if target not in results:
+            kept.append({**entry, "verification": "unverified"})
+            continue
+        fresh = _reprice(entry, results[target])
+        if fresh is None:
+            dropped.append(entry)
+        else:
+            kept.append({**fresh, "verification": "confirmed"})
+
+    kept.sort(key=lambda x: x["profit_percent"], reverse=True)
+    return kept, dropped
@@ -1,14 +1,20 @@
 import json
+import math
+import time
 
-import requests
-from django.conf import settings
+import numpy as np
+from django.core.cache import caches
 from django.http import JsonResponse
 
-from odds.arbitrage.utils import find_arbitrage
+from odds.arbitrage.history import arbitrage_history, with_verification
+from odds.arbitrage.markets import find_market_arbitrage
+from odds.arbitrage.scanner import scan_sports
+from odds.arbitrage.stakes import allocate_stakes
+from odds.arbitrage.verify import verify_opportunities
+from odds.utils.cache_helpers import UpstreamError, cached_odds_api_get
+from odds.utils.request_planner import sport_odds_query
 from .player_props import player_prop_arbitrage
 
-ODDS_BASE_URL = "https://api.the-odds-api.com"
-
 
 def player_prop_arbitrage_opportunities(request):
     opportunities, error = player_prop_arbitrage()
@@ -21,38 +27,87 @@ def player_prop_arbitrage_opportunities(request):
 
 # REAL ODDS -> Finds arbitrage opportunities from the Odds API
 def arbitrage_opportunities(request):
-    sport = "basketball_nba"
+    sport = request.GET.get("sport", "basketball_nba")
+    markets = request.GET.get("markets", "h2h")
+    # Recheck the shown arbitrage against the books' live prices
+    verify = request.GET.get("verify") == "1"
 
-    url = f"{ODDS_BASE_URL}/v4/sports/{sport}/odds/"
-    params = {
-        "apiKey": settings.API_KEY,
-        "regions": "us",  # U.S.-based sportsbooks only
-        "markets": "h2h",
-        "oddsFormat": "decimal",
-    }
+    # Kept current by ingest_odds from its incremental arbitrage index
+    precomputed = caches["arbitrage"].get(f"arbitrage_{sport}_{markets}")
+    if precomputed is not None and not verify:
+        return JsonResponse(precomputed[:5], safe=False)
 
     try:
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            return JsonResponse(
-                {"error": "Failed to fetch odds.", "details": response.text},
-                status=response.status_code,
+        # h2h shares the snapshot published by ingest_odds
+        games, _ = cached_odds_api_get(
+            f"sport_odds_{sport}_{markets}",
+            f"/v4/sports/{sport}/odds/",
+            params=sport_odds_query(markets.split(",")),
+            consumer="arbitrage",
+        )
+
+        if precomputed is None:
+            detected = find_market_arbitrage(games, markets=markets.split(","))
+        else:
+            detected = precomputed
+        opportunities, dropped = detected[:5], []
+        if verify:
+            opportunities, dropped = verify_opportunities(opportunities, games, sport)
+        if precomputed is None:
+            # ingest_odds records the precomputed set itself
+            arbitrage_history.record(
+                with_verification(detected, opportunities, dropped)
             )
 
-        games = response.json()
+        return JsonResponse(opportunities, safe=False)
 
-        games = games[:5]  # Limit for performance/testing
-        opportunities = find_arbitrage(games)
-        opportunities.sort(key=lambda x: x["profit_percent"], reverse=True)
-        opportunities = opportunities[:5]
+    except UpstreamError as e:
+        return JsonResponse(
+            {"error": "Failed to fetch odds.", "details": e.details}, status=e.status
+        )
+    except Exception as e:
+        return JsonResponse(
+            {"error": "An unexpected error occurred.", "details": str(e)}, status=500
+        )
 
-        return JsonResponse(opportunities, safe=False)
 
+def _query_int(request, name, default, maximum):
+    value = int(request.GET.get(name, default))
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+    return min(value, maximum)
+
+
+# Arbitrage and value bets across every active sport (or ?sports=a,b)
+def multi_sport_scan(request):
+    sports = request.GET.get("sports")
+    try:
+        limit = _query_int(request, "limit", 20, 500)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    started = time.perf_counter()
+    try:
+        results = scan_sports(sports.split(",") if sports else None)
+    except UpstreamError as e:
+        return JsonResponse(
+            {"error": "Failed to fetch sports.", "details": e.details}, status=e.status
+        )
     except Exception as e:
         return JsonResponse(
             {"error": "An unexpected error occurred.", "details": str(e)}, status=500
         )
 
+    arbitrage_history.record(results["arbitrage"])
+    return JsonResponse(
+        {
+            "arbitrage": results["arbitrage"][:limit],
+            "value_bets": results["value_bets"][:limit],
+            "sports": results["sports"],
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    )
+
 
 # Calculate stakes and profit based on odds + total stake
 
@@ -99,6 +154,175 @@ def calculate_arbitrage_stakes(request):
         )
 
 
+# Most candidates one batch request may carry
+MAX_STAKE_CANDIDATES = 500
+
+# Default stake increment: whole cents
+DEFAULT_STAKE_INCREMENT = 0.01
+
+
+def _positive(value):
+    # float(value) if it's a finite positive number, else None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) and value > 0 else None
+
+
+def _validate_candidates(data):
+    """
+    Checks a batch stake request and flattens it into rows.
+
+    Returns:
+        tuple: (rows, errors) where rows holds (prices, bookmakers, stake)
+               per candidate and errors lists {"index", "error"} for every
+               invalid candidate; prices and stakes must be finite
+    """
+    candidates = data.get("candidates")
+    if not isinstance(candidates, list) or not candidates:
+        return [], [{"index": None, "error": "candidates must be a non-empty list."}]
+    if len(candidates) > MAX_STAKE_CANDIDATES:
+        return [], [
+            {
+                "index": None,
+                "error": f"At most {MAX_STAKE_CANDIDATES} candidates per request.",
+            }
+        ]
+
+    rows, errors = [], []
+    for index, candidate in enumerate(candidates):
+        outcomes = candidate.get("outcomes") if isinstance(candidate, dict) else None
+        if not isinstance(outcomes, list) or len(outcomes) < 2:
+            errors.append({"index": index, "error": "At least two outcomes needed."})
+            continue
+
+        prices = [
+            _positive(o.get("price")) if isinstance(o, dict) else None for o in outcomes
+        ]
+        if any(price is None or price <= 1 for price in prices):
+            errors.append({"index": index, "error": "Prices must be above 1."})
+            continue
+
+        bookmakers = [o.get("bookmaker") for o in outcomes]
+        if any(book is not None and not isinstance(book, str) for book in bookmakers):
+            errors.append({"index": index, "error": "Bookmakers must be strings."})
+            continue
+
+        stake = _positive(candidate.get("stake", data.get("stake")))
+        if stake is None:
+            errors.append({"index": index, "error": "Stake must be positive."})
+            continue
+
+        rows.append((prices, bookmakers, stake))
+
+    return rows, errors
+
+
+# Calculate stakes for many N-outcome candidates in one request
+def calculate_arbitrage_stakes_batch(request):
+    """
+    Splits stakes for a batch of arbitrage candidates.
+
+    Expects {"candidates": [{"outcomes": [{"bookmaker", "price"}, ...],
+    "stake"}], "stake", "increments": {bookmaker: increment}, "increment"},
+    where the top-level stake and increment are defaults. Stakes are rounded
+    up to each book's increment without exceeding the candidate's stake.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object.")
+    except ValueError as e:
+        return JsonResponse(
+            {"error": "Invalid request format", "details": str(e)}, status=400
+        )
+
+    default_increment = _positive(data.get("increment", DEFAULT_STAKE_INCREMENT))
+    increments = data.get("increments") or {}
+    if default_increment is None or not isinstance(increments, dict):
+        return JsonResponse({"error": "Invalid stake increments."}, status=400)
+    increments = {book: _positive(step) for book, step in increments.items()}
+    if None in increments.values():
+        return JsonResponse({"error": "Invalid stake increments."}, status=400)
+
+    rows, errors = _validate_candidates(data)
+    if errors:
+        return JsonResponse(
+            {"error": "Invalid candidates.", "details": errors}, status=400
+        )
+
+    width = max(len(prices) for prices, _, _ in rows)
+    prices = np.full((len(rows), width), np.nan)
+    steps = np.full((len(rows), width), default_increment)
+    for i, (row_prices, bookmakers, _) in enumerate(rows):
+        prices[i, : len(row_prices)] = row_prices
+        steps[i, : len(bookmakers)] = [
+            increments.get(book, default_increment) for book in bookmakers
+        ]
+    budgets = np.array([stake for _, _, stake in rows])
+
+    allocation = allocate_stakes(prices, budgets, steps)
+
+    results = []
+    for i, (row_prices, _, stake) in enumerate(rows):
+        implied_total = float(allocation["implied_total"][i])
+        profit = float(allocation["guaranteed_profit"][i])
+        if implied_total >= 1:
+            results.append({"error": "No arbitrage possible with these odds."})
+            continue
+        total_staked = float(allocation["total_staked"][i])
+        if profit < 0 or total_staked == 0:
+            results.append(
+                {"error": "Stake increments leave no guaranteed profit at this stake."}
+            )
+            continue
+
+        n = len(row_prices)
+        results.append(
+            {
+                "stakes": [round(float(x), 2) for x in allocation["stakes"][i, :n]],
+                "payouts": [round(float(x), 2) for x in allocation["payouts"][i, :n]],
+                "total_staked": round(total_staked, 2),
+                "guaranteed_profit": round(profit, 2),
+                "profit_percent": round(profit / total_staked * 100, 2),
+                "implied_total": round(implied_total, 3),
+            }
+        )
+
+    return JsonResponse({"results": results})
+
+
+# Recorded arbitrage lifetimes, filterable by event, player, bookmaker, market
+def arbitrage_history_view(request):
+    try:
+        limit = _query_int(request, "limit", 50, 500)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    lifetimes = arbitrage_history.lifetimes(
+        event=request.GET.get("event"),
+        player=request.GET.get("player"),
+        bookmaker=request.GET.get("bookmaker"),
+        market=request.GET.get("market"),
+        limit=limit,
+    )
+    return JsonResponse({"lifetimes": lifetimes})
+
+
+# How long arbitrage survives per book pair and market over the last N hours
+def arbitrage_survival(request):
+    try:
+        hours = _query_int(request, "hours", 24, 24 * 90)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    survival = arbitrage_history.survival(
+        since=time.time() - hours * 3600, market=request.GET.get("market")
+    )
+    return JsonResponse({"hours": hours, "survival": survival})
+
+
 #  FAKE TEST DATA # Remove: Later
 def test_arbitrage_with_fake_data(request):
     fake_games = [
@@ -135,5 +359,5 @@ def test_arbitrage_with_fake_data(request):
         }
     ]
 
-    opportunities = find_arbitrage(fake_games)
+    opportunities = find_market_arbitrage(fake_games)
     return JsonResponse(opportunities, safe=False)
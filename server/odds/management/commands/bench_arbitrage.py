@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from odds.arbitrage.utils import BOOKMAKER_URLS, find_arbitrage
+
+PRICES = [1.74, 1.8, 1.83, 1.87, 1.9, 1.91, 1.95, 2.0, 2.05, 2.1, 2.2, 2.3]
+
+
+def synthetic_slate(lines, books, seed, players_per_game=50):
+    """Builds games with `lines` player lines quoted by up to `books` books."""
+    rng = random.Random(seed)
+    titles = list(BOOKMAKER_URLS)[:books]
+    games = []
+
+    for g in range(-(-lines // players_per_game)):
+        players = min(players_per_game, lines - g * players_per_game)
+        points = [rng.choice([9.5, 14.5, 19.5, 24.5]) for _ in range(players)]
+        bookmakers = []
+        for title in titles:
+            outcomes = []
+            for p, point in enumerate(points):
+                if rng.random() < 0.1:
+                    continue
+                for name in ("Over", "Under"):
+                    outcomes.append(
+                        {
+                            "name": name,
+                            "description": f"Player {g}-{p}",
+                            "price": rng.choice(PRICES),
+                            "point": point,
+                        }
+                    )
+            bookmakers.append(
+                {
+                    "title": title,
+                    "markets": [{"key": "player_points", "outcomes": outcomes}],
+                }
+            )
+        games.append(
+            {
+                "home_team": f"Home {g}",
+                "away_team": f"Away {g}",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": bookmakers,
+            }
+        )
+
+    return games
+
+
+class Command(BaseCommand):
+    help = "Compares the python and numpy arbitrage engines on a synthetic slate"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=10000)
+        parser.add_argument("--books", type=int, default=len(BOOKMAKER_URLS))
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        games = synthetic_slate(options["lines"], options["books"], options["seed"])
+        self.stdout.write(
+            f"{options['lines']} lines x {options['books']} books "
+            f"({len(games)} games)"
+        )
+
+        timings = {}
+        results = {}
+        for engine in ("python", "numpy"):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                results[engine] = find_arbitrage(games, engine=engine)
+                best = min(best, time.perf_counter() - started)
+            timings[engine] = best
+            self.stdout.write(f"  {engine:<7} {best * 1000:>9.1f} ms")
+
+        if results["python"] != results["numpy"]:
+            raise CommandError("Engines disagree on this slate")
+
+        self.stdout.write(
+            f"  speedup {timings['python'] / timings['numpy']:.1f}x, results match"
+        )
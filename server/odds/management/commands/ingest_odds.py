@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from odds.utils.cache_helpers import process_local_aliases
+from odds.utils.ingest import ingest_sport
+
+
+class Command(BaseCommand):
+    help = (
+        "Polls the Odds API on a schedule and publishes parsed snapshots to the "
+        "cache. Needs a cache shared with the web workers (CACHE_BACKEND=sqlite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sports",
+            default=",".join(settings.ODDS_INGEST_SPORTS),
+            help="Comma-separated sport keys",
+        )
+        parser.add_argument(
+            "--markets",
+            default=",".join(settings.ODDS_INGEST_MARKETS),
+            help="Comma-separated per-event markets",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.ODDS_INGEST_INTERVAL,
+            help="Seconds between polls",
+        )
+        parser.add_argument(
+            "--ttl",
+            type=int,
+            default=None,
+            help="Snapshot TTL in seconds (defaults to three intervals)",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Run a single poll and exit"
+        )
+
+    def handle(self, *args, **options):
+        local = process_local_aliases()
+        if local:
+            # Snapshots published here would be invisible to the web workers
+            raise CommandError(
+                f"Cache aliases {', '.join(local)} are process-local; "
+                "set CACHE_BACKEND=sqlite so the web workers see the snapshots"
+            )
+
+        sports = [s for s in options["sports"].split(",") if s]
+        markets = [m for m in options["markets"].split(",") if m]
+        interval = options["interval"]
+        # Snapshots outlive a couple of missed polls before expiring
+        ttl = options["ttl"] or interval * 3
+
+        while True:
+            started = time.monotonic()
+
+            for sport in sports:
+                stats = ingest_sport(sport, markets, ttl)
+                self.stdout.write(
+                    f"{sport}: {stats['events']} events, "
+                    f"{stats['snapshots']} snapshots, "
+                    f"{stats['arbitrage_changes']} arbitrage changes, "
+                    f"{stats['value_changes']} value changes, "
+                    f"{len(stats['errors'])} errors"
+                )
+                for error in stats["errors"]:
+                    self.stderr.write(f"  {error}")
+
+            if options["once"]:
+                break
+
+            time.sleep(max(0, interval - (time.monotonic() - started)))
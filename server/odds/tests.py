@@ -1,20 +1,61 @@
 # Create your tests here.
 import json
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 
 import requests
-from django.core.cache import cache
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
 from django.http import JsonResponse
 
-from odds.utils.view_helpers import parse_event_odds
-from django.test import TestCase, RequestFactory
+from odds.utils.view_helpers import (
+    legacy_market_odds,
+    parse_event_markets,
+    parse_event_odds,
+    parse_market_odds,
+    split_event_markets,
+)
+from django.test import TestCase, RequestFactory, override_settings
 from unittest.mock import MagicMock, patch
 from odds.views import fetch_event_odds
+from odds.utils import upstream
+from odds.utils.api_helpers import fetch_player_prop_odds
+from odds.utils.budget import budget
+from odds.utils.cache_helpers import (
+    PARSED_ALIAS,
+    UPSTREAM_ALIAS,
+    UpstreamError,
+    cached_odds_api_get,
+    get_stale_snapshot,
+    set_snapshot,
+)
+from odds.utils.ingest import arbitrage_indexes, consensus_stores, ingest_sport
+from odds.utils.market_batcher import event_market_batcher
+from odds.utils.request_planner import (
+    event_odds_query,
+    events_query,
+    sport_odds_query,
+    upcoming,
+)
+from odds.utils.resilience import CircuitOpenError
+from odds.utils.upstream import odds_api_get
 from odds.utils.sample_responses import sample_input, expected_parsed_output
+from odds.value_helper import get_live_value_bets
 import logging
 
 logger = logging.getLogger(__name__)
 
+upstream_cache = caches[UPSTREAM_ALIAS]
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
 
 class TestParseEventOdds(unittest.TestCase):
     def setUp(self):
@@ -107,6 +148,38 @@ class TestParseEventOdds(unittest.TestCase):
         self.assertEqual(jjj_data["Under"]["point"], 23.5)
         self.assertEqual(jjj_data["Under"]["link"], "https://example.com/jjj_under")
 
+    def test_parse_event_markets_indexes_every_market(self):
+        """Test that a multi-market payload is parsed per market in one pass"""
+        multi_input = json.loads(json.dumps(self.sample_input))
+        for bookmaker in multi_input["bookmakers"]:
+            assists = json.loads(json.dumps(bookmaker["markets"][0]))
+            assists["key"] = "player_assists"
+            assists["last_update"] = "2025-04-01T00:00:00Z"
+            for outcome in assists["outcomes"]:
+                outcome["point"] = 6.5
+            bookmaker["markets"].append(assists)
+
+        result = parse_event_markets(
+            multi_input, ["player_points", "player_assists", "player_steals"]
+        )
+
+        self.assertEqual(
+            legacy_market_odds(result, "player_points"),
+            parse_event_odds(self.sample_input),
+        )
+        assists = result["markets"]["player_assists"]
+        self.assertEqual(
+            assists["bookmaker"]["fanduel"]["last_update"], "2025-04-01T00:00:00Z"
+        )
+        self.assertEqual(
+            assists["player"]["Shai Gilgeous-Alexander"]["DraftKings"]["Over"]["point"],
+            6.5,
+        )
+        self.assertEqual(
+            legacy_market_odds(result, "player_steals")["player"],
+            {},
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -123,7 +196,7 @@ class OddsViewsTestCase(TestCase):
         # Mock API response
         self.sample_odds_response = expected_parsed_output
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_event_odds_success(self, mock_get):
         """Test successful fetch_event_odds response"""
         mock_response = MagicMock()
@@ -141,7 +214,7 @@ class OddsViewsTestCase(TestCase):
         self.assertEqual(data["metadata"]["cached"], False)
         self.assertIn("data", data)
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_event_odds_cached(self, mock_get):
         """Test fetch_event_odds with cached data"""
         cache_key = f"event_odds_{self.sport}_{self.event_id}_{self.markets}"
@@ -156,7 +229,7 @@ class OddsViewsTestCase(TestCase):
         self.assertEqual(data["data"], {"test": "data"})
         mock_get.assert_not_called()
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_event_odds_api_error(self, mock_get):
         """Test fetch_event_odds with API error"""
         mock_response = MagicMock()
@@ -171,7 +244,7 @@ class OddsViewsTestCase(TestCase):
         data = json.loads(response.content)
         self.assertEqual(data["error"], "Failed to fetch odds")
 
-    @patch("requests.get")
+    @patch("odds.utils.upstream.session.get")
     def test_fetch_event_odds_network_error(self, mock_get):
         """Test that network errors are caught."""
         mock_get.side_effect = requests.exceptions.ConnectionError("Failed to connect")
@@ -184,4 +257,941 @@ class OddsViewsTestCase(TestCase):
         self.assertEqual(data["error"], "An unexpected error occurred")
 
     def tearDown(self):
-        cache.clear()
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class FetchPlayerPropOddsTestCase(TestCase):
+    def setUp(self):
+        self.events = [
+            {"id": "event1", "home_team": "Home 1", "away_team": "Away 1"},
+            {"id": "event2", "home_team": "Home 2", "away_team": "Away 2"},
+            {"id": "event3", "home_team": "Home 3", "away_team": "Away 3"},
+        ]
+
+    def _fake_get(self, url, params=None, timeout=None):
+        response = MagicMock()
+        if url.endswith("/events/"):
+            response.status_code = 200
+            response.json.return_value = self.events
+            return response
+        event_id = url.split("/events/")[1].split("/")[0]
+        if event_id == "event2":
+            response.status_code = 422
+            response.text = "Unprocessable"
+            return response
+        response.status_code = 200
+        response.json.return_value = {"id": event_id, "bookmakers": []}
+        return response
+
+    @patch("odds.utils.upstream.session.get")
+    def test_fetch_player_prop_odds_preserves_event_order(self, mock_get):
+        """Test that concurrent results come back in event order"""
+        mock_get.side_effect = self._fake_get
+
+        all_odds, failed_events = fetch_player_prop_odds(
+            "basketball_nba", "player_points", limit=3, max_workers=3
+        )
+
+        self.assertEqual([event["id"] for event in all_odds], ["event1", "event3"])
+        self.assertEqual(all_odds[0]["home_team"], "Home 1")
+
+    @patch("odds.utils.upstream.session.get")
+    def test_fetch_player_prop_odds_reports_failed_events(self, mock_get):
+        """Test that failed events are reported instead of dropped"""
+        mock_get.side_effect = self._fake_get
+
+        all_odds, failed_events = fetch_player_prop_odds(
+            "basketball_nba", "player_points", limit=3, max_workers=1, timeout=2
+        )
+
+        self.assertEqual(len(all_odds), 2)
+        self.assertEqual(len(failed_events), 1)
+        self.assertEqual(failed_events[0]["event_id"], "event2")
+        self.assertEqual(failed_events[0]["status"], 422)
+        for call in mock_get.call_args_list:
+            self.assertEqual(call.kwargs["timeout"], 2)
+
+    @patch("odds.utils.upstream.session.get")
+    def test_fetch_player_prop_odds_isolates_malformed_events(self, mock_get):
+        """Test that an unparseable event payload fails only that event"""
+
+        def fake_get(url, params=None, timeout=None):
+            response = self._fake_get(url, params, timeout)
+            if "/events/event1/" in url:
+                response.json.side_effect = ValueError("Expecting value")
+            elif "/events/event2/" in url:
+                response.status_code = 200
+                response.json.return_value = ["not", "an", "event"]
+            return response
+
+        mock_get.side_effect = fake_get
+
+        all_odds, failed_events = fetch_player_prop_odds(
+            "basketball_nba", "player_points", limit=3, max_workers=3
+        )
+
+        self.assertEqual([event["id"] for event in all_odds], ["event3"])
+        self.assertEqual(
+            [event["event_id"] for event in failed_events], ["event1", "event2"]
+        )
+        for event in failed_events:
+            self.assertIn("Malformed odds payload", event["error"])
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class UpstreamClientTestCase(TestCase):
+    @override_settings(ODDS_API_BASE_URL="http://127.0.0.1:8999/", API_KEY="key")
+    @patch("odds.utils.upstream.session.get")
+    def test_odds_api_get_uses_base_url_key_and_timeouts(self, mock_get):
+        """Test that calls go to the configured base URL with key and timeouts"""
+        odds_api_get("/v4/sports/", params={"regions": "us"})
+
+        args, kwargs = mock_get.call_args
+        self.assertEqual(args[0], "http://127.0.0.1:8999/v4/sports/")
+        self.assertEqual(kwargs["params"], {"apiKey": "key", "regions": "us"})
+        self.assertEqual(
+            kwargs["timeout"],
+            (settings.ODDS_API_CONNECT_TIMEOUT, settings.ODDS_API_READ_TIMEOUT),
+        )
+
+    def test_session_negotiates_gzip(self):
+        """Test that the shared session asks for compressed responses"""
+        self.assertIn("gzip", upstream.session.headers["Accept-Encoding"])
+
+    def tearDown(self):
+        upstream.breaker.reset()
+
+
+class QuotaBudgetTestCase(TestCase):
+    def _response(self, remaining, used, last, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.text = "Quota exceeded"
+        response.json.return_value = [{"id": "fresh"}]
+        response.headers = {
+            "x-requests-remaining": str(remaining),
+            "x-requests-used": str(used),
+            "x-requests-last": str(last),
+        }
+        return response
+
+    def test_record_tracks_usage_per_endpoint_and_market(self):
+        """Test that quota headers are recorded per endpoint and market"""
+        budget.record(
+            "/v4/sports/basketball_nba/events/abc123/odds",
+            {"markets": "player_points"},
+            self._response(remaining=990, used=10, last=1),
+        )
+        budget.record(
+            "/v4/sports/basketball_nba/events/def456/odds",
+            {"markets": "player_points"},
+            self._response(remaining=989, used=11, last=1),
+        )
+
+        snapshot = budget.snapshot()
+        self.assertEqual(snapshot["remaining"], 989)
+        self.assertEqual(snapshot["used"], 11)
+        self.assertGreater(snapshot["burn_rate_per_hour"], 0)
+        self.assertEqual(
+            snapshot["usage"],
+            [
+                {
+                    "endpoint": "/v4/sports/{sport}/events/{event_id}/odds",
+                    "market": "player_points",
+                    "requests": 2,
+                    "credits": 2,
+                }
+            ],
+        )
+
+    @override_settings(ODDS_BUDGET_LOW_WATERMARK=500, ODDS_BUDGET_MAX_TTL_MULTIPLIER=10)
+    def test_ttl_stretches_as_quota_runs_low(self):
+        """Test that TTLs lengthen once remaining credits drop below the watermark"""
+        self.assertEqual(budget.ttl(60), 60)
+
+        budget.record("/v4/sports/", {}, self._response(250, 750, 1))
+        self.assertEqual(budget.ttl(60), 120)
+
+        budget.record("/v4/sports/", {}, self._response(1, 999, 1))
+        self.assertEqual(budget.ttl(60), 600)
+
+    @override_settings(ODDS_BUDGET_LOW_WATERMARK=500)
+    def test_unbudgeted_snapshot_keeps_its_ttl(self):
+        """Test that data costing no credits isn't cached longer as quota runs low"""
+        budget.record("/v4/sports/", {}, self._response(250, 750, 1))
+        with patch.object(caches[UPSTREAM_ALIAS], "set") as mock_set:
+            set_snapshot("nba_player_stats_1", ({}, {}), 60, budgeted=False)
+            set_snapshot("sport_odds_test", [], 60)
+
+        self.assertEqual(mock_set.call_args_list[0].args[2], 60)
+        self.assertEqual(mock_set.call_args_list[2].args[2], 120)
+        self.assertEqual(mock_set.call_args_list[1].args[0], "stale:nba_player_stats_1")
+
+    @override_settings(ODDS_BUDGET_RESERVE=50)
+    @patch("odds.utils.upstream.session.get")
+    def test_exhausted_budget_serves_stale_snapshot(self, mock_get):
+        """Test that stale data is served without calling upstream at the reserve"""
+        set_snapshot("sport_odds_test", [{"id": "old"}], 60)
+        upstream_cache.delete("sport_odds_test")
+        budget.record("/v4/sports/", {}, self._response(10, 990, 1))
+
+        data, metadata = cached_odds_api_get("sport_odds_test", "/v4/sports/test/odds/")
+
+        self.assertEqual(data, [{"id": "old"}])
+        self.assertTrue(metadata["stale"])
+        self.assertIn("age", metadata)
+        mock_get.assert_not_called()
+
+    @patch("odds.utils.upstream.session.get")
+    def test_upstream_error_falls_back_to_stale_snapshot(self, mock_get):
+        """Test that an upstream error is served from the stale shadow copy"""
+        mock_get.return_value = self._response(0, 1000, 0, status_code=401)
+        set_snapshot("sport_odds_test", [{"id": "old"}], 60)
+        upstream_cache.delete("sport_odds_test")
+
+        data, metadata = cached_odds_api_get("sport_odds_test", "/v4/sports/test/odds/")
+
+        self.assertEqual(data, [{"id": "old"}])
+        self.assertTrue(metadata["cached"])
+        mock_get.assert_called_once()
+
+    def tearDown(self):
+        budget.reset()
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class RequestPlannerTestCase(TestCase):
+    def test_default_plan_fetches_upcoming_events_in_the_us_region(self):
+        """Test that without a bookmaker list the US region is requested"""
+        params = sport_odds_query(["h2h"])
+
+        self.assertEqual(params["regions"], "us")
+        self.assertNotIn("bookmakers", params)
+        self.assertNotIn("commenceTimeTo", params)
+        self.assertRegex(
+            params["commenceTimeFrom"], r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$"
+        )
+        self.assertEqual(event_odds_query(["h2h"])["regions"], "us")
+
+    @override_settings(
+        ODDS_BOOKMAKERS=["fanduel", "draftkings"], ODDS_COMMENCE_WITHIN_HOURS=24
+    )
+    def test_plan_narrows_books_and_window(self):
+        """Test the bookmakers and commence window filters"""
+        params = sport_odds_query(["h2h", "spreads"])
+
+        self.assertEqual(params["markets"], "h2h,spreads")
+        self.assertEqual(params["bookmakers"], "fanduel,draftkings")
+        self.assertNotIn("regions", params)
+        self.assertLess(params["commenceTimeFrom"], params["commenceTimeTo"])
+        # The shared events snapshot keeps games in progress
+        self.assertEqual(events_query(), {})
+        self.assertEqual(
+            event_odds_query(["player_points"], include_links=True),
+            {
+                "markets": "player_points",
+                "oddsFormat": "decimal",
+                "bookmakers": "fanduel,draftkings",
+                "includeLinks": "true",
+            },
+        )
+
+    def test_upcoming_drops_started_events(self):
+        """Test that events past their commence time are dropped before limit"""
+        events = [
+            {"id": "started", "commence_time": "2020-01-01T00:00:00Z"},
+            {"id": "next", "commence_time": "2999-01-01T00:00:00Z"},
+            {"id": "later", "commence_time": "2999-01-02T00:00:00Z"},
+        ]
+
+        self.assertEqual([e["id"] for e in upcoming(events, limit=1)], ["next"])
+        self.assertEqual(len(upcoming(events)), 2)
+        with override_settings(ODDS_COMMENCE_WITHIN_HOURS=24):
+            self.assertEqual(upcoming(events), [])
+
+    @patch("odds.utils.upstream.session.get")
+    def test_bytes_are_accounted_per_consumer(self, mock_get):
+        """Test that each consumer's downloads show up in the quota snapshot"""
+        events = [
+            {"id": "started", "commence_time": "2020-01-01T00:00:00Z"},
+            {"id": "event1", "commence_time": "2999-01-01T00:00:00Z"},
+        ]
+
+        def fake_get(url, params=None, timeout=None):
+            response = MagicMock()
+            response.status_code = 200
+            body = events if url.endswith("/events/") else {"id": "event1"}
+            response.content = json.dumps(body).encode()
+            response.headers = {"x-requests-last": "1", "x-requests-remaining": "99"}
+            response.json.return_value = json.loads(response.content)
+            return response
+
+        mock_get.side_effect = fake_get
+
+        all_odds, _ = fetch_player_prop_odds("basketball_nba", "player_points")
+
+        # The started event is never fetched
+        self.assertEqual([event["id"] for event in all_odds], ["event1"])
+        self.assertEqual(mock_get.call_count, 2)
+        [consumer] = budget.snapshot()["consumers"]
+        self.assertEqual(consumer["consumer"], "player_props")
+        self.assertEqual(consumer["requests"], 2)
+        self.assertEqual(consumer["credits"], 2)
+        self.assertEqual(
+            consumer["bytes"], len(json.dumps(events)) + len('{"id": "event1"}')
+        )
+
+    def tearDown(self):
+        budget.reset()
+        clear_caches()
+
+
+class IngestOddsTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.sport = "basketball_nba"
+        self.event_id = sample_input["id"]
+        self.events = [
+            {
+                "id": self.event_id,
+                "home_team": sample_input["home_team"],
+                "away_team": sample_input["away_team"],
+            }
+        ]
+
+    def _fake_get(self, url, params=None, timeout=None):
+        response = MagicMock()
+        response.status_code = 200
+        if url.endswith("/events/"):
+            response.json.return_value = self.events
+        elif url.endswith(f"/{self.sport}/odds/"):
+            response.json.return_value = []
+        else:
+            response.json.return_value = json.loads(json.dumps(sample_input))
+        return response
+
+    # The test caches are process-local; pretend they are shared
+    @patch("odds.management.commands.ingest_odds.process_local_aliases")
+    @patch("odds.utils.upstream.session.get")
+    def test_ingest_odds_publishes_parsed_snapshots(self, mock_get, mock_local):
+        """Test that one poll publishes events, h2h, raw and parsed event odds"""
+        mock_local.return_value = []
+        mock_get.side_effect = self._fake_get
+        out = StringIO()
+
+        call_command(
+            "ingest_odds",
+            "--once",
+            "--sports",
+            self.sport,
+            "--markets",
+            "player_points",
+            stdout=out,
+        )
+
+        self.assertIn(
+            "1 events, 4 snapshots, 0 arbitrage changes, 0 value changes, 0 errors",
+            out.getvalue(),
+        )
+        self.assertEqual(upstream_cache.get(f"events_{self.sport}"), self.events)
+        self.assertEqual(upstream_cache.get(f"sport_odds_{self.sport}_h2h"), [])
+        self.assertEqual(
+            cache.get(f"event_odds_{self.sport}_{self.event_id}_player_points"),
+            parse_event_odds(sample_input),
+        )
+        self.assertEqual(mock_get.call_count, 3)
+
+    @override_settings(
+        CACHES={
+            alias: {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": f"ingest-refuses-{alias}",
+            }
+            for alias in ("default", "upstream", "arbitrage", "sessions")
+        }
+    )
+    @patch("odds.utils.upstream.session.get")
+    def test_ingest_odds_refuses_process_local_cache(self, mock_get):
+        """Test that the worker won't publish where web workers can't read"""
+        with self.assertRaisesMessage(CommandError, "CACHE_BACKEND=sqlite"):
+            call_command("ingest_odds", "--once", stdout=StringIO())
+
+        mock_get.assert_not_called()
+
+    @override_settings(ODDS_PRECOMPUTED_ONLY=True)
+    @patch("odds.utils.upstream.session.get")
+    def test_precomputed_only_serves_published_snapshot(self, mock_get):
+        """Test that views read ingested snapshots without calling upstream"""
+        mock_get.side_effect = self._fake_get
+        ingest_sport(self.sport, ["player_points"], ttl=180)
+        mock_get.reset_mock()
+
+        request = self.factory.get("/fetch_event_odds/")
+        response = fetch_event_odds(request, self.sport, self.event_id, "player_points")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)["metadata"]["cached"])
+        mock_get.assert_not_called()
+
+    @patch("odds.utils.upstream.session.get")
+    def test_ingest_maintains_h2h_arbitrage_incrementally(self, mock_get):
+        """Test that each poll publishes arbitrage and counts only changed lines"""
+        h2h = [
+            {
+                "id": self.event_id,
+                "home_team": "Lakers",
+                "away_team": "Warriors",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": [
+                    {
+                        "title": title,
+                        "markets": [
+                            {
+                                "key": "h2h",
+                                "outcomes": [
+                                    {"name": "Lakers", "price": home},
+                                    {"name": "Warriors", "price": away},
+                                ],
+                            }
+                        ],
+                    }
+                    for title, home, away in (
+                        ("FanDuel", 2.2, 1.7),
+                        ("DraftKings", 1.7, 2.1),
+                    )
+                ],
+            }
+        ]
+
+        def fake_get(url, params=None, timeout=None):
+            response = self._fake_get(url, params, timeout)
+            if url.endswith(f"/{self.sport}/odds/"):
+                response.json.return_value = json.loads(json.dumps(h2h))
+            return response
+
+        mock_get.side_effect = fake_get
+
+        stats = ingest_sport(self.sport, [], ttl=180)
+        self.assertEqual(stats["arbitrage_changes"], 1)
+        [entry] = caches["arbitrage"].get(f"arbitrage_{self.sport}_h2h")
+        self.assertEqual(entry["side_1"]["bookmaker"], "FanDuel")
+
+        # Unchanged prices: nothing to re-evaluate
+        self.assertEqual(ingest_sport(self.sport, [], ttl=180)["arbitrage_changes"], 0)
+
+        h2h[0]["bookmakers"][0]["markets"][0]["outcomes"][0]["price"] = 1.9
+        self.assertEqual(ingest_sport(self.sport, [], ttl=180)["arbitrage_changes"], 1)
+        self.assertEqual(caches["arbitrage"].get(f"arbitrage_{self.sport}_h2h"), [])
+
+    @patch("odds.utils.upstream.session.get")
+    def test_ingest_maintains_h2h_value_bets_incrementally(self, mock_get):
+        """Test that each poll publishes value bets and counts only changes"""
+        h2h = [
+            {
+                "id": self.event_id,
+                "home_team": "Lakers",
+                "away_team": "Warriors",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": [
+                    {
+                        "title": title,
+                        "markets": [
+                            {
+                                "key": "h2h",
+                                "outcomes": [
+                                    {"name": "Lakers", "price": home},
+                                    {"name": "Warriors", "price": away},
+                                ],
+                            }
+                        ],
+                    }
+                    for title, home, away in (
+                        ("FanDuel", 2.2, 1.7),
+                        ("DraftKings", 1.7, 2.1),
+                    )
+                ],
+            }
+        ]
+
+        def fake_get(url, params=None, timeout=None):
+            response = self._fake_get(url, params, timeout)
+            if url.endswith(f"/{self.sport}/odds/"):
+                response.json.return_value = json.loads(json.dumps(h2h))
+            return response
+
+        mock_get.side_effect = fake_get
+
+        self.assertEqual(ingest_sport(self.sport, [], ttl=180)["value_changes"], 2)
+        published = caches["arbitrage"].get(f"value_feed_{self.sport}")
+        self.assertEqual(
+            [(bet["bookmaker"], bet["team"]) for bet in json.loads(published)],
+            [("FanDuel", "Lakers"), ("DraftKings", "Warriors")],
+        )
+
+        # The value bets view serves the published document without calling
+        # upstream, and so does the live helper
+        mock_get.reset_mock()
+        response = self.client.get("/arbitrage/valuebets/")
+        self.assertEqual(response.content, published)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(get_live_value_bets(self.sport), json.loads(published))
+        mock_get.assert_not_called()
+
+        self.assertEqual(ingest_sport(self.sport, [], ttl=180)["value_changes"], 0)
+
+        h2h[0]["bookmakers"][0]["markets"][0]["outcomes"][0]["price"] = 1.9
+        self.assertEqual(ingest_sport(self.sport, [], ttl=180)["value_changes"], 2)
+        self.assertEqual(caches["arbitrage"].get(f"value_feed_{self.sport}"), b"[]")
+
+    @override_settings(ODDS_PRECOMPUTED_ONLY=True)
+    @patch("odds.utils.upstream.session.get")
+    def test_precomputed_only_miss_returns_503(self, mock_get):
+        """Test that a market the worker has not published is not fetched live"""
+        request = self.factory.get("/fetch_event_odds/")
+        response = fetch_event_odds(request, self.sport, self.event_id, "player_steals")
+
+        self.assertEqual(response.status_code, 503)
+        mock_get.assert_not_called()
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+        arbitrage_indexes.clear()
+        consensus_stores.clear()
+
+
+class LiveValueFeedTestCase(TestCase):
+    def setUp(self):
+        self.sport = "basketball_nba"
+        self.games = [
+            {
+                "home_team": "Lakers",
+                "away_team": "Warriors",
+                "commence_time": "2025-04-01T00:00:00Z",
+                "bookmakers": [
+                    {
+                        "title": title,
+                        "markets": [
+                            {
+                                "key": "h2h",
+                                "outcomes": [
+                                    {"name": "Lakers", "price": home},
+                                    {"name": "Warriors", "price": away},
+                                ],
+                            }
+                        ],
+                    }
+                    for title, home, away in (
+                        ("DraftKings", 2.0, 1.9),
+                        ("FanDuel", 2.4, 1.8),
+                    )
+                ],
+            }
+        ]
+
+    @patch("odds.utils.upstream.session.get")
+    def test_feed_built_once_from_h2h_snapshot(self, mock_get):
+        """Test that without the worker the first read builds the feed"""
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = self.games
+        mock_get.return_value = response
+
+        [bet] = get_live_value_bets(self.sport)
+        self.assertEqual((bet["bookmaker"], bet["team"]), ("FanDuel", "Lakers"))
+        self.assertEqual(
+            json.loads(caches["arbitrage"].get(f"value_feed_{self.sport}")), [bet]
+        )
+
+        self.assertEqual(get_live_value_bets(self.sport), [bet])
+        mock_get.assert_called_once()
+
+    @patch("odds.utils.upstream.session.get")
+    def test_upstream_failure_returns_empty_list(self, mock_get):
+        response = MagicMock()
+        response.status_code = 500
+        response.text = "error"
+        mock_get.return_value = response
+
+        self.assertEqual(get_live_value_bets(self.sport), [])
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.sport = "basketball_nba"
+        self.event_id = "c1f70941e477df98e94d9c55421d7b71"
+        self.markets = "player_points"
+        self.cache_key = f"event_odds_{self.sport}_{self.event_id}_{self.markets}"
+
+    def _slow_get(self, url, params=None, timeout=None):
+        time.sleep(0.2)
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = json.loads(json.dumps(sample_input))
+        return response
+
+    @patch("odds.utils.upstream.session.get")
+    def test_concurrent_misses_share_one_upstream_call(self, mock_get):
+        """Test that concurrent requests for one key call upstream once"""
+        mock_get.side_effect = self._slow_get
+        statuses = []
+
+        def request_odds():
+            request = self.factory.get("/fetch_event_odds/")
+            response = fetch_event_odds(
+                request, self.sport, self.event_id, self.markets
+            )
+            statuses.append(response.status_code)
+
+        threads = [threading.Thread(target=request_odds) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [200] * 8)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("odds.utils.upstream.session.get")
+    def test_waits_for_snapshot_from_lock_holder(self, mock_get):
+        """Test that a miss waits for another process holding the fetch lock"""
+        cache.add(f"flight:{self.cache_key}", "other-process", 30)
+        publisher = threading.Timer(
+            0.2, cache.set, args=(self.cache_key, {"test": "data"}, 60)
+        )
+        publisher.start()
+
+        data, metadata = cached_odds_api_get(
+            self.cache_key,
+            f"/v4/sports/{self.sport}/events/{self.event_id}/odds",
+            alias=PARSED_ALIAS,
+        )
+        publisher.join()
+
+        self.assertEqual(data, {"test": "data"})
+        self.assertTrue(metadata["cached"])
+        mock_get.assert_not_called()
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class StaleWhileRevalidateTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.sport = "basketball_nba"
+        self.event_id = "c1f70941e477df98e94d9c55421d7b71"
+        self.markets = "player_points"
+        self.cache_key = f"event_odds_{self.sport}_{self.event_id}_{self.markets}"
+
+    def _expired_snapshot(self, age):
+        set_snapshot(self.cache_key, {"test": "old"}, 60, alias=PARSED_ALIAS)
+        cache.delete(self.cache_key)
+        stale = get_stale_snapshot(self.cache_key, alias=PARSED_ALIAS)
+        stale["stored_at"] -= age
+        cache.set(f"stale:{self.cache_key}", stale, 3600)
+
+    def _get_response(self):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = json.loads(json.dumps(sample_input))
+        return response
+
+    @override_settings(ODDS_EVENT_ODDS_MAX_STALENESS=300)
+    @patch("odds.utils.upstream.session.get")
+    def test_expired_snapshot_served_and_refreshed_in_background(self, mock_get):
+        """Test that an expired snapshot is served at once and refreshed"""
+        mock_get.return_value = self._get_response()
+        self._expired_snapshot(age=90)
+
+        request = self.factory.get("/fetch_event_odds/")
+        response = fetch_event_odds(request, self.sport, self.event_id, self.markets)
+
+        data = json.loads(response.content)
+        self.assertEqual(data["data"], {"test": "old"})
+        self.assertTrue(data["metadata"]["cached"])
+        self.assertGreaterEqual(data["metadata"]["age"], 90)
+
+        deadline = time.monotonic() + 2
+        while cache.get(self.cache_key) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get(self.cache_key), parse_event_odds(sample_input))
+        mock_get.assert_called_once()
+
+    @override_settings(ODDS_EVENT_ODDS_MAX_STALENESS=300)
+    @patch("odds.utils.upstream.session.get")
+    def test_snapshot_past_max_staleness_blocks_on_refetch(self, mock_get):
+        """Test that a snapshot older than the maximum staleness is not served"""
+        mock_get.return_value = self._get_response()
+        self._expired_snapshot(age=600)
+
+        request = self.factory.get("/fetch_event_odds/")
+        response = fetch_event_odds(request, self.sport, self.event_id, self.markets)
+
+        data = json.loads(response.content)
+        self.assertFalse(data["metadata"]["cached"])
+        self.assertEqual(data["data"], parse_event_odds(sample_input))
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class MarketBatchingTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.sport = "basketball_nba"
+        self.event_id = sample_input["id"]
+        # Same outcomes re-keyed as a second market on every bookmaker
+        self.multi_market_input = json.loads(json.dumps(sample_input))
+        for bookmaker in self.multi_market_input["bookmakers"]:
+            assists = json.loads(json.dumps(bookmaker["markets"][0]))
+            assists["key"] = "player_assists"
+            bookmaker["markets"].append(assists)
+
+    def _fake_get(self, url, params=None, timeout=None):
+        time.sleep(0.05)
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = json.loads(json.dumps(self.multi_market_input))
+        return response
+
+    def _concurrently(self, requests, stagger=0):
+        # Starts requests (callables) stagger seconds apart and waits for all
+        threads = []
+        for request in requests:
+            threads.append(threading.Thread(target=request))
+            threads[-1].start()
+            time.sleep(stagger)
+        for thread in threads:
+            thread.join()
+
+    @override_settings(ODDS_MARKET_BATCH_WINDOW=0.2)
+    @patch("odds.utils.upstream.session.get")
+    def test_concurrent_markets_share_one_upstream_call(self, mock_get):
+        """Test that markets requested together for an event are fetched once"""
+        mock_get.side_effect = self._fake_get
+        results = {}
+
+        def request_market(market):
+            request = self.factory.get("/fetch_event_odds/")
+            response = fetch_event_odds(request, self.sport, self.event_id, market)
+            results[market] = json.loads(response.content)
+
+        self._concurrently(
+            [
+                lambda: request_market("player_points"),
+                lambda: request_market("player_assists"),
+            ]
+        )
+
+        [call] = mock_get.call_args_list
+        requested = call.kwargs["params"]["markets"].split(",")
+        self.assertCountEqual(requested, ["player_points", "player_assists"])
+        self.assertEqual(results["player_points"]["data"]["market"], "player_points")
+        self.assertEqual(results["player_assists"]["data"]["market"], "player_assists")
+        self.assertIsNotNone(
+            cache.get(f"event_odds_{self.sport}_{self.event_id}_player_assists")
+        )
+
+    @override_settings(ODDS_MARKET_BATCH_WINDOW=0.3)
+    @patch("odds.utils.upstream.session.get")
+    def test_staggered_markets_join_the_leaders_batch(self, mock_get):
+        """Test that markets arriving within the window share the first's call"""
+        mock_get.side_effect = self._fake_get
+        markets = ["player_points", "player_assists", "player_points"]
+        results = []
+
+        def request_market(market):
+            results.append(
+                event_market_batcher.fetch(self.sport, self.event_id, [market])
+            )
+
+        self._concurrently(
+            [lambda market=market: request_market(market) for market in markets],
+            stagger=0.05,
+        )
+
+        self.assertEqual(mock_get.call_count, 1)
+        requested = mock_get.call_args.kwargs["params"]["markets"].split(",")
+        self.assertCountEqual(requested, ["player_points", "player_assists"])
+        self.assertEqual(len(results), 3)
+
+    @override_settings(ODDS_MARKET_BATCH_WINDOW=0.2)
+    @patch("odds.utils.upstream.session.get")
+    def test_bad_market_fails_only_its_own_requests(self, mock_get):
+        """Test that a market that can't be parsed doesn't fail its batch mates"""
+        for bookmaker in self.multi_market_input["bookmakers"]:
+            for outcome in bookmaker["markets"][1]["outcomes"]:
+                del outcome["description"]
+        mock_get.side_effect = self._fake_get
+        results = {}
+
+        def request_market(market):
+            try:
+                results[market] = event_market_batcher.fetch(
+                    self.sport, self.event_id, [market]
+                )[market]
+            except UpstreamError as e:
+                results[market] = e
+
+        self._concurrently(
+            [
+                lambda: request_market("player_points"),
+                lambda: request_market("player_assists"),
+            ]
+        )
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(results["player_points"], parse_event_odds(sample_input))
+        self.assertEqual(results["player_assists"].status, 502)
+        self.assertIsNone(
+            cache.get(f"event_odds_{self.sport}_{self.event_id}_player_assists")
+        )
+
+    def test_split_event_markets_keeps_unpriced_markets(self):
+        """Test that splitting yields one payload per requested market"""
+        split = split_event_markets(
+            self.multi_market_input, ["player_points", "player_steals"]
+        )
+
+        self.assertEqual(
+            parse_market_odds(split["player_points"], "player_points"),
+            parse_event_odds(sample_input),
+        )
+        parsed_steals = parse_market_odds(split["player_steals"], "player_steals")
+        self.assertEqual(parsed_steals["market"], "player_steals")
+        self.assertEqual(parsed_steals["player"], {})
+
+    def tearDown(self):
+        clear_caches()
+        upstream.breaker.reset()
+
+
+class _FakeOddsAPIHandler(BaseHTTPRequestHandler):
+    """Serves scripted (delay, status, body) responses, then the default one."""
+
+    def do_GET(self):
+        self.server.hits += 1
+        if self.server.script:
+            delay, status, body = self.server.script.pop(0)
+        else:
+            delay, status, body = self.server.default
+        time.sleep(delay)
+        try:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (timeout) before the response was written
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ResilientUpstreamTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOddsAPIHandler)
+        cls.server_thread = threading.Thread(
+            target=cls.server.serve_forever, daemon=True
+        )
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.hits = 0
+        self.server.script = []
+        self.server.default = (0, 200, [{"key": "basketball_nba"}])
+        self.settings_override = override_settings(
+            ODDS_API_BASE_URL=f"http://127.0.0.1:{self.server.server_port}",
+            UPSTREAM_MAX_RETRIES=2,
+            UPSTREAM_BACKOFF_BASE=0.01,
+            UPSTREAM_BACKOFF_MAX=0.02,
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        upstream.breaker.reset()
+        clear_caches()
+
+    def test_transient_errors_are_retried(self):
+        """Test that 5xx responses are retried until upstream recovers"""
+        self.server.script = [(0, 503, {}), (0, 502, {})]
+
+        response = odds_api_get("/v4/sports/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"key": "basketball_nba"}])
+        self.assertEqual(self.server.hits, 3)
+
+    @override_settings(ODDS_API_DEADLINE=0.5, ODDS_API_READ_TIMEOUT=0.2)
+    def test_deadline_bounds_slow_upstream(self):
+        """Test that a slow upstream cannot hold the caller past the deadline"""
+        self.server.default = (1.0, 200, [])
+
+        started = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            odds_api_get("/v4/sports/")
+
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_open_circuit_fails_fast_and_serves_stale(self):
+        """Test that an open circuit skips upstream and serves cached data"""
+        self.server.default = (0, 500, {"message": "down"})
+        set_snapshot("sport_odds_test", [{"id": "old"}], 60)
+        upstream_cache.delete("sport_odds_test")
+
+        with patch.object(upstream.breaker, "failure_threshold", 3):
+            data, metadata = cached_odds_api_get(
+                "sport_odds_test", "/v4/sports/test/odds/"
+            )
+            self.assertEqual(upstream.breaker.state, "open")
+            self.assertEqual(self.server.hits, 3)
+
+            data, metadata = cached_odds_api_get(
+                "sport_odds_test", "/v4/sports/test/odds/"
+            )
+
+        self.assertEqual(data, [{"id": "old"}])
+        self.assertTrue(metadata["stale"])
+        self.assertEqual(self.server.hits, 3)
+
+    def test_half_open_probe_closes_circuit(self):
+        """Test that one successful probe after the reset timeout closes the circuit"""
+        self.server.default = (0, 500, {})
+        with patch.object(upstream.breaker, "failure_threshold", 1), patch.object(
+            upstream.breaker, "reset_timeout", 0.05
+        ):
+            odds_api_get("/v4/sports/")
+            self.assertEqual(upstream.breaker.state, "open")
+            with self.assertRaises(CircuitOpenError):
+                odds_api_get("/v4/sports/")
+
+            time.sleep(0.06)
+            self.server.default = (0, 200, [])
+            response = odds_api_get("/v4/sports/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(upstream.breaker.state, "closed")
@@ -1,55 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from django.conf import settings
 
-ODDS_BASE_URL = "https://api.the-odds-api.com"
+from odds.utils.cache_helpers import UpstreamError, cached_odds_api_get
+from odds.utils.request_planner import event_odds_query, events_query, upcoming
 
 
-def fetch_player_prop_odds(sport, market_key, limit=5):
+def fetch_player_prop_odds(sport, market_key, limit=5, max_workers=None, timeout=None):
     """
     Fetches player prop odds using the per-event Odds API endpoint.
 
+    The per-event requests are fanned out over a bounded thread pool so the
+    total latency tracks the slowest event rather than the sum of all of them.
+
     Args:
         sport (str): e.g., "basketball_nba"
         market_key (str): e.g., "player_points", "player_assists"
         limit (int): Number of games/events to fetch
+        max_workers (int): Parallel event requests (defaults to
+            settings.ODDS_FANOUT_MAX_WORKERS, 1 fetches sequentially)
+        timeout (float): Per-event request timeout in seconds (defaults to
+            settings.ODDS_FANOUT_EVENT_TIMEOUT)
 
     Returns:
-        list of dicts: Odds data per event
+        tuple: (list of dicts with odds data per event in event order,
+                list of dicts describing events that failed to fetch)
     """
+    if max_workers is None:
+        max_workers = settings.ODDS_FANOUT_MAX_WORKERS
+    if timeout is None:
+        timeout = settings.ODDS_FANOUT_EVENT_TIMEOUT
+
     try:
-        events_url = f"{ODDS_BASE_URL}/v4/sports/{sport}/events/"
-        events_response = requests.get(events_url, params={"apiKey": settings.API_KEY})
-        events = events_response.json()[:limit]
-
-        all_odds = []
-
-        for event in events:
-            event_id = event["id"]
-            odds_url = f"{ODDS_BASE_URL}/v4/sports/{sport}/events/{event_id}/odds/"
-            odds_params = {
-                "apiKey": settings.API_KEY,
-                "markets": market_key,
-                "regions": "us",
-                "oddsFormat": "decimal",
-            }
-            event_response = requests.get(odds_url, params=odds_params)
-            if event_response.status_code != 200:
-                continue
-
-            event_data = event_response.json()
-            event_data["home_team"] = event.get("home_team")
-            event_data["away_team"] = event.get("away_team")
-
-            # Inject the site link per bookmaker
-            for bookmaker in event_data.get("bookmakers", []):
-                bookmaker["site"] = bookmaker.get(
-                    "site", None
-                )  # Typically already provided
+        events, _ = cached_odds_api_get(
+            f"events_{sport}",
+            f"/v4/sports/{sport}/events/",
+            params=events_query(),
+            ttl=300,
+            timeout=timeout,
+            consumer="player_props",
+        )
+        events = upcoming(events, limit)
+    except Exception as e:
+        print("Error fetching player props:", str(e))
+        return [], [{"event_id": None, "error": str(e)}]
 
+    workers = max(1, min(max_workers, len(events)))
+    if workers == 1:
+        results = [
+            _fetch_event_prop_odds(sport, event, market_key, timeout)
+            for event in events
+        ]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _fetch_event_prop_odds, sport, event, market_key, timeout
+                )
+                for event in events
+            ]
+            # Collect in submission order so the output follows the events list
+            results = [future.result() for future in futures]
+
+    all_odds = []
+    failed_events = []
+    for event_data, error in results:
+        if error is not None:
+            failed_events.append(error)
+        else:
             all_odds.append(event_data)
 
-        return all_odds
+    return all_odds, failed_events
 
-    except Exception as e:
-        print("Error fetching player props:", str(e))
-        return []
+
+def _fetch_event_prop_odds(sport, event, market_key, timeout):
+    """
+    Fetches a single event's odds for the prop fan-out.
+
+    Returns:
+        tuple: (event_data, None) on success or (None, error dict) on failure
+    """
+    event_id = event["id"]
+    odds_path = f"/v4/sports/{sport}/events/{event_id}/odds/"
+    odds_params = event_odds_query([market_key])
+    failure = {
+        "event_id": event_id,
+        "home_team": event.get("home_team"),
+        "away_team": event.get("away_team"),
+    }
+
+    try:
+        event_data, _ = cached_odds_api_get(
+            f"prop_odds_{sport}_{event_id}_{market_key}",
+            odds_path,
+            params=odds_params,
+            transform=lambda event_data: annotate_event_odds(event_data, event),
+            timeout=timeout,
+            consumer="player_props",
+        )
+    except requests.exceptions.RequestException as e:
+        return None, {**failure, "error": str(e)}
+    except UpstreamError as e:
+        return None, {**failure, "status": e.status, "error": e.details}
+    except (ValueError, KeyError, TypeError) as e:
+        # A non-JSON body or malformed payload fails only this event
+        return None, {**failure, "error": f"Malformed odds payload: {e!r}"}
+
+    return event_data, None
+
+
+def annotate_event_odds(event_data, event):
+    """Copies the team names from the events list onto a per-event odds payload."""
+    event_data["home_team"] = event.get("home_team")
+    event_data["away_team"] = event.get("away_team")
+
+    # Inject the site link per bookmaker
+    for bookmaker in event_data.get("bookmakers", []):
+        bookmaker["site"] = bookmaker.get("site", None)  # Typically already provided
+
+    return event_data
@@ -0,0 +1,186 @@
+"""
+Odds API credit budgeter.
+
+Every Odds API response carries x-requests-remaining / x-requests-used /
+x-requests-last headers. The budgeter records them per endpoint and market,
+keeps a sliding window of spent credits to estimate the burn rate, and tells
+the cache layer how much to stretch TTLs (or whether to stop calling upstream
+and serve stale snapshots) as the remaining quota runs low.
+
+It also accounts requests, bytes downloaded, credits and JSON parse time per
+consumer (the feature that made the request; see request_planner.py).
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+_EVENT_ID_RE = re.compile(r"/events/[^/]+")
+_SPORT_RE = re.compile(r"/sports/[^/]+/")
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    if not isinstance(value, (str, int, float)):
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def endpoint_label(path):
+    """Collapses sport keys and event ids so usage groups by endpoint."""
+    label = _SPORT_RE.sub("/sports/{sport}/", path)
+    return _EVENT_ID_RE.sub("/events/{event_id}", label)
+
+
+class QuotaBudget:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.remaining = None
+            self.used = None
+            self.updated_at = None
+            self._usage = {}
+            self._consumers = {}
+            self._window = deque()
+
+    def _consumer(self, consumer):
+        # Caller holds the lock
+        return self._consumers.setdefault(
+            consumer, {"requests": 0, "bytes": 0, "credits": 0, "parse_seconds": 0.0}
+        )
+
+    def record(self, path, params, response, consumer=None):
+        """
+        Reads the quota headers off an upstream response and accounts its size
+        to consumer (defaults to the endpoint).
+        """
+        headers = getattr(response, "headers", None) or {}
+        remaining = _header_int(headers, "x-requests-remaining")
+        used = _header_int(headers, "x-requests-used")
+        cost = _header_int(headers, "x-requests-last")
+
+        # Bytes on the wire: compressed size when the server sends it
+        size = _header_int(headers, "content-length")
+        if size is None:
+            content = getattr(response, "content", None)
+            size = len(content) if isinstance(content, bytes) else 0
+        consumer = consumer or endpoint_label(path)
+        with self._lock:
+            counts = self._consumer(consumer)
+            counts["requests"] += 1
+            counts["bytes"] += size
+
+        if remaining is None and used is None:
+            return
+
+        now = time.time()
+        market = (params or {}).get("markets", "")
+        key = (endpoint_label(path), market)
+
+        with self._lock:
+            if cost is None and used is not None and self.used is not None:
+                cost = max(used - self.used, 0)
+            cost = cost or 0
+
+            if remaining is not None:
+                self.remaining = remaining
+            if used is not None:
+                self.used = used
+            self.updated_at = now
+
+            usage = self._usage.setdefault(key, {"requests": 0, "credits": 0})
+            usage["requests"] += 1
+            usage["credits"] += cost
+            self._consumer(consumer)["credits"] += cost
+
+            self._window.append((now, cost))
+            self._trim(now)
+
+    def record_parse(self, consumer, seconds):
+        """Adds time spent decoding a consumer's upstream payload."""
+        with self._lock:
+            self._consumer(consumer)["parse_seconds"] += seconds
+
+    def _trim(self, now):
+        cutoff = now - settings.ODDS_BUDGET_WINDOW
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+
+    def burn_rate(self):
+        """Credits spent per hour over the sliding window."""
+        with self._lock:
+            self._trim(time.time())
+            spent = sum(cost for _, cost in self._window)
+        return spent * 3600 / settings.ODDS_BUDGET_WINDOW
+
+    def ttl_multiplier(self):
+        """1 while the quota is healthy, growing as remaining credits run low."""
+        remaining = self.remaining
+        low = settings.ODDS_BUDGET_LOW_WATERMARK
+        if remaining is None or remaining >= low:
+            return 1
+        return min(settings.ODDS_BUDGET_MAX_TTL_MULTIPLIER, low / max(remaining, 1))
+
+    def ttl(self, base_ttl):
+        return int(base_ttl * self.ttl_multiplier())
+
+    def is_exhausted(self):
+        """True once remaining credits reach the reserve kept for fresh data."""
+        return (
+            self.remaining is not None
+            and self.remaining <= settings.ODDS_BUDGET_RESERVE
+        )
+
+    def snapshot(self):
+        burn_rate = self.burn_rate()
+        with self._lock:
+            usage = [
+                {
+                    "endpoint": endpoint,
+                    "market": market,
+                    "requests": counts["requests"],
+                    "credits": counts["credits"],
+                }
+                for (endpoint, market), counts in self._usage.items()
+            ]
+            consumers = [
+                {
+                    "consumer": consumer,
+                    **counts,
+                    "parse_seconds": round(counts["parse_seconds"], 3),
+                }
+                for consumer, counts in self._consumers.items()
+            ]
+            remaining = self.remaining
+            used = self.used
+            updated_at = self.updated_at
+
+        usage.sort(key=lambda x: x["credits"], reverse=True)
+        consumers.sort(key=lambda x: x["bytes"], reverse=True)
+        hours_left = None
+        if remaining is not None and burn_rate > 0:
+            hours_left = round(remaining / burn_rate, 2)
+
+        return {
+            "remaining": remaining,
+            "used": used,
+            "updated_at": updated_at,
+            "burn_rate_per_hour": round(burn_rate, 2),
+            "hours_until_exhausted": hours_left,
+            "ttl_multiplier": round(self.ttl_multiplier(), 2),
+            "serving_stale": self.is_exhausted(),
+            "usage": usage,
+            "consumers": consumers,
+        }
+
+
+budget = QuotaBudget()
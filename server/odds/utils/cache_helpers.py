@@ -0,0 +1,216 @@
+"""
+Cache helpers for upstream Odds API snapshots.
+
+Every snapshot is stored twice: under its regular key with a TTL stretched by
+the credit budget, and under a long-lived stale shadow. The shadow is served
+instead of calling upstream once the quota reserve is reached, and whenever
+upstream fails, so running out of credits degrades to old data instead of
+errors. Concurrent misses for the same key are coalesced into one upstream
+fetch (odds/utils/single_flight.py).
+
+Raw upstream payloads live in the "upstream" cache alias and parsed odds in
+"default" (see CACHES in settings), each with its own memory budget.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.cache_backends import ByteBudgetLRUCache
+
+from odds.utils.budget import budget, endpoint_label
+from odds.utils.single_flight import is_in_flight, single_flight
+from odds.utils.upstream import odds_api_get
+
+logger = logging.getLogger(__name__)
+
+STALE_PREFIX = "stale:"
+UPSTREAM_ALIAS = "upstream"
+PARSED_ALIAS = "default"
+
+# Aliases the ingest worker publishes to; the web workers must see them
+PUBLISHED_ALIASES = (UPSTREAM_ALIAS, PARSED_ALIAS, "arbitrage")
+
+# Backends whose entries never leave the process that wrote them
+PROCESS_LOCAL_BACKENDS = (ByteBudgetLRUCache, LocMemCache, DummyCache)
+
+
+class UpstreamError(Exception):
+    """Raised when upstream fails and there is no snapshot to fall back on."""
+
+    def __init__(self, status, details):
+        super().__init__(details)
+        self.status = status
+        self.details = details
+
+
+def process_local_aliases(aliases=PUBLISHED_ALIASES):
+    """Aliases whose cache backend isn't shared with other processes."""
+    return [
+        alias for alias in aliases if isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+    ]
+
+
+def set_snapshot(cache_key, value, ttl, alias=UPSTREAM_ALIAS, budgeted=True):
+    # budgeted=False keeps ttl as is for data that costs no Odds API credits
+    cache = caches[alias]
+    cache.set(cache_key, value, budget.ttl(ttl) if budgeted else ttl)
+    cache.set(
+        STALE_PREFIX + cache_key,
+        {"value": value, "stored_at": time.time()},
+        settings.ODDS_STALE_TTL,
+    )
+
+
+def get_stale_snapshot(cache_key, alias=UPSTREAM_ALIAS):
+    return caches[alias].get(STALE_PREFIX + cache_key)
+
+
+def _stale_metadata(stale):
+    return {
+        "cached": True,
+        "stale": True,
+        "age": round(time.time() - stale["stored_at"], 1),
+    }
+
+
+def fetch_snapshot(
+    cache_key,
+    path,
+    params=None,
+    ttl=60,
+    transform=None,
+    timeout=None,
+    alias=UPSTREAM_ALIAS,
+    consumer=None,
+):
+    """
+    Fetches a payload from upstream and publishes it under cache_key.
+
+    Raises:
+        UpstreamError: upstream returned a non-200 response
+    """
+    response = odds_api_get(path, params=params, timeout=timeout, consumer=consumer)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+
+    started = time.perf_counter()
+    data = response.json()
+    if transform is not None:
+        data = transform(data)
+    budget.record_parse(consumer or endpoint_label(path), time.perf_counter() - started)
+
+    set_snapshot(cache_key, data, ttl, alias=alias)
+    return data
+
+
+def cached_odds_api_get(
+    cache_key,
+    path,
+    params=None,
+    ttl=60,
+    transform=None,
+    timeout=None,
+    max_stale=None,
+    fetcher=None,
+    alias=UPSTREAM_ALIAS,
+    consumer=None,
+):
+    """
+    GETs an Odds API path through the snapshot cache.
+
+    With settings.ODDS_PRECOMPUTED_ONLY the request never goes upstream: only
+    snapshots published by the ingest_odds worker are served.
+
+    With max_stale set the cache works stale-while-revalidate: after the TTL
+    expires, a snapshot up to max_stale seconds old is returned immediately
+    and refreshed in a background thread; older snapshots block on a refetch.
+
+    Args:
+        cache_key (str): Cache key for the (transformed) payload
+        path (str): Odds API path
+        params (dict): Query parameters
+        ttl (int): Base TTL in seconds, stretched when the quota runs low
+        transform (callable): Applied to the JSON payload before caching
+        timeout (float or tuple): Passed through to the upstream client
+        max_stale (int): Enables stale-while-revalidate up to this age (seconds)
+        fetcher (callable): Replaces the plain GET of path; must publish
+            cache_key itself and return the data (used for batched fetches)
+        alias (str): Cache alias holding the snapshot
+        consumer (str): Feature the request is made for, for byte accounting
+
+    Returns:
+        tuple: (data, metadata) where metadata has "cached" and "stale" flags,
+               plus the snapshot "age" in seconds when stale and "refreshing"
+               when a background refresh was started
+
+    Raises:
+        UpstreamError: upstream returned an error (or, in precomputed-only
+                       mode, nothing has been published) and no stale copy exists
+    """
+    cache = caches[alias]
+    data = cache.get(cache_key)
+    if data is not None:
+        return data, {"cached": True, "stale": False}
+
+    stale = get_stale_snapshot(cache_key, alias=alias)
+    precomputed_only = settings.ODDS_PRECOMPUTED_ONLY
+    if stale is not None and (precomputed_only or budget.is_exhausted()):
+        return stale["value"], _stale_metadata(stale)
+    if precomputed_only:
+        raise UpstreamError(503, "No precomputed snapshot available yet")
+
+    def fetch():
+        if fetcher is not None:
+            data = fetcher()
+        else:
+            data = fetch_snapshot(
+                cache_key,
+                path,
+                params=params,
+                ttl=ttl,
+                transform=transform,
+                timeout=timeout,
+                alias=alias,
+                consumer=consumer,
+            )
+        return data, {"cached": False, "stale": False}
+
+    def peek():
+        data = cache.get(cache_key)
+        if data is None:
+            return None
+        return data, {"cached": True, "stale": False}
+
+    if stale is not None and max_stale is not None:
+        metadata = _stale_metadata(stale)
+        if metadata["age"] <= max_stale:
+            _refresh_in_background(cache_key, fetch, peek)
+            return stale["value"], {**metadata, "refreshing": True}
+
+    try:
+        # Concurrent misses for this key share one upstream fetch
+        return single_flight(cache_key, fetch, peek)
+    except (requests.exceptions.RequestException, UpstreamError):
+        if stale is not None:
+            return stale["value"], _stale_metadata(stale)
+        raise
+
+
+def _refresh_in_background(cache_key, fetch, peek):
+    if is_in_flight(cache_key):
+        return
+
+    def refresh():
+        try:
+            single_flight(cache_key, fetch, peek)
+        except Exception as e:
+            logger.warning("background refresh of %s failed: %s", cache_key, e)
+
+    threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,162 @@
+"""
+Background odds ingestion.
+
+Polls the configured sports, events and markets and publishes ready-to-serve
+snapshots under the same cache keys the views read, so that with
+settings.ODDS_PRECOMPUTED_ONLY request handling never waits on upstream.
+Each event's markets are fetched in one upstream call and split per market.
+Run it with `python manage.py ingest_odds`; the web workers only see what it
+publishes through a shared cache (CACHE_BACKEND=sqlite).
+
+Published keys per sport ("upstream" cache alias unless noted):
+    events_{sport}                              events list (/core/current-games/)
+    sport_odds_{sport}_h2h                      h2h odds (/arbitrage/*)
+    prop_odds_{sport}_{event_id}_{market}       raw per-event odds (player props)
+    event_odds_{sport}_{event_id}_{market}      parsed per-event odds (/odds/event/),
+                                                in the "default" alias
+    arbitrage_{sport}_h2h                       h2h arbitrage from the incremental
+                                                index, in the "arbitrage" alias
+    value_feed_{sport}                          serialized h2h value bets from the
+                                                rolling consensus store, in the
+                                                "arbitrage" alias (see value_helper)
+"""
+
+import logging
+
+import requests
+from django.core.cache import caches
+
+from odds.arbitrage.consensus import ConsensusStore
+from odds.arbitrage.history import arbitrage_history
+from odds.arbitrage.index import ArbitrageIndex
+
+from odds.utils.api_helpers import annotate_event_odds
+from odds.utils.cache_helpers import (
+    PARSED_ALIAS,
+    UpstreamError,
+    fetch_snapshot,
+    set_snapshot,
+)
+from odds.utils.request_planner import (
+    event_odds_query,
+    events_query,
+    sport_odds_query,
+    upcoming,
+)
+from odds.utils.upstream import odds_api_get
+from odds.utils.view_helpers import (
+    legacy_market_odds,
+    parse_event_markets,
+    split_event_markets,
+)
+from odds.value_helper import publish_value_feed
+
+logger = logging.getLogger(__name__)
+
+# sport -> ArbitrageIndex kept across polls, so each poll only re-evaluates
+# the lines whose prices moved
+arbitrage_indexes = {}
+
+# sport -> ConsensusStore kept across polls, so each poll only re-scores the
+# quotes on lines whose prices moved
+consensus_stores = {}
+
+
+def ingest_sport(sport, markets, ttl):
+    """
+    Publishes one snapshot of a sport's events, h2h odds and event markets.
+
+    Args:
+        sport (str): e.g., "basketball_nba"
+        markets (list): Per-event markets, e.g. ["player_points"]
+        ttl (int): Base TTL for the published snapshots
+
+    Returns:
+        dict: Counts of published snapshots and any per-item errors
+    """
+    stats = {
+        "sport": sport,
+        "events": 0,
+        "snapshots": 0,
+        "arbitrage_changes": 0,
+        "value_changes": 0,
+        "errors": [],
+    }
+
+    try:
+        events = fetch_snapshot(
+            f"events_{sport}",
+            f"/v4/sports/{sport}/events/",
+            params=events_query(),
+            ttl=ttl,
+            consumer="ingest",
+        )
+        games = fetch_snapshot(
+            f"sport_odds_{sport}_h2h",
+            f"/v4/sports/{sport}/odds/",
+            params=sport_odds_query(["h2h"]),
+            ttl=ttl,
+            consumer="ingest",
+        )
+    except (requests.exceptions.RequestException, UpstreamError) as e:
+        stats["errors"].append({"sport": sport, "error": str(e)})
+        return stats
+
+    stats["events"] = len(events)
+    stats["snapshots"] += 2
+
+    index = arbitrage_indexes.setdefault(sport, ArbitrageIndex())
+    deltas = index.apply_games(games, markets=("h2h",))
+    stats["arbitrage_changes"] = len(deltas)
+    opportunities = index.opportunities()
+    caches["arbitrage"].set(f"arbitrage_{sport}_h2h", opportunities, ttl)
+    arbitrage_history.record(opportunities)
+    for delta in deltas:
+        logger.info("arbitrage %s %s", delta["change"], delta["key"])
+
+    store = consensus_stores.setdefault(sport, ConsensusStore())
+    deltas = store.apply_games(games, markets=("h2h",))
+    stats["value_changes"] = len(deltas)
+    publish_value_feed(sport, store.value_bets(), ttl)
+    for delta in deltas:
+        logger.info("value bet %s %s", delta["change"], delta["key"])
+
+    # No per-event calls for events that started since the list was built
+    for event in upcoming(events):
+        try:
+            stats["snapshots"] += _ingest_event(sport, event, markets, ttl)
+        except Exception as e:
+            logger.warning("ingest %s %s failed: %s", sport, event["id"], e)
+            stats["errors"].append({"event_id": event["id"], "error": str(e)})
+
+    return stats
+
+
+def _ingest_event(sport, event, markets, ttl):
+    # One upstream call covers every market on the event
+    event_id = event["id"]
+    response = odds_api_get(
+        f"/v4/sports/{sport}/events/{event_id}/odds/",
+        params=event_odds_query(markets, include_links=True),
+        consumer="ingest",
+    )
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+
+    full_data = annotate_event_odds(response.json(), event)
+
+    # Parse every market in one pass; every reader shares the result
+    parsed = parse_event_markets(full_data, markets)
+
+    published = 0
+    for market, market_data in split_event_markets(full_data, markets).items():
+        set_snapshot(f"prop_odds_{sport}_{event_id}_{market}", market_data, ttl)
+        set_snapshot(
+            f"event_odds_{sport}_{event_id}_{market}",
+            legacy_market_odds(parsed, market),
+            ttl,
+            alias=PARSED_ALIAS,
+        )
+        published += 2
+
+    return published
@@ -0,0 +1,110 @@
+"""
+Batches concurrent market requests for the same event into one upstream call.
+
+The Odds API accepts a comma-separated markets list, so requests for
+player_points, player_assists, player_rebounds, ... on one event that arrive
+within settings.ODDS_MARKET_BATCH_WINDOW seconds are merged into a single
+/events/{id}/odds call. The first request for an event always holds the
+window open, since the markets that join it tend to arrive just after it.
+The combined payload is split per market and each market parsed on its own
+and published under the per-market event_odds_{sport}_{event_id}_{market}
+keys, so a market that fails to parse only fails the requests that asked
+for it.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from odds.utils.cache_helpers import PARSED_ALIAS, UpstreamError, set_snapshot
+from odds.utils.request_planner import event_odds_query
+from odds.utils.upstream import odds_api_get
+from odds.utils.view_helpers import parse_market_odds, split_event_markets
+
+
+class _Batch:
+    def __init__(self):
+        self.markets = []
+        self.done = threading.Event()
+        self.results = None  # market -> parsed odds or the error parsing it
+        self.error = None  # the shared upstream call failed
+
+
+class EventMarketBatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+
+    def fetch(self, sport, event_id, markets, ttl=60):
+        """
+        Fetches parsed odds for markets on one event, sharing the upstream call
+        with any other markets requested for that event in the same window.
+
+        Returns:
+            dict: market -> parsed odds (parse_event_odds shape)
+
+        Raises:
+            UpstreamError: upstream returned a non-200 response, or (502) one
+                of these markets couldn't be parsed
+        """
+        key = (sport, event_id)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._open[key] = batch
+            for market in markets:
+                if market not in batch.markets:
+                    batch.markets.append(market)
+
+        if leader:
+            self._lead(key, batch, ttl)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        results = {market: batch.results[market] for market in markets}
+        for market, result in results.items():
+            if isinstance(result, Exception):
+                raise UpstreamError(502, f"Could not parse {market}: {result!r}")
+        return results
+
+    def _lead(self, key, batch, ttl):
+        # Give concurrent requests for other markets a moment to join
+        time.sleep(settings.ODDS_MARKET_BATCH_WINDOW)
+        with self._lock:
+            del self._open[key]
+        try:
+            batch.results = self._fetch_batch(*key, batch.markets, ttl)
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+    def _fetch_batch(self, sport, event_id, markets, ttl):
+        response = odds_api_get(
+            f"/v4/sports/{sport}/events/{event_id}/odds",
+            params=event_odds_query(markets, include_links=True),
+            consumer="event_odds",
+        )
+        if response.status_code != 200:
+            raise UpstreamError(response.status_code, response.text)
+
+        results = {}
+        split = split_event_markets(response.json(), markets)
+        for market, market_data in split.items():
+            try:
+                results[market] = parse_market_odds(market_data, market)
+            except Exception as e:
+                results[market] = e
+                continue
+            cache_key = f"event_odds_{sport}_{event_id}_{market}"
+            set_snapshot(cache_key, results[market], ttl, alias=PARSED_ALIAS)
+
+        return results
+
+
+event_market_batcher = EventMarketBatcher()
@@ -0,0 +1,103 @@
+"""
+Upstream request planner.
+
+Builds the smallest Odds API query for what a consumer actually uses:
+
+    bookmakers         only the books we show (settings.ODDS_BOOKMAKERS),
+                       instead of every book in the region
+    commenceTimeFrom   drops events that have already started
+    commenceTimeTo     drops events more than settings.ODDS_COMMENCE_WITHIN_HOURS
+                       ahead (0 keeps every upcoming event)
+
+Consumers that share a snapshot (e.g. every reader of sport_odds_{sport}_h2h)
+must build it from the same plan so the cached payload suits all of them.
+The shared events_{sport} list is fetched without a time window, because
+/core/current-games/ lists games already in progress; prop scans narrow it
+with upcoming() instead (the events endpoint costs no credits).
+Each request is tagged with its consumer so the budgeter can report bytes,
+parse time and credits per feature (see /core/ops/quota/).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+
+def _api_time(moment):
+    # The Odds API takes ISO 8601 UTC without fractional seconds
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _book_filter(bookmakers):
+    books = settings.ODDS_BOOKMAKERS if bookmakers is None else bookmakers
+    # bookmakers overrides regions; without it, fall back to the US region
+    return {"bookmakers": ",".join(books)} if books else {"regions": "us"}
+
+
+def events_query():
+    """
+    Query for /v4/sports/{sport}/events/ (events are free of credits).
+
+    No time window: the shared events_{sport} snapshot includes games in
+    progress, and readers that want upcoming games filter with upcoming().
+    """
+    return {}
+
+
+def _time_window():
+    # Events that haven't started, within the commence horizon
+    now = datetime.now(timezone.utc)
+    window = {"commenceTimeFrom": _api_time(now)}
+    if settings.ODDS_COMMENCE_WITHIN_HOURS:
+        later = now + timedelta(hours=settings.ODDS_COMMENCE_WITHIN_HOURS)
+        window["commenceTimeTo"] = _api_time(later)
+    return window
+
+
+def sport_odds_query(markets, bookmakers=None):
+    """
+    Query for /v4/sports/{sport}/odds/, limited to upcoming events.
+
+    Args:
+        markets (iterable): Market keys, e.g. ["h2h"]
+        bookmakers (list): Bookmaker keys; defaults to settings.ODDS_BOOKMAKERS
+
+    Returns:
+        dict: Query parameters for odds_api_get
+    """
+    return {
+        "markets": ",".join(markets),
+        "oddsFormat": "decimal",
+        **_book_filter(bookmakers),
+        **_time_window(),
+    }
+
+
+def event_odds_query(markets, bookmakers=None, include_links=False):
+    """Query for /v4/sports/{sport}/events/{event_id}/odds/."""
+    params = {
+        "markets": ",".join(markets),
+        "oddsFormat": "decimal",
+        **_book_filter(bookmakers),
+    }
+    if include_links:
+        params["includeLinks"] = "true"
+    return params
+
+
+def upcoming(events, limit=None):
+    """
+    Drops events that have started (snapshots can outlive a commence time) or
+    start beyond settings.ODDS_COMMENCE_WITHIN_HOURS, and keeps the first
+    limit of the rest.
+    """
+    window = _time_window()
+    start, end = window["commenceTimeFrom"], window.get("commenceTimeTo")
+    # Same fixed-width UTC format, so string order is time order
+    kept = [
+        e
+        for e in events
+        if e.get("commence_time", start) >= start
+        and (end is None or e.get("commence_time", start) <= end)
+    ]
+    return kept if limit is None else kept[:limit]
@@ -0,0 +1,158 @@
+"""
+Deadlines, retries and circuit breaking for upstream calls.
+
+call_with_retries runs an idempotent GET under a total deadline, retrying
+connection errors, timeouts and retryable statuses with jittered exponential
+backoff. Each upstream has a CircuitBreaker: after enough consecutive failures
+it opens and calls fail fast with CircuitOpenError (a requests
+ConnectionError, so callers' existing network-error handling and the stale
+snapshot fallback apply) until a single probe call succeeds again.
+"""
+
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+_breakers = {}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+        _breakers[name] = self
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def before_call(self):
+        """Raises CircuitOpenError unless the call may go upstream."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                # Only one probe at a time while upstream is recovering
+                if self._probing:
+                    raise CircuitOpenError(f"{self.name} circuit is half-open")
+                self._probing = True
+
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "failures": self.failures,
+            }
+
+
+def breaker_states():
+    return [breaker.snapshot() for breaker in _breakers.values()]
+
+
+def _is_retryable_response(response):
+    return getattr(response, "status_code", None) in RETRY_STATUSES
+
+
+def call_with_retries(fn, breaker, deadline, is_failure=_is_retryable_response):
+    """
+    Calls fn(remaining_seconds) with retries inside a total deadline.
+
+    Args:
+        fn (callable): Performs one attempt; receives the seconds left before
+            the deadline so it can bound its own timeout
+        breaker (CircuitBreaker): Breaker guarding this upstream
+        deadline (float): Total seconds for all attempts and backoff sleeps
+        is_failure (callable): Flags a returned result as a retryable failure
+
+    Returns:
+        The first successful result, or the last failing result once retries
+        or the deadline run out or the circuit opens
+
+    Raises:
+        CircuitOpenError: the breaker is open
+        requests.exceptions.RequestException: the last attempt's error
+    """
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        breaker.before_call()
+        remaining = deadline - (time.monotonic() - started)
+
+        error = None
+        try:
+            result = fn(remaining)
+        except RETRY_EXCEPTIONS as e:
+            error, result = e, None
+        except Exception:
+            # Not an upstream health problem; just free a half-open probe
+            breaker.release()
+            raise
+        else:
+            if not is_failure(result):
+                breaker.record_success()
+                return result
+
+        breaker.record_failure()
+
+        # Full jitter: sleep a random slice of the exponential backoff window
+        backoff = min(
+            settings.UPSTREAM_BACKOFF_MAX,
+            settings.UPSTREAM_BACKOFF_BASE * 2**attempt,
+        )
+        delay = random.uniform(0, backoff)
+        remaining = deadline - (time.monotonic() - started)
+        gave_up = (
+            breaker.state == breaker.OPEN
+            or attempt >= settings.UPSTREAM_MAX_RETRIES
+            or delay >= remaining
+        )
+        if gave_up:
+            if error is not None:
+                raise error
+            return result
+
+        time.sleep(delay)
+        attempt += 1
@@ -0,0 +1,106 @@
+"""
+Per-key single-flight coalescing for snapshot cache misses.
+
+Concurrent misses for the same key run the upstream fetch once: within a
+process the first caller becomes the leader and the others wait on its result.
+Across worker processes the leader also takes a lock in the cache with
+cache.add; a process that finds the lock taken polls the cache for the
+snapshot the lock holder publishes instead of calling upstream itself. This
+needs a shared cache (CACHE_BACKEND=sqlite); with a process-local LocMemCache
+the lock is always free and only the in-process coalescing applies.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_PREFIX = "flight:"
+POLL_INTERVAL = 0.05
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def is_in_flight(key):
+    """True while a fetch for key is running in this process."""
+    with _flights_lock:
+        return key in _flights
+
+
+def single_flight(key, fetch, peek):
+    """
+    Runs fetch() at most once per key among concurrent callers.
+
+    Args:
+        key (str): Coalescing key, normally the snapshot cache key
+        fetch (callable): Does the upstream fetch and publishes the snapshot
+        peek (callable): Returns the published result, or None if not there yet
+
+    Returns:
+        The leader's fetch() result, or a snapshot published by another process
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _flights[key] = flight
+
+    if not leader:
+        if flight.done.wait(settings.ODDS_SINGLE_FLIGHT_WAIT):
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        # The leader is stuck; stop waiting and fetch independently
+        return fetch()
+
+    try:
+        flight.result = _fetch_with_cache_lock(key, fetch, peek)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _fetch_with_cache_lock(key, fetch, peek):
+    # Another flight may have published between our miss and taking the lead
+    result = peek()
+    if result is not None:
+        return result
+
+    lock_key = LOCK_PREFIX + key
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.ODDS_SINGLE_FLIGHT_LOCK_TTL):
+        try:
+            return fetch()
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Another process holds the lock: wait for the snapshot it publishes
+    deadline = time.monotonic() + settings.ODDS_SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = peek()
+        if result is not None:
+            return result
+        if cache.get(lock_key) is None:
+            break
+
+    # The holder failed or timed out without publishing
+    return peek() or fetch()
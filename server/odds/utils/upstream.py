@@ -0,0 +1,81 @@
+"""
+Shared HTTP client for every Odds API call site.
+
+All requests go through one pooled requests.Session so TLS connections are
+kept alive between calls, every call has connect/read timeouts, responses are
+gzip-compressed, and the base URL can be pointed at a local stand-in through
+settings.ODDS_API_BASE_URL. Quota headers on each response are fed to the
+credit budgeter (odds/utils/budget.py).
+
+Each call runs under a total deadline with jittered retries and behind the
+odds_api circuit breaker (odds/utils/resilience.py).
+"""
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from odds.utils.budget import budget
+from odds.utils.resilience import CircuitBreaker, call_with_retries
+
+session = requests.Session()
+session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+_adapter = HTTPAdapter(
+    pool_connections=settings.ODDS_API_POOL_CONNECTIONS,
+    pool_maxsize=settings.ODDS_API_POOL_MAXSIZE,
+)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+breaker = CircuitBreaker(
+    "odds_api",
+    failure_threshold=settings.UPSTREAM_BREAKER_THRESHOLD,
+    reset_timeout=settings.UPSTREAM_BREAKER_RESET,
+)
+
+
+def odds_api_url(path):
+    """Builds an absolute Odds API URL from a path such as "/v4/sports/"."""
+    return f"{settings.ODDS_API_BASE_URL.rstrip('/')}{path}"
+
+
+def odds_api_get(path, params=None, timeout=None, consumer=None):
+    """
+    Issues a GET against the Odds API on the shared session.
+
+    Connection errors, timeouts and 429/5xx responses are retried within
+    settings.ODDS_API_DEADLINE seconds; an open circuit fails immediately.
+
+    Args:
+        path (str): API path, e.g. "/v4/sports/basketball_nba/odds/"
+        params (dict): Query parameters; the API key is added automatically
+        timeout (float or tuple): Overrides the default (connect, read) timeout
+            of each attempt
+        consumer (str): Feature the request is made for, for byte accounting
+
+    Returns:
+        requests.Response
+
+    Raises:
+        CircuitOpenError: the Odds API circuit is open
+        requests.exceptions.RequestException: every attempt failed
+    """
+    query = {"apiKey": settings.API_KEY}
+    query.update(params or {})
+    if timeout is None:
+        timeout = (settings.ODDS_API_CONNECT_TIMEOUT, settings.ODDS_API_READ_TIMEOUT)
+
+    def attempt(remaining):
+        # Never let a single attempt outlive the overall deadline
+        if isinstance(timeout, tuple):
+            attempt_timeout = (timeout[0], max(0.01, min(timeout[1], remaining)))
+        else:
+            attempt_timeout = max(0.01, min(timeout, remaining))
+        response = session.get(
+            odds_api_url(path), params=query, timeout=attempt_timeout
+        )
+        budget.record(path, params, response, consumer=consumer)
+        return response
+
+    return call_with_retries(attempt, breaker, settings.ODDS_API_DEADLINE)
@@ -1,44 +1,66 @@
-# Repacks JSON data from endpoint as per-player rather than per-bookmaker
-def parse_event_odds(full_data):
-    parsed_data = {
-        "id": full_data["id"],
-        "sport_key": full_data["sport_key"],
-        "sport_title": full_data["sport_title"],
-        "commence_time": full_data["commence_time"],
-        "home_team": full_data["home_team"],
-        "away_team": full_data["away_team"],
-        "market": full_data["bookmakers"][0]["markets"][0]["key"],
-        "bookmaker": {},
-        "player": {},
+EVENT_HEADER = (
+    "id",
+    "sport_key",
+    "sport_title",
+    "commence_time",
+    "home_team",
+    "away_team",
+)
+
+
+# Repacks a (possibly multi-market) event payload in one pass as
+# market -> player -> bookmaker, with each bookmaker's last update per market.
+# Markets listed in markets are always present, even if no bookmaker prices them.
+def parse_event_markets(full_data, markets=()):
+    parsed_data = {key: full_data[key] for key in EVENT_HEADER}
+    parsed_data["markets"] = {
+        market: {"bookmaker": {}, "player": {}} for market in markets
     }
 
     for bookmaker in full_data["bookmakers"]:
-        # Bookmakers and their last update time are listed under the 'bookmaker' top level key
-        parsed_data["bookmaker"][bookmaker["key"]] = {
-            "title": bookmaker["title"],
-            "last_update": bookmaker["markets"][0]["last_update"],
-        }
-
-        # Each player in 'player' has a list of each bookmaker that carries odds for them
-        # Under each bookmaker within the player, the Over/Under price and point values are recorded
-        for outcome in bookmaker["markets"][0]["outcomes"]:
-            if outcome["description"] not in parsed_data["player"]:
-                parsed_data["player"][outcome["description"]] = {}
-
-            if bookmaker["title"] not in parsed_data["player"][outcome["description"]]:
-                parsed_data["player"][outcome["description"]][bookmaker["title"]] = {}
-
-            curr = parsed_data["player"][outcome["description"]][bookmaker["title"]]
-
-            curr[outcome["name"]] = {
-                "price": outcome["price"],
-                "point": outcome["point"],
-                "link": outcome["link"],
+        for market in bookmaker["markets"]:
+            parsed_market = parsed_data["markets"].setdefault(
+                market["key"], {"bookmaker": {}, "player": {}}
+            )
+            parsed_market["bookmaker"][bookmaker["key"]] = {
+                "title": bookmaker["title"],
+                "last_update": market["last_update"],
             }
 
+            players = parsed_market["player"]
+            for outcome in market["outcomes"]:
+                curr = players.setdefault(outcome["description"], {}).setdefault(
+                    bookmaker["title"], {}
+                )
+                curr[outcome["name"]] = {
+                    "price": outcome["price"],
+                    "point": outcome["point"],
+                    "link": outcome["link"],
+                }
+
     return parsed_data
 
 
+# Emits one market of a parse_event_markets result in the single-market shape
+# parse_event_odds has always returned (empty maps for an unpriced market)
+def legacy_market_odds(parsed_data, market):
+    empty = {"bookmaker": {}, "player": {}}
+    parsed_market = parsed_data["markets"].get(market, empty)
+    return {
+        **{key: parsed_data[key] for key in EVENT_HEADER},
+        "market": market,
+        "bookmaker": parsed_market["bookmaker"],
+        "player": parsed_market["player"],
+    }
+
+
+# Repacks JSON data from endpoint as per-player rather than per-bookmaker, for
+# the first market listed (use parse_event_markets for every market)
+def parse_event_odds(full_data):
+    market = full_data["bookmakers"][0]["markets"][0]["key"]
+    return legacy_market_odds(parse_event_markets(full_data), market)
+
+
 # Example player JSON
 # "player": {
 #  "Miles Bridges": {
@@ -64,3 +86,25 @@ def parse_event_odds(full_data):
 #    }
 #  }
 # }
+
+
+# Splits a multi-market event payload (markets=a,b,c) into one single-market
+# payload per requested market, in the shape parse_event_odds expects
+def split_event_markets(full_data, markets):
+    header = {key: value for key, value in full_data.items() if key != "bookmakers"}
+    split = {market: {**header, "bookmakers": []} for market in markets}
+
+    for bookmaker in full_data.get("bookmakers", []):
+        for market in bookmaker["markets"]:
+            if market["key"] in split:
+                split[market["key"]]["bookmakers"].append(
+                    {**bookmaker, "markets": [market]}
+                )
+
+    return split
+
+
+# Parses a single-market payload from split_event_markets; markets no bookmaker
+# has priced yet come back with empty bookmaker/player maps instead of failing
+def parse_market_odds(market_data, market):
+    return legacy_market_odds(parse_event_markets(market_data, [market]), market)
@@ -1,13 +1,76 @@
-from .arbitrage.value_detection import value_bet_opportunities
-from .utils.view_helpers import parse_event_odds
+"""
+Live value-bet feed.
 
+ingest_odds republishes a sport's feed from its rolling consensus store
+whenever a new h2h snapshot lands. The feed is stored in the "arbitrage"
+cache alias under value_feed_{sport} as the serialized JSON document that
+/arbitrage/valuebets/ returns, so serving it is one cache lookup with no
+upstream call, scan or serialization. Without the worker, a read that finds
+no feed builds one from the shared sport_odds_{sport}_h2h snapshot.
+"""
 
-def get_live_value_bets():
+import json
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .arbitrage.utils import detect_value_bets
+from .utils.cache_helpers import cached_odds_api_get
+from .utils.request_planner import sport_odds_query
+
+# Seconds a feed built on read lives: a fresh snapshot's TTL, or less when it
+# came from a snapshot of unknown age
+FRESH_FEED_TTL = 60
+CACHED_FEED_TTL = 15
+
+
+def value_feed_key(sport):
+    return f"value_feed_{sport}"
+
+
+def publish_value_feed(sport, value_bets, ttl):
+    """
+    Serializes value bets once and publishes them as the sport's live feed.
+
+    Returns:
+        bytes: The published JSON document
+    """
+    document = json.dumps(value_bets, cls=DjangoJSONEncoder).encode()
+    caches["arbitrage"].set(value_feed_key(sport), document, ttl)
+    return document
+
+
+def get_live_value_feed(sport="basketball_nba"):
+    """
+    The sport's live value-bet feed as a ready-to-serve JSON document.
+
+    Returns:
+        bytes: JSON list of value bets, highest value first
+
+    Raises:
+        UpstreamError: the feed had to be built and the odds fetch failed
+    """
+    document = caches["arbitrage"].get(value_feed_key(sport))
+    if document is not None:
+        return document
+
+    # Shares the h2h snapshot with the arbitrage views
+    games, metadata = cached_odds_api_get(
+        f"sport_odds_{sport}_h2h",
+        f"/v4/sports/{sport}/odds/",
+        params=sport_odds_query(["h2h"]),
+        consumer="value_bets",
+    )
+    value_bets = sorted(
+        detect_value_bets(games), key=lambda x: x["value_percentage"], reverse=True
+    )
+    ttl = CACHED_FEED_TTL if metadata["cached"] else FRESH_FEED_TTL
+    return publish_value_feed(sport, value_bets, ttl)
+
+
+def get_live_value_bets(sport="basketball_nba"):
+    """Live value bets for a sport, or [] if the odds can't be fetched."""
     try:
-        games = parse_event_odds(
-            sport="basketball_nba"
-        )  # Change if we need sports to be swappable
-        value_bets = value_bet_opportunities(games)
-        return value_bets
-    except Exception as e:
+        return json.loads(get_live_value_feed(sport))
+    except Exception:
         return []
@@ -3,65 +3,64 @@ from datetime import datetime
 from django.test import TestCase, RequestFactory
 from unittest.mock import MagicMock, patch
 
-import requests
 from django.conf import settings
-from django.core.cache import cache
 from django.http import JsonResponse
 
-from odds.utils.view_helpers import parse_event_odds
-
-ODDS_BASE_URL = "https://api.the-odds-api.com"
+from odds.utils.cache_helpers import (
+    PARSED_ALIAS,
+    UpstreamError,
+    cached_odds_api_get,
+    set_snapshot,
+)
+from odds.utils.market_batcher import event_market_batcher
 
 
 # GET /v4/sports/{sport}/events/{eventId}/odds?apiKey={apiKey}&regions={regions}&markets={markets}&dateFormat={dateFormat}&oddsFormat={oddsFormat}
 def fetch_event_odds(request, sport, event_id, markets):
     cache_key = f"event_odds_{sport}_{event_id}_{markets}"
-    cached_data = cache.get(cache_key)
-
-    if cached_data is not None:
-        response_data = {
-            "data": cached_data,
-            "metadata": {
-                "cached": True,
-                "timestamp": datetime.now().isoformat(),
-                "message": "Served from cache (60 second TTL)",
-            },
-        }
-        return JsonResponse(response_data, safe=False)
+    market_list = markets.split(",")
 
-    url = (
-        f"{ODDS_BASE_URL}"
-        f"/v4/sports/{sport}"
-        f"/events/{event_id}"
-        f"/odds?apiKey={settings.API_KEY}"
-        f"&regions=us&markets={markets}"
-        f"&includeLinks=true"
-    )
+    def fetch_batched():
+        # Shares one upstream call with concurrent requests for other markets
+        # on this event; every market lands under its own event_odds_ key
+        parsed = event_market_batcher.fetch(sport, event_id, market_list)
+        data = parsed[market_list[0]]
+        if len(market_list) > 1:
+            set_snapshot(cache_key, data, 60, alias=PARSED_ALIAS)
+        return data
 
     try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return JsonResponse(
-                {"error": "Failed to fetch odds", "details": response.text},
-                status=response.status_code,
-            )
-
-        full_data = response.json()
-        parsed_data = parse_event_odds(full_data)
-
-        cache.set(cache_key, parsed_data, 60)
-        response_data = {
-            "data": parsed_data,
-            "metadata": {
-                "cached": False,
-                "timestamp": datetime.now().isoformat(),
-                "message": "Freshly fetched data",
-            },
-        }
-
-        return JsonResponse(response_data, safe=False)
-
+        parsed_data, snapshot = cached_odds_api_get(
+            cache_key,
+            f"/v4/sports/{sport}/events/{event_id}/odds",
+            ttl=60,
+            max_stale=settings.ODDS_EVENT_ODDS_MAX_STALENESS,
+            fetcher=fetch_batched,
+            alias=PARSED_ALIAS,
+        )
+    except UpstreamError as e:
+        return JsonResponse(
+            {"error": "Failed to fetch odds", "details": e.details},
+            status=e.status,
+        )
     except Exception as e:
         return JsonResponse(
             {"error": "An unexpected error occurred", "details": str(e)}, status=500
         )
+
+    metadata = {
+        "cached": snapshot["cached"],
+        "timestamp": datetime.now().isoformat(),
+    }
+    if snapshot.get("refreshing"):
+        metadata["age"] = snapshot["age"]
+        metadata["message"] = "Served stale data while refreshing in the background"
+    elif snapshot["stale"]:
+        metadata["age"] = snapshot["age"]
+        metadata["message"] = "Served stale data (upstream quota low or unavailable)"
+    elif snapshot["cached"]:
+        metadata["message"] = "Served from cache (60 second TTL)"
+    else:
+        metadata["message"] = "Freshly fetched data"
+
+    return JsonResponse({"data": parsed_data, "metadata": metadata}, safe=False)
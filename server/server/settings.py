@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -131,17 +133,157 @@ CORS_ALLOWED_ORIGINS = [  # this should point to react frontend
     "http://localhost:5174",  # Allow requests from localhost:5174 (optional)
 ]
 
-from decouple import config
+from decouple import Csv, config
 
 GEMINI_KEY = config("GEMINI_KEY")
 API_KEY = config("API_KEY")
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
-SESSION_CACHE_ALIAS = "default"
+SESSION_CACHE_ALIAS = "sessions"
+
+# One cache alias per data class so that one can't evict another:
+#   default    parsed odds served to clients
+#   upstream   raw Odds API and NBA stats payloads
+#   arbitrage  computed arbitrage results
+#   sessions   chatbot sessions
+# Each alias is LRU within a byte budget: per worker for locmem, and per
+# shared cache file for sqlite.
+CACHE_ALIAS_MAX_BYTES = {
+    "default": config("CACHE_DEFAULT_MAX_BYTES", default=32 * 1024 * 1024, cast=int),
+    "upstream": config("CACHE_UPSTREAM_MAX_BYTES", default=64 * 1024 * 1024, cast=int),
+    "arbitrage": config(
+        "CACHE_ARBITRAGE_MAX_BYTES", default=16 * 1024 * 1024, cast=int
+    ),
+    "sessions": config("CACHE_SESSIONS_MAX_BYTES", default=16 * 1024 * 1024, cast=int),
+}
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+# "locmem" keeps private caches per process; "sqlite" shares WAL-mode SQLite
+# files (one per alias) between all worker processes on the host
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+
+if CACHE_BACKEND == "sqlite":
+    _cache_location = Path(
+        config("CACHE_LOCATION", default=str(BASE_DIR / "cache.sqlite3"))
+    )
+    CACHES = {
+        alias: {
+            "BACKEND": "core.cache_backends.SQLiteCache",
+            "LOCATION": str(
+                _cache_location
+                if alias == "default"
+                else _cache_location.with_name(
+                    f"{_cache_location.stem}-{alias}{_cache_location.suffix}"
+                )
+            ),
+            "OPTIONS": {
+                "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=20000, cast=int),
+                "MAX_BYTES": max_bytes,
+            },
+        }
+        for alias, max_bytes in CACHE_ALIAS_MAX_BYTES.items()
     }
-}
+else:
+    CACHES = {
+        alias: {
+            "BACKEND": "core.cache_backends.ByteBudgetLRUCache",
+            "LOCATION": alias,
+            "OPTIONS": {"MAX_BYTES": max_bytes},
+        }
+        for alias, max_bytes in CACHE_ALIAS_MAX_BYTES.items()
+    }
+
+# Player prop fan-out: parallel per-event requests and per-event timeout (seconds)
+ODDS_FANOUT_MAX_WORKERS = config("ODDS_FANOUT_MAX_WORKERS", default=8, cast=int)
+ODDS_FANOUT_EVENT_TIMEOUT = config(
+    "ODDS_FANOUT_EVENT_TIMEOUT", default=10.0, cast=float
+)
+
+# Request planner (odds/utils/request_planner.py): bookmaker keys to fetch
+# (empty fetches the whole US region) and how far ahead to fetch events, in
+# hours (0 fetches every upcoming event)
+ODDS_BOOKMAKERS = config("ODDS_BOOKMAKERS", default="", cast=Csv())
+ODDS_COMMENCE_WITHIN_HOURS = config("ODDS_COMMENCE_WITHIN_HOURS", default=0, cast=int)
+
+# Shared Odds API client (odds/utils/upstream.py)
+ODDS_API_BASE_URL = config("ODDS_API_BASE_URL", default="https://api.the-odds-api.com")
+ODDS_API_CONNECT_TIMEOUT = config("ODDS_API_CONNECT_TIMEOUT", default=3.05, cast=float)
+ODDS_API_READ_TIMEOUT = config("ODDS_API_READ_TIMEOUT", default=10.0, cast=float)
+ODDS_API_POOL_CONNECTIONS = config("ODDS_API_POOL_CONNECTIONS", default=4, cast=int)
+ODDS_API_POOL_MAXSIZE = config("ODDS_API_POOL_MAXSIZE", default=16, cast=int)
+
+# Odds API credit budget (odds/utils/budget.py). Below the low watermark cache
+# TTLs are stretched (up to the max multiplier); at the reserve, views stop
+# calling upstream and serve stale snapshots kept for ODDS_STALE_TTL seconds.
+ODDS_BUDGET_LOW_WATERMARK = config("ODDS_BUDGET_LOW_WATERMARK", default=500, cast=int)
+ODDS_BUDGET_RESERVE = config("ODDS_BUDGET_RESERVE", default=50, cast=int)
+ODDS_BUDGET_MAX_TTL_MULTIPLIER = config(
+    "ODDS_BUDGET_MAX_TTL_MULTIPLIER", default=10, cast=int
+)
+ODDS_BUDGET_WINDOW = config("ODDS_BUDGET_WINDOW", default=3600, cast=int)
+ODDS_STALE_TTL = config("ODDS_STALE_TTL", default=6 * 60 * 60, cast=int)
+
+# Background ingestion (python manage.py ingest_odds). The worker publishes
+# into the cache, so it needs a cache shared between processes
+# (CACHE_BACKEND=sqlite); it refuses to start on the per-process "locmem"
+# caches. With ODDS_PRECOMPUTED_ONLY the views serve only snapshots published
+# by the worker, so that mode needs the shared cache too.
+ODDS_INGEST_SPORTS = config("ODDS_INGEST_SPORTS", default="basketball_nba", cast=Csv())
+ODDS_INGEST_MARKETS = config(
+    "ODDS_INGEST_MARKETS",
+    default="player_points,player_assists,player_rebounds",
+    cast=Csv(),
+)
+ODDS_INGEST_INTERVAL = config("ODDS_INGEST_INTERVAL", default=60, cast=int)
+ODDS_PRECOMPUTED_ONLY = config("ODDS_PRECOMPUTED_ONLY", default=False, cast=bool)
+if ODDS_PRECOMPUTED_ONLY and CACHE_BACKEND != "sqlite":
+    # Web workers would never see the worker's snapshots and answer 503 forever
+    raise ImproperlyConfigured(
+        "ODDS_PRECOMPUTED_ONLY needs a shared cache: set CACHE_BACKEND=sqlite"
+    )
+
+# Single-flight coalescing of cache misses: how long the cross-process fetch
+# lock lives and how long waiters wait for the leader's snapshot (seconds)
+ODDS_SINGLE_FLIGHT_LOCK_TTL = config(
+    "ODDS_SINGLE_FLIGHT_LOCK_TTL", default=30, cast=int
+)
+ODDS_SINGLE_FLIGHT_WAIT = config("ODDS_SINGLE_FLIGHT_WAIT", default=15.0, cast=float)
+
+# Stale-while-revalidate for /odds/event/: snapshots up to this age (seconds)
+# are served immediately and refreshed in the background; older ones block
+ODDS_EVENT_ODDS_MAX_STALENESS = config(
+    "ODDS_EVENT_ODDS_MAX_STALENESS", default=300, cast=int
+)
+
+# Seconds a per-event odds fetch waits for requests for other markets on the
+# same event to join its batched upstream call
+ODDS_MARKET_BATCH_WINDOW = config("ODDS_MARKET_BATCH_WINDOW", default=0.05, cast=float)
+
+# Upstream resilience (odds/utils/resilience.py): total deadline per call,
+# jittered exponential retries and circuit breaker thresholds
+ODDS_API_DEADLINE = config("ODDS_API_DEADLINE", default=15.0, cast=float)
+NBA_STATS_TIMEOUT = config("NBA_STATS_TIMEOUT", default=10.0, cast=float)
+NBA_STATS_DEADLINE = config("NBA_STATS_DEADLINE", default=20.0, cast=float)
+UPSTREAM_MAX_RETRIES = config("UPSTREAM_MAX_RETRIES", default=2, cast=int)
+UPSTREAM_BACKOFF_BASE = config("UPSTREAM_BACKOFF_BASE", default=0.25, cast=float)
+UPSTREAM_BACKOFF_MAX = config("UPSTREAM_BACKOFF_MAX", default=2.0, cast=float)
+UPSTREAM_BREAKER_THRESHOLD = config("UPSTREAM_BREAKER_THRESHOLD", default=5, cast=int)
+UPSTREAM_BREAKER_RESET = config("UPSTREAM_BREAKER_RESET", default=30.0, cast=float)
+NBA_STATS_CACHE_TTL = config("NBA_STATS_CACHE_TTL", default=60 * 60, cast=int)
+
+# Arbitrage scan engine: "python" (best-first heap scan) or "numpy" (price
+# tensor, faster for whole-slate scans)
+ARBITRAGE_ENGINE = config("ARBITRAGE_ENGINE", default="python")
+
+# Multi-sport scan (arbitrage/scan/): detector processes (0 uses every core)
+# and the deadline for the whole scan in seconds
+ARBITRAGE_SCAN_PROCESSES = config("ARBITRAGE_SCAN_PROCESSES", default=0, cast=int)
+ARBITRAGE_SCAN_TIMEOUT = config("ARBITRAGE_SCAN_TIMEOUT", default=20.0, cast=float)
+
+# Seconds allowed for rechecking shown arbitrage against live prices (?verify=1)
+ARBITRAGE_VERIFY_BUDGET = config("ARBITRAGE_VERIFY_BUDGET", default=2.0, cast=float)
+
+# SQLite file recording every arbitrage sighting; unset disables recording.
+# A sighting more than ARBITRAGE_HISTORY_GAP seconds after the last one starts
+# a new lifetime for that arbitrage.
+ARBITRAGE_HISTORY_PATH = config("ARBITRAGE_HISTORY_PATH", default="")
+ARBITRAGE_HISTORY_GAP = config("ARBITRAGE_HISTORY_GAP", default=180, cast=float)